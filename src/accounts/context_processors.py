@@ -0,0 +1,10 @@
+from .permissions import get_permissions
+
+
+
+def role_actions(request):
+	'''
+	templates -> {% if 'approve_leaves' in role_actions %}
+	'''
+	user = getattr(request,'user',None)
+	return {'role_actions':get_permissions(user) if user is not None else frozenset()}
@@ -0,0 +1,48 @@
+import sys
+import time
+from django.core.management.base import BaseCommand,CommandError
+from accounts import provisioning
+
+
+
+class Command(BaseCommand):
+	help = 'Create users from a csv file (username,email,password), passwords hashed in parallel (--link-employees also creates their employees)'
+
+	def add_arguments(self,parser):
+		parser.add_argument('file',help = 'csv file with a header row, - for stdin')
+		parser.add_argument('--workers',type = int,default = None,help = 'hashing processes (default: settings.PROVISION_WORKERS, 1 hashes in this process)')
+		parser.add_argument('--batch-size',type = int,default = 500,help = 'users per transaction')
+		parser.add_argument('--link-employees',action = 'store_true',help = 'create an employee per user (firstname,lastname,birthday[,othername,startdate,department,role])')
+		parser.add_argument('--skip-password-validation',action = 'store_true',help = 'accept initial passwords the AUTH_PASSWORD_VALIDATORS reject')
+		parser.add_argument('--dry-run',action = 'store_true',help = 'only check the rows')
+
+
+	def handle(self,*args,**options):
+		started = time.monotonic()
+		try:
+			if options['file'] == '-':
+				rows = provisioning.read_rows(sys.stdin)
+			else:
+				with open(options['file'],newline = '',encoding = 'utf-8-sig') as handle:
+					rows = provisioning.read_rows(handle)
+		except (OSError,provisioning.ProvisioningError) as error:
+			raise CommandError(error)
+
+		rows,errors = provisioning.check_rows(rows,options['link_employees'],not options['skip_password_validation'])
+		for line,username,error in errors:
+			self.stderr.write('line {0} ({1}): {2}'.format(line,username or '-',error))
+		if options['dry_run'] or not rows:
+			self.stderr.write('{0} valid row(s), {1} rejected'.format(len(rows),len(errors)))
+			return
+
+		counts = provisioning.provision(
+			rows,
+			link_employees = options['link_employees'],
+			workers = options['workers'],
+			batch_size = options['batch_size'],
+			progress = lambda counts:self.stderr.write('{0} user(s) created'.format(counts['users'])),
+		)
+		for line,username,error in counts['rejected']:
+			self.stderr.write('line {0} ({1}): {2}'.format(line,username,error))
+		self.stderr.write('{0} user(s), {1} employee(s) created, {2} row(s) rejected in {3:.1f}s'.format(
+			counts['users'],counts['employees'],len(errors) + len(counts['rejected']),time.monotonic() - started))
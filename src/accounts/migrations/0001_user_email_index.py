@@ -0,0 +1,29 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+INDEX = models.Index(fields=['email'], name='accounts_user_email_idx')
+
+
+def add_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), INDEX)
+
+
+class Migration(migrations.Migration):
+    '''
+    auth_user.email is unindexed - the user autocomplete range-scans it (accounts/views.py)
+    auth.User isn't ours to add Meta.indexes to, so the index is created here
+    '''
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.1.14 on 2026-10-19 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_user_email_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginThrottle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('stamp', models.FloatField(db_index=True, default=0)),
+            ],
+            options={
+                'verbose_name': 'Login Throttle',
+                'verbose_name_plural': 'Login Throttles',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.14 on 2026-10-19 00:40
+
+from django.db import migrations, models
+
+
+INDEXES = (
+    ('accounts_user_username_lower_idx', 'username'),
+    ('accounts_user_email_lower_idx', 'email'),
+)
+EMAIL_INDEX = models.Index(fields=['email'], name='accounts_user_email_idx') # from 0001, no longer used
+VENDORS = ('sqlite', 'postgresql') # mysql compares case-insensitively already, older servers have no expression indexes
+
+
+def add_lower_indexes(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), EMAIL_INDEX)
+    if schema_editor.connection.vendor not in VENDORS:
+        return
+    table = schema_editor.quote_name(apps.get_model('auth', 'User')._meta.db_table)
+    for name, column in INDEXES:
+        schema_editor.execute('CREATE INDEX {0} ON {1} (LOWER({2}))'.format(schema_editor.quote_name(name), table, schema_editor.quote_name(column)))
+
+
+def remove_lower_indexes(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), EMAIL_INDEX)
+    if schema_editor.connection.vendor not in VENDORS:
+        return
+    for name, column in INDEXES:
+        schema_editor.execute('DROP INDEX {0}'.format(schema_editor.quote_name(name)))
+
+
+class Migration(migrations.Migration):
+    '''
+    the user autocomplete matches LOWER(username) and LOWER(email) by range (accounts/views.py),
+    these expression indexes keep that a range scan and replace the plain email index of 0001
+    '''
+
+    dependencies = [
+        ('accounts', '0002_login_throttle'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_lower_indexes, remove_lower_indexes),
+    ]
@@ -0,0 +1,23 @@
+from django.db import models
+from django.utils.translation import ugettext as _
+
+
+
+class LoginThrottle(models.Model):
+	'''
+	one login throttle token bucket (or decision counter), shared by every worker process.
+	only ever changed by single UPDATEs in accounts/throttle.py - never edit it directly
+	'''
+	key = models.CharField(max_length=200,unique=True) # user:<username>, ip:<address> or count:<decision>
+	tokens = models.FloatField(default=0)
+	stamp = models.FloatField(default=0,db_index=True) # time.time() of the last token taken
+
+
+	class Meta:
+		verbose_name = _('Login Throttle')
+		verbose_name_plural = _('Login Throttles')
+
+
+
+	def __str__(self):
+		return ('{0}: {1:.2f}'.format(self.key,self.tokens))
@@ -0,0 +1,120 @@
+import asyncio
+import uuid
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache,caches
+from django.shortcuts import redirect
+from employee.identity import get_employee
+
+
+'''
+role based access control.
+settings.ROLE_PERMISSIONS maps an employee Role name to the actions it allows,
+superusers get every action. each user's action set is resolved once and kept in
+the (per process) cache under a version stamp - any change to roles, employees or users
+replaces the stamp (accounts/signals.py) so stale sets are simply never read again.
+the stamp lives in the 'shared' cache, every worker process sees a revocation on its next request.
+'''
+
+APPROVE_LEAVES = 'approve_leaves'
+MANAGE_EMPLOYEES = 'manage_employees'
+MANAGE_USERS = 'manage_users'
+
+ALL_ACTIONS = frozenset([APPROVE_LEAVES,MANAGE_EMPLOYEES,MANAGE_USERS])
+
+VERSION_KEY = 'permissions:version'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+
+def permissions_version():
+	shared = caches['shared']
+	version = shared.get(VERSION_KEY)
+	if version is None:
+		shared.add(VERSION_KEY,uuid.uuid4().hex,None)
+		version = shared.get(VERSION_KEY)
+	return version
+
+
+
+def bump_permissions_version(*args,**kwargs):
+	'''
+	invalidates every cached action set in every process -> connected to role/employee/user signals
+	a new random stamp, concurrent bumps in two processes can't write the same value
+	'''
+	caches['shared'].set(VERSION_KEY,uuid.uuid4().hex,None)
+
+
+
+def _resolve(user):
+	if user.is_superuser:
+		return ALL_ACTIONS
+	employee = get_employee(user)
+	role_name = employee.role.name if employee and employee.role else None
+	role_permissions = getattr(settings,'ROLE_PERMISSIONS',{})
+	return frozenset(role_permissions.get(role_name,())) & ALL_ACTIONS
+
+
+
+def get_permissions(user):
+	'''
+	frozenset of actions allowed for user -> cached per request on the user object
+	and across requests in the cache, a cache hit costs no queries
+	'''
+	if not (user and user.is_authenticated and user.is_active):
+		return frozenset()
+
+	actions = getattr(user,'_role_actions',None)
+	if actions is not None:
+		return actions
+
+	key = 'permissions:{0}:{1}'.format(permissions_version(),user.id)
+	actions = cache.get(key)
+	if actions is None:
+		actions = _resolve(user)
+		cache.set(key,actions,CACHE_TIMEOUT)
+	user._role_actions = actions
+	return actions
+
+
+
+def has_permission(user,action):
+	return action in get_permissions(user)
+
+
+
+def _denied(request,action,redirect_to):
+	'''
+	None when request.user may run action, otherwise the redirect to send back
+	'''
+	if not request.user.is_authenticated:
+		return redirect('accounts:login')
+	if not has_permission(request.user,action):
+		return redirect(redirect_to)
+
+
+
+def action_required(action,redirect_to = '/'):
+	'''
+	view decorator -> @action_required(APPROVE_LEAVES), works on sync and async views
+	anonymous users go to the login page, users without the action to redirect_to
+	'''
+	def decorator(view):
+		if asyncio.iscoroutinefunction(view):
+			@wraps(view)
+			async def async_wrapper(request,*args,**kwargs):
+				denied = await sync_to_async(_denied)(request,action,redirect_to)# session/user loading is sync only
+				if denied is not None:
+					return denied
+				return await view(request,*args,**kwargs)
+			return async_wrapper
+
+		@wraps(view)
+		def wrapper(request,*args,**kwargs):
+			denied = _denied(request,action,redirect_to)
+			if denied is not None:
+				return denied
+			return view(request,*args,**kwargs)
+		return wrapper
+	return decorator
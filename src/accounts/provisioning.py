@@ -0,0 +1,186 @@
+import csv
+import datetime
+import io
+import os
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError,router,transaction
+from employee import directory,refcache
+from employee.models import Department,Employee,EmployeeIdSequence,Role
+from employee.utility import day_of_year
+
+
+'''
+bulk user provisioning - manage.py provision_users, and accounts:userprovision for small uploads
+(settings.PROVISION_UPLOAD_ROWS, a handful hashed in the request - the process pool is for the command only).
+rows are csv with a header: username,email,password and, to create a linked Employee in the same run,
+firstname,lastname,birthday (yyyy-mm-dd) plus optional department,role (names) and startdate.
+
+PBKDF2 costs a fixed, deliberately large amount of cpu per password - that is the whole import time.
+passwords are hashed by a process pool over every core (hrsuit/processes.py), rows are inserted with
+bulk_create per batch, employee ids come from one EmployeeIdSequence.allocate() per batch.
+bulk_create sends no signals -> the employee directory rows are refreshed per batch.
+a username taken between check_rows() and the insert rejects that row only, the rest of its batch is retried.
+'''
+
+USER_COLUMNS = ('username','email','password')
+EMPLOYEE_COLUMNS = ('firstname','lastname','birthday')
+HASH_CHUNK = 16 # passwords per task sent to a worker
+
+
+
+class ProvisioningError(Exception):
+	pass
+
+
+
+def read_rows(handle):
+	'''
+	text file / iterable of lines -> [{column:value},...], values stripped
+	'''
+	reader = csv.DictReader(handle)
+	missing = [column for column in USER_COLUMNS if column not in (reader.fieldnames or ())]
+	if missing:
+		raise ProvisioningError('missing column(s): {0}'.format(', '.join(missing)))
+	return [{key.strip():(value or '').strip() for key,value in row.items() if key} for row in reader]
+
+
+
+def read_upload(upload):
+	'''
+	uploaded file (request.FILES) -> read_rows
+	'''
+	return read_rows(io.TextIOWrapper(upload.file,encoding = 'utf-8-sig'))
+
+
+
+def _date(value):
+	return datetime.date.fromisoformat(value) if value else None
+
+
+
+def check_rows(rows,link_employees = False,validate_passwords = True):
+	'''
+	-> (valid rows,[(line,username,error),...]) - line 2 is the first row after the header, valid rows keep it as row['line']
+	one query for the usernames already taken, departments and roles from the reference cache
+	'''
+	taken = set()
+	usernames = [row.get('username') for row in rows if row.get('username')]
+	for start in range(0,len(usernames),directory.BATCH_SIZE):
+		taken.update(User.objects.filter(username__in = usernames[start:start + directory.BATCH_SIZE]).values_list('username',flat = True))
+	departments = {department.name:department for department in refcache.objects(Department)}
+	roles = {role.name:role for role in refcache.objects(Role)}
+
+	valid,errors,seen = [],[],set()
+	for line,row in enumerate(rows,2):
+		username = row.get('username')
+		try:
+			if not username or not row.get('password'):
+				raise ValidationError('username and password are required')
+			if username in taken or username in seen:
+				raise ValidationError('username already exists')
+			if row.get('email'):
+				validate_email(row['email'])
+			if validate_passwords:
+				validate_password(row['password'],User(username = username,email = row.get('email','')))
+			if link_employees:
+				if not all(row.get(column) for column in EMPLOYEE_COLUMNS):
+					raise ValidationError('firstname, lastname and birthday are required for the employee')
+				row['birthday'] = _date(row['birthday'])
+				row['startdate'] = _date(row.get('startdate'))
+				if row.get('department') and row['department'] not in departments:
+					raise ValidationError('unknown department {0}'.format(row['department']))
+				if row.get('role') and row['role'] not in roles:
+					raise ValidationError('unknown role {0}'.format(row['role']))
+				row['department'] = departments.get(row.get('department'))
+				row['role'] = roles.get(row.get('role'))
+		except ValidationError as error:
+			errors.append((line,username,' '.join(error.messages)))
+			continue
+		except ValueError as error: # dates
+			errors.append((line,username,str(error)))
+			continue
+		seen.add(username)
+		row['line'] = line
+		valid.append(row)
+	return valid,errors
+
+
+
+def hash_passwords(passwords,workers = None):
+	'''
+	[raw,...] -> [hash,...] in the same order, over a process pool (None/0 -> every core) unless that is 1
+	a pool only pays off for more than a handful of passwords - each worker starts its own django
+	'''
+	if workers is None:
+		workers = settings.PROVISION_WORKERS
+	workers = workers or os.cpu_count()
+	if workers == 1 or len(passwords) <= HASH_CHUNK:
+		return [make_password(password) for password in passwords]
+	from hrsuit import processes
+
+	with processes.pool(workers) as pool:
+		return list(pool.map(make_password,passwords,chunksize = HASH_CHUNK))
+
+
+
+def _employee(row,user_id,employeeid):
+	return Employee(
+		user_id = user_id,
+		firstname = row['firstname'],
+		lastname = row['lastname'],
+		othername = row.get('othername') or None,
+		birthday = row['birthday'],
+		startdate = row['startdate'],
+		department = row['department'],
+		role = row['role'],
+		employeeid = employeeid,
+		birthday_doy = day_of_year(row['birthday']), # bulk_create skips Employee.save()
+		startdate_doy = day_of_year(row['startdate']),
+	)
+
+
+
+def _insert(batch,link_employees):
+	'''
+	one transaction for [(row,hash),...]: bulk insert users, read back their ids, bulk insert employees
+	'''
+	with transaction.atomic(using = router.db_for_write(User)):
+		User.objects.bulk_create([User(username = row['username'],email = row.get('email',''),password = password) for row,password in batch])
+		if link_employees:
+			ids = dict(User.objects.filter(username__in = [row['username'] for row,_ in batch]).values_list('username','id'))
+			codes = EmployeeIdSequence.objects.allocate(len(batch))
+			Employee.objects.bulk_create([_employee(row,ids[row['username']],code) for (row,_),code in zip(batch,codes)])
+			directory.refresh(Employee.objects.filter(user_id__in = ids.values()).values_list('id',flat = True))
+
+
+
+def provision(rows,link_employees = False,workers = None,batch_size = 500,progress = None):
+	'''
+	create users (and employees) for checked rows -> {'users':n,'employees':n,'rejected':[(line,username,error),...]}
+	one transaction per batch, rows whose username was taken since the check are rejected and the batch retried
+	'''
+	hashes = hash_passwords([row['password'] for row in rows],workers)
+	counts = {'users':0,'employees':0,'rejected':[]}
+	for start in range(0,len(rows),batch_size):
+		batch = list(zip(rows[start:start + batch_size],hashes[start:start + batch_size]))
+		while batch:
+			try:
+				_insert(batch,link_employees)
+				break
+			except IntegrityError:
+				taken = set(User.objects.filter(username__in = [row['username'] for row,_ in batch]).values_list('username',flat = True))
+				if not taken:
+					raise
+				counts['rejected'] += [(row.get('line'),row['username'],'username already exists') for row,_ in batch if row['username'] in taken]
+				batch = [(row,password) for row,password in batch if row['username'] not in taken]
+		counts['users'] += len(batch)
+		if link_employees:
+			counts['employees'] += len(batch)
+		if progress:
+			progress(counts)
+	return counts
@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save,post_delete
+from employee.models import Role,Employee
+from .permissions import bump_permissions_version
+
+
+
+def user_saved(sender,instance,update_fields = None,**kwargs):
+	'''
+	login only touches last_login - that can't change permissions
+	'''
+	if update_fields and set(update_fields) == {'last_login'}:
+		return
+	bump_permissions_version()
+
+
+
+def connect():
+	'''
+	any change that can alter a user's action set invalidates the permission cache
+	'''
+	for model in (Role,Employee):
+		post_save.connect(bump_permissions_version,sender = model,dispatch_uid = 'permissions_{0}_save'.format(model.__name__))
+	for model in (Role,Employee,User):
+		post_delete.connect(bump_permissions_version,sender = model,dispatch_uid = 'permissions_{0}_delete'.format(model.__name__))
+	post_save.connect(user_saved,sender = User,dispatch_uid = 'permissions_User_save')
@@ -0,0 +1,48 @@
+from django.urls import reverse
+from dashboard.datatables import Column,DataTable
+from employee.models import EmployeeDirectory
+
+
+'''
+server-side table of the users pages (see dashboard/datatables.py), from the directory read table
+'''
+
+
+
+class UserTable(DataTable):
+	columns = (
+		Column('username'),
+		Column('fullname'),
+		Column('department','department_name'),
+		Column('is_active',search = None),
+	)
+	default_order = ('-created',)
+
+
+	def __init__(self,blocked = False):
+		self.blocked = blocked
+
+
+	def queryset(self,request):
+		entries = EmployeeDirectory.objects.only('employee_id','user_id','username','fullname','department_name','is_active','is_superuser')
+		if self.blocked:
+			return entries.filter(is_blocked = True)
+		return entries.filter(is_deleted = False)
+
+
+	def row(self,entry):
+		if entry.is_active and entry.is_superuser:
+			action = None # admin cannot block self
+		elif entry.is_active:
+			action = reverse('accounts:userblock',args = [entry.user_id])
+		else:
+			action = reverse('accounts:userunblock',args = [entry.user_id])
+		return {
+			'DT_RowId':'user-{0}'.format(entry.user_id),
+			'username':entry.username,
+			'fullname':entry.fullname,
+			'department':entry.department_name,
+			'is_active':entry.is_active,
+			'is_superuser':entry.is_superuser,
+			'action':action,
+		}
@@ -1,3 +1,133 @@
-from django.test import TestCase
+import io
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory,TestCase,override_settings
+from django.urls import reverse
+from employee.models import Department,Employee,EmployeeDirectory,EmployeeIdSequence
+from . import provisioning,throttle
+from .models import LoginThrottle
 
-# Create your tests here.
+
+
+@override_settings(LOGIN_THROTTLE_USERNAME_BURST = 3,LOGIN_THROTTLE_USERNAME_RATE = 0.0,LOGIN_THROTTLE_IP_BURST = 5,LOGIN_THROTTLE_IP_RATE = 0.0)
+class ThrottleTests(TestCase):
+	def request(self,ip = '10.0.0.1'):
+		return RequestFactory().post('/',REMOTE_ADDR = ip)
+
+
+	def test_username_bucket(self):
+		self.assertEqual([throttle.check_login(self.request(),'Ada') for _ in range(4)],[True,True,True,False])
+		self.assertFalse(throttle.check_login(self.request('10.0.0.2'),'ada ')) # another ip, same bucket
+		self.assertTrue(throttle.check_login(self.request('10.0.0.2'),'grace'))
+		self.assertEqual(throttle.throttle_stats(),{throttle.ALLOWED:4,throttle.REJECTED_USERNAME:2,throttle.REJECTED_IP:0})
+
+
+	def test_ip_rejection_takes_nothing_from_the_username(self):
+		for name in ('a','b','c','d','e'):
+			self.assertTrue(throttle.check_login(self.request(),name))
+		self.assertFalse(throttle.check_login(self.request(),'ada'))
+		self.assertEqual(LoginThrottle.objects.get(key = 'user:ada').tokens,3)
+		self.assertTrue(throttle.check_login(self.request('10.0.0.2'),'ada'))
+
+
+	def test_refill(self):
+		for _ in range(3):
+			throttle._take('user:ada',1.0,3,100.0,3600)
+		self.assertFalse(throttle._take('user:ada',1.0,3,100.5,3600))
+		self.assertTrue(throttle._take('user:ada',1.0,3,101.0,3600))
+		self.assertTrue(throttle._take('user:ada',1.0,3,200.0,3600))
+		self.assertEqual(LoginThrottle.objects.get(key = 'user:ada').tokens,2) # capped at the burst
+
+
+	def test_expired_buckets_deleted(self):
+		throttle._take('user:ada',1.0,3,100.0,3600)
+		throttle._count(throttle.ALLOWED)
+		throttle._take('user:grace',1.0,3,100.0 + 3601,3600)
+		self.assertEqual(set(LoginThrottle.objects.values_list('key',flat = True)),{'user:grace','count:allowed'})
+
+
+
+class AutocompleteTests(TestCase):
+	def setUp(self):
+		self.admin = User.objects.create_superuser('admin','admin@example.com',None)
+		User.objects.create_user('raj',email = 'Raj.Kumar@Example.com')
+		User.objects.create_user('Rachel',email = 'rachel@example.com')
+		User.objects.create_user('bob',email = 'rami@example.com')
+		self.client.force_login(self.admin)
+
+
+	def search(self,term):
+		response = self.client.get(reverse('accounts:userautocomplete'),{'q':term})
+		return [result['value'] for result in response.json()['results']]
+
+
+	def test_any_case(self):
+		self.assertEqual(self.search('Ra'),['Rachel','bob','raj'])
+		self.assertEqual(self.search('RAJ.'),['raj'])
+		self.assertEqual(self.search('rach'),['Rachel'])
+		self.assertEqual(self.search('x'),[])
+
+
+
+CSV = '''username,email,password,firstname,lastname,birthday,department
+ada,ada@example.com,Zq8!lovelace,Ada,Lovelace,1990-01-01,Research
+grace,not an email,Zq8!hopper,Grace,Hopper,1985-01-01,
+linus,,,Linus,T,1980-01-01,
+alan,,Zq8!turing,Alan,Turing,1912-06-23,Physics
+ada,,Zq8!again,Ada,Again,1990-01-01,
+taken,,Zq8!taken,Tak,En,1990-01-01,
+edsger,,Zq8!dijkstra,Edsger,Dijkstra,1930-05-11,
+'''
+
+
+
+class ProvisioningTests(TestCase):
+	def setUp(self):
+		Department.objects.create(name = 'Research')
+		User.objects.create_user('taken')
+		EmployeeIdSequence.objects.allocate(7)
+
+
+	def test_check_rows(self):
+		rows,errors = provisioning.check_rows(provisioning.read_rows(io.StringIO(CSV)),link_employees = True)
+		self.assertEqual([row['username'] for row in rows],['ada','edsger'])
+		self.assertEqual([(line,username) for line,username,_ in errors],[(3,'grace'),(4,'linus'),(5,'alan'),(6,'ada'),(7,'taken')])
+		self.assertIn('unknown department Physics',errors[2][2])
+
+
+	def test_missing_column(self):
+		with self.assertRaises(provisioning.ProvisioningError):
+			provisioning.read_rows(io.StringIO('username,email\nada,ada@example.com\n'))
+
+
+	def test_provision_allocates_ids(self):
+		rows,_ = provisioning.check_rows(provisioning.read_rows(io.StringIO(CSV)),link_employees = True)
+		counts = provisioning.provision(rows,link_employees = True,workers = 1,batch_size = 1)
+		self.assertEqual(counts,{'users':2,'employees':2,'rejected':[]})
+		self.assertEqual(
+			sorted(Employee.objects.values_list('user__username','employeeid','department__name')),
+			[('ada','RGL/00/007','Research'),('edsger','RGL/00/008',None)],
+		)
+		self.assertTrue(User.objects.get(username = 'ada').check_password('Zq8!lovelace'))
+		self.assertEqual(EmployeeDirectory.objects.count(),2)
+
+
+	def test_username_taken_after_the_check(self):
+		rows,_ = provisioning.check_rows(provisioning.read_rows(io.StringIO(CSV)),link_employees = True)
+		User.objects.create_user('ada')
+		counts = provisioning.provision(rows,link_employees = True,workers = 1)
+		self.assertEqual(counts,{'users':1,'employees':1,'rejected':[(2,'ada','username already exists')]})
+		self.assertTrue(Employee.objects.filter(user__username = 'edsger').exists())
+
+
+	@override_settings(PROVISION_UPLOAD_ROWS = 10)
+	def test_upload(self):
+		self.client.force_login(User.objects.create_superuser('admin','admin@example.com',None))
+		upload = SimpleUploadedFile('users.csv',CSV.encode('utf-8'))
+		response = self.client.post(reverse('accounts:userprovision'),{'file':upload,'link_employees':'1'})
+		self.assertEqual(response.status_code,200)
+		self.assertEqual(response.json()['created'],{'users':2,'employees':2})
+		self.assertEqual([row['line'] for row in response.json()['rejected']],[3,4,5,6,7])
+		with override_settings(PROVISION_UPLOAD_ROWS = 3):
+			upload = SimpleUploadedFile('users.csv',CSV.encode('utf-8'))
+			self.assertEqual(self.client.post(reverse('accounts:userprovision'),{'file':upload}).status_code,400)
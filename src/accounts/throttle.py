@@ -0,0 +1,122 @@
+import time
+from django.conf import settings
+from django.db import models,router,transaction
+from django.db.models.functions import Least
+from hrsuit import metrics
+from .models import LoginThrottle
+
+
+'''
+login throttling - token bucket per username and per client ip kept in the LoginThrottle table,
+so every worker process shares the same buckets and the same lockout.
+a bucket holds up to BURST tokens and refills at RATE tokens per second, every
+login attempt takes one token. checked before authenticate() so a rejected attempt
+never pays for a password hash.
+
+taking a token is one UPDATE that refills and takes in the same statement, only where a whole token
+is available -> concurrent attempts of a burst queue on the row lock and can't all see the same count.
+buckets untouched for BUCKET_TIMEOUT are full again, they are deleted whenever a new bucket is created.
+'''
+
+ALLOWED = 'allowed'
+REJECTED_USERNAME = 'rejected_username'
+REJECTED_IP = 'rejected_ip'
+
+DECISIONS = (ALLOWED,REJECTED_USERNAME,REJECTED_IP)
+
+LOGIN_ATTEMPTS = metrics.counter('hrsuit_login_attempts_total','login attempts by throttle decision',('decision',))
+
+
+
+def _config(name,default):
+	return getattr(settings,'LOGIN_THROTTLE_{0}'.format(name),default)
+
+
+
+def client_ip(request):
+	'''
+	REMOTE_ADDR unless LOGIN_THROTTLE_TRUST_FORWARDED is set (behind a reverse proxy)
+	'''
+	if _config('TRUST_FORWARDED',False):
+		forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+		if forwarded:
+			return forwarded.split(',')[0].strip()
+	return request.META.get('REMOTE_ADDR','')
+
+
+
+def _available(rate,burst,now):
+	return Least(models.Value(float(burst)),models.F('tokens') + (models.Value(now) - models.F('stamp')) * models.Value(float(rate)))
+
+
+
+def _take(key,rate,burst,now,timeout):
+	'''
+	refill the bucket for the time elapsed and take one token, in one UPDATE -> True when a token was taken
+	a missing bucket is created full (and expired ones are deleted) before taking
+	'''
+	available = _available(rate,burst,now)
+	buckets = LoginThrottle.objects.filter(key = key).annotate(available = available).filter(available__gte = 1)
+	with transaction.atomic(using = router.db_for_write(LoginThrottle)):
+		if buckets.update(tokens = available - 1,stamp = now):
+			return True
+		_,created = LoginThrottle.objects.get_or_create(key = key,defaults = {'tokens':burst,'stamp':now})
+		if not created:
+			return False
+		LoginThrottle.objects.filter(stamp__lt = now - timeout).exclude(key__startswith = 'count:').delete()
+		return bool(buckets.update(tokens = available - 1,stamp = now))
+
+
+
+def _give_back(key):
+	'''
+	the other bucket rejected the attempt -> the token taken from this one is returned
+	'''
+	LoginThrottle.objects.filter(key = key).update(tokens = models.F('tokens') + 1)
+
+
+
+def _count(decision):
+	LOGIN_ATTEMPTS.inc(decision)
+	key = 'count:{0}'.format(decision)
+	if not LoginThrottle.objects.filter(key = key).update(tokens = models.F('tokens') + 1):
+		LoginThrottle.objects.get_or_create(key = key)
+		LoginThrottle.objects.filter(key = key).update(tokens = models.F('tokens') + 1)
+
+
+
+def check_login(request,username):
+	'''
+	Boolean -> True when this attempt may go on to authenticate()
+	'''
+	if not _config('ENABLED',True):
+		return True
+
+	now = time.time()
+	username = (username or '').strip().lower()[:150]
+	timeout = _config('BUCKET_TIMEOUT',3600)
+	buckets = (
+		('user:{0}'.format(username),_config('USERNAME_RATE',1 / 60.0),_config('USERNAME_BURST',5),REJECTED_USERNAME),
+		('ip:{0}'.format(client_ip(request)[:64]),_config('IP_RATE',1 / 6.0),_config('IP_BURST',20),REJECTED_IP),
+	)
+
+	taken = []
+	for key,rate,burst,rejected in buckets:
+		if not _take(key,rate,burst,now,timeout):
+			for key in taken: # nothing taken from the other bucket
+				_give_back(key)
+			_count(rejected)
+			return False
+		taken.append(key)
+
+	_count(ALLOWED)
+	return True
+
+
+
+def throttle_stats():
+	'''
+	{decision: count} over every worker process since the counters were last deleted
+	'''
+	counts = dict(LoginThrottle.objects.filter(key__in = ['count:{0}'.format(decision) for decision in DECISIONS]).values_list('key','tokens'))
+	return {decision:int(counts.get('count:{0}'.format(decision),0)) for decision in DECISIONS}
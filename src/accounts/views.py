@@ -1,5 +1,8 @@
 from django.shortcuts import render,redirect,get_object_or_404
-from django.http import HttpResponse,HttpResponseRedirect
+from django.http import HttpResponse,HttpResponseRedirect,JsonResponse
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
@@ -7,7 +10,12 @@ from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth.models import User
 from employee.models import *
+from employee.identity import get_employee
 from .forms import UserLogin,UserAddForm
+from .throttle import check_login
+from . import provisioning
+from .tables import UserTable
+from .permissions import action_required,MANAGE_USERS,MANAGE_EMPLOYEES
 
 
 
@@ -35,6 +43,7 @@ def changepassword(request):
 
 
 
+@action_required(MANAGE_USERS)
 def register_user_view(request):
 	# WORK ON (MESSAGES AND UI) & extend with email field
 	if request.method == 'POST':
@@ -55,10 +64,39 @@ def register_user_view(request):
 	dataset = dict()
 	dataset['form'] = form
 	dataset['title'] = 'register users'
+	dataset['upload_rows'] = settings.PROVISION_UPLOAD_ROWS
 	return render(request,'accounts/register.html',dataset)
 
 
 
+@action_required(MANAGE_USERS)
+def users_provision(request):
+	'''
+	POST a csv upload (file=) of up to PROVISION_UPLOAD_ROWS username,email,password rows, link_employees=1
+	to create their employees - hashed in this request, the parallel import is manage.py provision_users
+	-> {"created":{"users":n,"employees":n},"rejected":[{"line":2,"username":"jdoe","error":"..."},...]}
+	'''
+	if request.method != 'POST' or 'file' not in request.FILES:
+		return JsonResponse({'error':'POST a csv file as "file"'},status = 400)
+	link_employees = request.POST.get('link_employees') in ('1','on','true')
+	try:
+		rows = provisioning.read_upload(request.FILES['file'])
+	except (UnicodeDecodeError,provisioning.ProvisioningError) as error:
+		return JsonResponse({'error':str(error)},status = 400)
+
+	if len(rows) > settings.PROVISION_UPLOAD_ROWS:
+		return JsonResponse({'error':'at most {0} rows per upload, import bigger files with manage.py provision_users'.format(settings.PROVISION_UPLOAD_ROWS)},status = 400)
+
+	rows,errors = provisioning.check_rows(rows,link_employees)
+	counts = provisioning.provision(rows,link_employees = link_employees,workers = 1) if rows else {'users':0,'employees':0,'rejected':[]}# no process pool in a web worker
+	errors += counts.pop('rejected')# usernames taken since the check
+	return JsonResponse({
+		'created':counts,
+		'rejected':[{'line':line,'username':username,'error':error} for line,username,error in sorted(errors)],
+	})
+
+
+
 
 def login_view(request):
 	'''
@@ -72,6 +110,10 @@ def login_view(request):
 			username = request.POST.get('username')
 			password = request.POST.get('password')
 
+			if not check_login(request,username):# fail fast - no password hashing for throttled attempts
+				messages.error(request,'Too many login attempts, please wait a minute and try again',extra_tags = 'alert alert-error alert-dismissible show' )
+				return redirect('accounts:login')
+
 			user = authenticate(request, username = username, password = password)
 			if user and user.is_active:
 				login(request,user)
@@ -120,14 +162,23 @@ def logout_view(request):
 
 
 
+@action_required(MANAGE_USERS)
 def users_list(request):
-	employees = Employee.objects.all()
-	return render(request,'accounts/users_table.html',{'employees':employees,'title':'Users List'})
+	return render(request,'accounts/users_table.html',{'title':'Users List'})# rows from users_data
+
 
+@action_required(MANAGE_USERS)
+def users_data(request):
+	'''
+	DataTables server-side json for the users table, ?blocked=1 for the blocked users
+	'''
+	return UserTable(blocked = request.GET.get('blocked') == '1').response(request)
 
+
+@action_required(MANAGE_USERS)
 def users_unblock(request,id):
 	user = get_object_or_404(User,id = id)
-	emp = Employee.objects.filter(user = user).first()
+	emp = get_employee(user)
 	emp.is_blocked = False
 	emp.save()
 	user.is_active = True
@@ -136,9 +187,10 @@ def users_unblock(request,id):
 	return redirect('accounts:users')
 
 
+@action_required(MANAGE_USERS)
 def users_block(request,id):
 	user = get_object_or_404(User,id = id)
-	emp = Employee.objects.filter(user = user).first()
+	emp = get_employee(user)
 	emp.is_blocked = True
 	emp.save()
 	
@@ -149,6 +201,50 @@ def users_block(request,id):
 
 
 
+@action_required(MANAGE_USERS)
 def users_blocked_list(request):
-	blocked_employees = Employee.objects.all_blocked_employees()
-	return render(request,'accounts/all_deleted_users.html',{'employees':blocked_employees,'title':'blocked users list'})
\ No newline at end of file
+	blocked_employees = EmployeeDirectory.objects.filter(is_blocked = True)
+	return render(request,'accounts/all_deleted_users.html',{'employees':blocked_employees,'title':'blocked users list'})
+
+
+
+def _prefix(field,term):
+	'''
+	prefix match as a range (field >= term and field < term + highest char) -> an index range scan,
+	unlike LIKE/istartswith which can't use the index on every backend
+	'''
+	return Q(**{field + '__gte':term,field + '__lt':term + '\U0010ffff'})
+
+
+
+def _lower(queryset,*fields):
+	'''
+	LOWER(field) annotated as <field>_lower -> matched case-insensitively by _prefix, on the
+	expression indexes of accounts migration 0003
+	'''
+	return queryset.annotate(**{field + '_lower':Lower(field) for field in fields})
+
+
+
+@action_required(MANAGE_EMPLOYEES)
+def users_autocomplete(request):
+	'''
+	active users without an employee profile whose username or email starts with ?q=, any case
+	-> {"results":[{"id":1,"label":"jdoe (jdoe@example.com)","value":"jdoe"},...]}
+	'''
+	term = request.GET.get('q','').strip()
+	if not term:
+		return JsonResponse({'results':[]})
+
+	term = term.lower()
+	users = _lower(User.objects,'username','email').filter(
+		_prefix('username_lower',term) | _prefix('email_lower',term),
+		is_active = True,
+		employee__isnull = True,
+	).order_by('username').values('id','username','email')[:settings.USER_AUTOCOMPLETE_LIMIT]
+
+	results = [
+		{'id':user['id'],'label':'{0} ({1})'.format(user['username'],user['email']) if user['email'] else user['username'],'value':user['username']}
+		for user in users
+	]
+	return JsonResponse({'results':results})
@@ -0,0 +1,123 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render,redirect
+from employee.models import Employee
+from employee.identity import get_employee
+from leave import feeds
+from leave.models import Leave
+from accounts.permissions import action_required,APPROVE_LEAVES
+from .conditional import conditional_page,employee_page_stamp
+
+
+'''
+async versions of the read heavy dashboard pages - routed instead of the sync ones in
+dashboard/views.py when the site runs under hrsuit/asgi.py (settings.ASYNC_READ_VIEWS).
+the ORM is sync only, so every query runs in the thread-sensitive sync thread - the one whose
+database connection django closes at the end of the request and the metrics/slow query wrappers
+watch. independent queries are still gathered, they queue on that thread.
+'''
+
+
+
+def _query(function):
+	'''
+	read-only ORM work on the request's sync thread -> await _query(lambda: ...)()
+	(thread_sensitive=False would give every executor thread a connection nothing ever closes)
+	'''
+	return sync_to_async(function,thread_sensitive = True)
+
+
+
+_render = sync_to_async(render)
+
+
+
+def _authenticated(request):
+	return request.user.is_authenticated
+
+
+
+async def dashboard(request):
+	'''
+	async dashboard.views.dashboard - the three counts run concurrently
+	'''
+	if not await sync_to_async(_authenticated)(request):
+		return redirect('accounts:login')
+	user_id = request.user.id
+
+	employee_count,pending_count,staff_leave_count = await asyncio.gather(
+		_query(lambda: Employee.objects.count())(),
+		_query(lambda: Leave.objects.all_pending_leaves().count())(),
+		_query(lambda: Leave.objects.filter(user_id = user_id).count())(),
+	)
+
+	dataset = dict()
+	dataset['employee_count'] = employee_count
+	dataset['pending_count'] = pending_count
+	dataset['staff_leave_count'] = staff_leave_count
+	dataset['title'] = 'summary'
+	return await _render(request,'dashboard/dashboard_index.html',dataset)
+
+
+
+async def _leave_list(request,template,title):
+	return await _render(request,template,{'title':title})# rows from views.leaves_data
+
+
+
+@action_required(APPROVE_LEAVES)
+async def leaves_list(request):
+	return await _leave_list(request,'dashboard/leaves_recent.html','leaves list - pending')
+
+
+
+@action_required(APPROVE_LEAVES)
+async def leaves_approved_list(request):
+	return await _leave_list(request,'dashboard/leaves_approved.html','approved leave list')
+
+
+
+@action_required(APPROVE_LEAVES)
+async def cancel_leaves_list(request):
+	return await _leave_list(request,'dashboard/leaves_cancel.html','Cancel leave list')
+
+
+
+@action_required(APPROVE_LEAVES)
+async def leave_rejected_list(request):
+	return await _leave_list(request,'dashboard/rejected_leaves_list.html','rejected leave list')
+
+
+
+async def view_my_leave_table(request):
+	'''
+	async dashboard.views.view_my_leave_table - the rows come from views.my_leaves_data
+	'''
+	if not await sync_to_async(_authenticated)(request):
+		return redirect('accounts:login')
+	user_id = request.user.id
+
+	employee = await _query(lambda: get_employee(user_id))()
+
+	dataset = dict()
+	dataset['employee'] = employee
+	dataset['feeds'] = feeds.feed_urls(request.user,employee)
+	dataset['title'] = 'Leaves List'
+	return await _render(request,'dashboard/staff_leaves_table.html',dataset)
+
+
+
+@conditional_page(employee_page_stamp,'dashboard/employee_detail.html')
+async def dashboard_employee_info(request,id):
+	if not await sync_to_async(_authenticated)(request):
+		return redirect('/')
+
+	employee = await _query(lambda: Employee.objects.select_related('department','role','user').filter(id = id).first())()
+	if employee is None:
+		raise Http404
+
+	dataset = dict()
+	dataset['employee'] = employee
+	dataset['title'] = 'profile - {0}'.format(employee.get_full_name)
+	return await _render(request,'dashboard/employee_detail.html',dataset)
@@ -0,0 +1,147 @@
+import asyncio
+import datetime
+import hashlib
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response,patch_cache_control,patch_vary_headers
+from django.utils.http import http_date
+from accounts.permissions import permissions_version
+
+
+'''
+conditional responses for detail pages of logged in users.
+a stamp function answers "when did this page last change" from a cheap values() query (and cache
+only version numbers) -> (last modified datetime,parts) or None when there is no such object.
+the parts, the viewer, their permission version, the referer (the pages render a back link) and the
+page template give the ETag; a revalidation with a matching ETag is a 304 without rendering,
+and the rendered body is cached under the ETag so another visit with a cold browser cache skips
+rendering too. pages with pending messages are never cached - the messages are part of the page.
+
+@conditional_page(employee_stamp,'dashboard/employee_detail.html')
+def dashboard_employee_info(request,id): ...
+'''
+
+KEY_PREFIX = 'page'
+
+
+
+def _template_version(template_name):
+	return hashlib.sha1(get_template(template_name).template.source.encode('utf-8')).hexdigest()[:12]
+
+
+
+def _prepare(request,stamp,template_name,args,kwargs):
+	'''
+	-> None to just run the view, else (etag,last_modified,response or None)
+	'''
+	if not request.user.is_authenticated or len(messages.get_messages(request)):
+		return None
+	state = stamp(request,*args,**kwargs)
+	if state is None:
+		return None
+	last_modified,parts = state
+	digest = hashlib.sha1(repr((
+		parts,
+		request.user.id,
+		permissions_version(),
+		request.META.get('HTTP_REFERER',''),
+		_template_version(template_name),
+	)).encode('utf-8')).hexdigest()
+	etag = '"{0}"'.format(digest)
+	last_modified = last_modified.timestamp() if last_modified else None
+
+	response = get_conditional_response(request,etag = etag,last_modified = last_modified)
+	if response is None:
+		body = cache.get('{0}:{1}'.format(KEY_PREFIX,digest))
+		if body is not None:
+			response = HttpResponse(body)
+	return etag,last_modified,response
+
+
+
+def _finish(response,etag,last_modified,cached):
+	if response.status_code in (200,304) and not response.streaming:
+		if response.status_code == 200 and not cached:
+			cache.set('{0}:{1}'.format(KEY_PREFIX,etag.strip('"')),response.content,settings.PAGE_CACHE_SECONDS)
+		response['ETag'] = etag
+		if last_modified:
+			response['Last-Modified'] = http_date(last_modified)
+		patch_cache_control(response,private = True,no_cache = True) # always revalidate, never in shared caches
+		patch_vary_headers(response,('Cookie',))
+	return response
+
+
+
+def conditional_page(stamp,template_name):
+	'''
+	view decorator, sync and async views -> 304 / cached body / rendered and cached body
+	'''
+	def decorator(view):
+		if asyncio.iscoroutinefunction(view):
+			@wraps(view)
+			async def wrapper(request,*args,**kwargs):
+				prepared = await sync_to_async(_prepare)(request,stamp,template_name,args,kwargs)
+				if prepared is None:
+					return await view(request,*args,**kwargs)
+				etag,last_modified,response = prepared
+				cached = response is not None
+				if response is None:
+					response = await view(request,*args,**kwargs)
+				return await sync_to_async(_finish)(response,etag,last_modified,cached)
+			return wrapper
+
+		@wraps(view)
+		def wrapper(request,*args,**kwargs):
+			prepared = _prepare(request,stamp,template_name,args,kwargs)
+			if prepared is None:
+				return view(request,*args,**kwargs)
+			etag,last_modified,response = prepared
+			cached = response is not None
+			if response is None:
+				response = view(request,*args,**kwargs)
+			return _finish(response,etag,last_modified,cached)
+		return wrapper
+	return decorator
+
+
+
+# page stamps -------------------------------------------------------------------
+def employee_page_stamp(request,id):
+	'''
+	dashboard_employee_info -> the profile row, department/role names (refcache versions), age (year)
+	'''
+	from employee import refcache
+	from employee.models import Department,Employee,Role
+
+	row = Employee.objects.filter(id = id).values_list('updated').first()
+	if row is None:
+		return None
+	updated, = row
+	return updated,('employee',id,updated,refcache.version(Department),refcache.version(Role),datetime.date.today().year)
+
+
+
+def leave_page_stamp(request,id):
+	'''
+	leaves_view -> the leave, its requester's profile and for approvers the staffing forecast,
+	which follows every leave of the department (the department feed stamp) and the date
+	'''
+	from accounts.permissions import has_permission,APPROVE_LEAVES
+	from employee import refcache
+	from employee.models import Department,Role
+	from leave import feeds
+	from leave.models import Leave
+
+	row = Leave.objects.filter(id = id).values_list('updated','user__employee__updated','user__employee__department_id').first()
+	if row is None:
+		return None
+	updated,employee_updated,department_id = row
+	parts = ('leave',id,updated,employee_updated,refcache.version(Department),refcache.version(Role))
+	if has_permission(request.user,APPROVE_LEAVES):
+		parts += (feeds.feed_stamp(feeds.DEPARTMENT,department_id) if department_id else None,datetime.date.today())
+	return max(filter(None,(updated,employee_updated)),default = None),parts
@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+
+def live_updates(request):
+	'''
+	templates -> {% if live_updates %} open the leave event stream {% endif %}
+	'''
+	return {'live_updates':settings.LIVE_UPDATES}
@@ -0,0 +1,158 @@
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.http import JsonResponse
+
+
+'''
+DataTables server-side processing (https://datatables.net/manual/server-side).
+the browser sends draw,start,length,search[value],order[i][column|dir] and columns[i][data|search][value],
+a table answers {"draw","recordsTotal","recordsFiltered","data"} for one page -> a 100k row table costs
+two counts and one LIMIT query with only() the shown fields, never the whole table.
+
+class LeaveTable(DataTable):
+	columns = (Column('user','user__username'),Column('status',search = EXACT),...)
+	def queryset(self,request): ...
+	def row(self,leave): ...
+
+LeaveTable().response(request)
+
+searches are case-insensitive prefix matches, as a range on LOWER(field) (LOWER(field) >= term and
+< term + highest char, like the user autocomplete) -> an index range scan where an expression index
+exists (directory columns: employee migration 0009, usernames: accounts migration 0003, sqlite and
+postgresql), or exact matches on choice columns. ordering follows the columns the browser asks for
+with the primary key last so pages never overlap.
+'''
+
+PREFIX = 'prefix'
+EXACT = 'exact'
+
+MAX_LENGTH = 500 # rows per page at most, also for length=-1 ("all")
+
+
+
+class Column:
+	'''
+	name -> the columns[i][data] the browser uses, field -> the orm lookup to search and sort on
+	search -> PREFIX, EXACT or None (not searchable)
+	'''
+	def __init__(self,name,field = None,search = PREFIX,orderable = True):
+		self.name = name
+		self.field = field or name
+		self.search = search
+		self.orderable = orderable
+
+
+	@property
+	def lowered(self):
+		'''
+		the LOWER(field) annotation a prefix search filters on
+		'''
+		return self.field.replace('__','_') + '_lower'
+
+
+	def filter(self,term):
+		if self.search == EXACT:
+			return Q(**{self.field:term})
+		term = term.lower()
+		return Q(**{self.lowered + '__gte':term,self.lowered + '__lt':term + '\U0010ffff'})
+
+
+
+def _int(value,default):
+	try:
+		return int(value)
+	except (TypeError,ValueError):
+		return default
+
+
+
+class DataTable:
+	columns = ()
+	default_order = ('-pk',)
+
+
+	def queryset(self,request):
+		raise NotImplementedError
+
+
+	def row(self,obj):
+		raise NotImplementedError
+
+
+	def _requested(self,params):
+		'''
+		columns[i][data] -> our Column, by index as the order parameters refer to them
+		'''
+		by_name = {column.name:column for column in self.columns}
+		requested = dict()
+		index = 0
+		while 'columns[{0}][data]'.format(index) in params:
+			column = by_name.get(params['columns[{0}][data]'.format(index)])
+			if column is not None:
+				requested[index] = column
+			index += 1
+		return requested
+
+
+	def search(self,queryset,params,requested):
+		'''
+		the global search matches any searchable column, column searches all have to match.
+		LOWER(field) is only annotated when a prefix search runs
+		'''
+		queries = []
+		term = params.get('search[value]','').strip()
+		if term:
+			query = Q()
+			for column in self.columns:
+				if column.search is not None:
+					query |= column.filter(term)
+			queries.append(query)
+		for index,column in requested.items():
+			term = params.get('columns[{0}][search][value]'.format(index),'').strip()
+			if term and column.search is not None:
+				queries.append(column.filter(term))
+		if not queries:
+			return queryset
+		queryset = queryset.annotate(**{column.lowered:Lower(column.field) for column in self.columns if column.search == PREFIX})
+		for query in queries:
+			queryset = queryset.filter(query)
+		return queryset
+
+
+	def order(self,queryset,params,requested):
+		ordering = []
+		index = 0
+		while 'order[{0}][column]'.format(index) in params:
+			column = requested.get(_int(params['order[{0}][column]'.format(index)],None))
+			if column is not None and column.orderable:
+				ordering.append(('-' if params.get('order[{0}][dir]'.format(index)) == 'desc' else '') + column.field)
+			index += 1
+		ordering = ordering or list(self.default_order)
+		if not any(field.lstrip('-') in ('pk','id') for field in ordering):
+			ordering.append('-pk')
+		return queryset.order_by(*ordering)
+
+
+	def response(self,request):
+		'''
+		one page for the request's GET (or POST) parameters -> JsonResponse
+		'''
+		params = request.POST if request.method == 'POST' else request.GET
+		draw = _int(params.get('draw'),0)
+		start = max(_int(params.get('start'),0),0)
+		length = _int(params.get('length'),10)
+		length = MAX_LENGTH if length < 0 else min(length,MAX_LENGTH)
+
+		queryset = self.queryset(request)
+		requested = self._requested(params)
+		filtered = self.search(queryset,params,requested)
+		total = queryset.count()
+		count = total if filtered is queryset else filtered.count()
+		page = self.order(filtered,params,requested)[start:start + length]
+
+		return JsonResponse({
+			'draw':draw,
+			'recordsTotal':total,
+			'recordsFiltered':count,
+			'data':[self.row(obj) for obj in page],
+		})
@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+
+
+'''
+WSGI (sync views) vs ASGI (async views) under the same synthetic load.
+each deployment runs in its own process against a throw-away in-memory test database,
+requests go straight into the handler (no network), so the numbers compare the request
+handling paths and the views only.
+
+python manage.py benchmark_asgi --requests 2000 --concurrency 32
+'''
+
+
+
+def percentile(values,fraction):
+	values = sorted(values)
+	if not values:
+		return 0.0
+	return values[min(len(values) - 1,int(round(fraction * (len(values) - 1))))]
+
+
+
+class Command(BaseCommand):
+	help = 'Compare requests/second and p99 latency of the WSGI and ASGI deployments'
+
+	def add_arguments(self,parser):
+		parser.add_argument('--requests',type = int,default = 1000,help = 'requests per deployment')
+		parser.add_argument('--concurrency',type = int,default = 16)
+		parser.add_argument('--employees',type = int,default = 200,help = 'synthetic employees (each gets --leaves-each leaves)')
+		parser.add_argument('--leaves-each',type = int,default = 3)
+		parser.add_argument('--worker',choices = ['wsgi','asgi'],help = argparse_suppress())
+
+
+	def handle(self,*args,**options):
+		if options['worker']:
+			return self.run_worker(options)
+
+		results = []
+		for mode in ('wsgi','asgi'):
+			env = dict(os.environ,HRSUIT_ASGI = '1' if mode == 'asgi' else '0')
+			command = [sys.executable,sys.argv[0],'benchmark_asgi','--worker',mode]
+			for name in ('requests','concurrency','employees','leaves_each'):
+				command += ['--' + name.replace('_','-'),str(options[name])]
+			output = subprocess.run(command,env = env,check = True,stdout = subprocess.PIPE,universal_newlines = True).stdout
+			results.append(json.loads(output.strip().splitlines()[-1]))
+
+		self.stdout.write('{0:<6} {1:>10} {2:>10} {3:>10}'.format('mode','req/s','p50 ms','p99 ms'))
+		for result in results:
+			self.stdout.write('{mode:<6} {rps:>10.1f} {p50:>10.2f} {p99:>10.2f}'.format(**result))
+
+
+
+	# worker process ---------------------------------------------------------
+	def run_worker(self,options):
+		from django.test import Client
+		from django.test.utils import setup_test_environment
+
+		# test clients always send Host: testserver
+		setup_test_environment()
+		connection.creation.create_test_db(verbosity = 0,autoclobber = True)
+		admin,urls = self.seed(options['employees'],options['leaves_each'])
+
+		client = Client()
+		client.force_login(admin)
+		if options['worker'] == 'wsgi':
+			timings,elapsed = self.run_wsgi(client.cookies,urls,options['requests'],options['concurrency'])
+		else:
+			timings,elapsed = asyncio.run(self.run_asgi(client.cookies,urls,options['requests'],options['concurrency']))
+
+		self.stdout.write(json.dumps({
+			'mode':options['worker'],
+			'async_views':settings.ASYNC_READ_VIEWS,
+			'requests':len(timings),
+			'rps':len(timings) / elapsed,
+			'p50':percentile(timings,0.50) * 1000,
+			'p99':percentile(timings,0.99) * 1000,
+		}))
+
+
+	def seed(self,employees,leaves_each):
+		from django.contrib.auth.models import User
+		from employee.models import Employee,Department
+		from leave.models import Leave
+
+		department = Department.objects.create(name = 'Benchmark')
+		admin = User.objects.create_superuser('benchmark','benchmark@example.com','benchmark')
+		profile = Employee.objects.create(user = admin,firstname = 'Bench',lastname = 'Mark',birthday = datetime.date(1990,1,1),department = department)
+
+		users = User.objects.bulk_create([User(username = 'user{0}'.format(i)) for i in range(employees)])
+		users = list(User.objects.filter(username__startswith = 'user'))
+		for i,user in enumerate(users):
+			Employee.objects.create(user = user,firstname = 'First{0}'.format(i),lastname = 'Last',birthday = datetime.date(1980 + i % 20,1 + i % 12,1 + i % 28),department = department)
+
+		start = datetime.date.today() + datetime.timedelta(days = 7)
+		statuses = ['pending','approved','cancelled','rejected']
+		Leave.objects.bulk_create([
+			Leave(user = user,startdate = start,enddate = start + datetime.timedelta(days = 1 + n),status = statuses[(i + n) % 4],is_approved = statuses[(i + n) % 4] == 'approved')
+			for i,user in enumerate(users) for n in range(leaves_each)
+		])
+
+		urls = [
+			reverse('dashboard:dashboard'),
+			reverse('dashboard:leaveslist'),
+			reverse('dashboard:approvedleaveslist'),
+			reverse('dashboard:staffleavetable'),
+			reverse('dashboard:employeeinfo',args = [profile.id]),
+		]
+		return admin,urls
+
+
+	def run_wsgi(self,cookies,urls,requests,concurrency):
+		from django.test import Client
+
+		def worker(indexes):
+			client = Client()
+			client.cookies = cookies
+			timings = []
+			for i in indexes:
+				began = time.perf_counter()
+				response = client.get(urls[i % len(urls)])
+				timings.append(time.perf_counter() - began)
+				assert response.status_code == 200,response.status_code
+			return timings
+
+		began = time.perf_counter()
+		with ThreadPoolExecutor(concurrency) as pool:
+			chunks = pool.map(worker,[range(n,requests,concurrency) for n in range(concurrency)])
+			timings = [timing for chunk in chunks for timing in chunk]
+		return timings,time.perf_counter() - began
+
+
+	async def run_asgi(self,cookies,urls,requests,concurrency):
+		from django.test import AsyncClient
+
+		async def worker(indexes):
+			client = AsyncClient()
+			client.cookies = cookies
+			timings = []
+			for i in indexes:
+				began = time.perf_counter()
+				response = await client.get(urls[i % len(urls)])
+				timings.append(time.perf_counter() - began)
+				assert response.status_code == 200,response.status_code
+			return timings
+
+		began = time.perf_counter()
+		chunks = await asyncio.gather(*[worker(range(n,requests,concurrency)) for n in range(concurrency)])
+		return [timing for chunk in chunks for timing in chunk],time.perf_counter() - began
+
+
+
+def argparse_suppress():
+	import argparse
+	return argparse.SUPPRESS
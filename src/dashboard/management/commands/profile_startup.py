@@ -0,0 +1,134 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from django.core.management.base import BaseCommand
+
+
+'''
+cold start profile - what a freshly started worker pays before it serves its first request.
+each run is a new interpreter under -X importtime: django.setup(), loading the urlconf (every view
+module), then one request through the test client. reported: the phase timings, the slowest imports
+and whether the heavy optional libraries were loaded at startup (they should load on first use).
+
+python manage.py profile_startup --runs 5 --save startup.json
+python manage.py profile_startup --baseline startup.json   <- compare after a change
+'''
+
+# optional dependencies that must not load before they are used
+HEAVY = ('numpy','pandas','weasyprint','reportlab','phonenumbers','PIL')
+
+PROBE = '''
+import json,os,sys,time
+began = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+from django.test import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+status = Client().get(sys.argv[1]).status_code
+served = time.perf_counter()
+print(json.dumps({{
+	'setup':setup - began,
+	'urlconf':urls - setup,
+	'first_request':served - urls,
+	'total':served - began,
+	'status':status,
+	'heavy':sorted(name for name in {heavy!r} if name in sys.modules),
+}}))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+
+def parse_importtime(stderr):
+	'''
+	-X importtime output -> {module:(self us,cumulative us,depth)}
+	'''
+	modules = dict()
+	for line in stderr.splitlines():
+		match = IMPORT_LINE.match(line)
+		if match:
+			own,cumulative,indent,name = match.groups()
+			modules[name] = (int(own),int(cumulative),len(indent) // 2)
+	return modules
+
+
+
+class Command(BaseCommand):
+	help = 'Report per-module import time and time to first request of a cold worker'
+
+	def add_arguments(self,parser):
+		parser.add_argument('--runs',type = int,default = 3,help = 'fresh interpreters, timings are the median')
+		parser.add_argument('--path',default = '/',help = 'url of the first request')
+		parser.add_argument('--top',type = int,default = 20,help = 'slowest imports to list')
+		parser.add_argument('--save',help = 'write the summary as json (a baseline for later runs)')
+		parser.add_argument('--baseline',help = 'json written by --save to compare against')
+
+
+	def handle(self,*args,**options):
+		runs = [self.run_once(options['path']) for _ in range(options['runs'])]
+		phases = ('setup','urlconf','first_request','total')
+		summary = {phase:statistics.median(run[phase] for run,_ in runs) * 1000 for phase in phases}
+		summary['heavy'] = runs[-1][0]['heavy']
+		summary['status'] = runs[-1][0]['status']
+
+		modules = runs[-1][1]
+		packages = dict()
+		for name,(own,cumulative,depth) in modules.items():
+			top = name.split('.')[0]
+			packages[top] = packages.get(top,0) + own
+		summary['packages'] = {name:own / 1000.0 for name,own in packages.items()}
+
+		baseline = None
+		if options['baseline']:
+			with open(options['baseline']) as handle:
+				baseline = json.load(handle)
+
+		self.stdout.write('phase              ms' + ('   baseline' if baseline else ''))
+		for phase in phases:
+			line = '{0:<15} {1:>8.1f}'.format(phase,summary[phase])
+			if baseline:
+				line += '   {0:>8.1f} ({1:+.1f})'.format(baseline[phase],summary[phase] - baseline[phase])
+			self.stdout.write(line)
+		self.stdout.write('first request {0} -> {1}'.format(options['path'],summary['status']))
+		self.stdout.write('heavy modules loaded at startup: {0}'.format(', '.join(summary['heavy']) or 'none'))
+		if baseline:
+			self.stdout.write('  baseline: {0}'.format(', '.join(baseline['heavy']) or 'none'))
+
+		self.stdout.write('\nslowest imports (cumulative ms, self ms)')
+		for name,(own,cumulative,depth) in sorted(modules.items(),key = lambda item:-item[1][1])[:options['top']]:
+			self.stdout.write('{0:>8.1f} {1:>8.1f}  {2}{3}'.format(cumulative / 1000.0,own / 1000.0,'  ' * min(depth,6),name))
+
+		self.stdout.write('\nself time by top level package (ms)')
+		for name,own in sorted(summary['packages'].items(),key = lambda item:-item[1])[:options['top']]:
+			line = '{0:>8.1f}  {1}'.format(own,name)
+			if baseline and name in baseline['packages']:
+				line += '  ({0:+.1f})'.format(own - baseline['packages'][name])
+			self.stdout.write(line)
+
+		if options['save']:
+			with open(options['save'],'w') as handle:
+				json.dump(summary,handle,indent = 1)
+
+
+	def run_once(self,path):
+		probe = subprocess.run(
+			[sys.executable,'-X','importtime','-c',PROBE.format(heavy = HEAVY),path],
+			env = dict(os.environ),
+			cwd = os.getcwd(),
+			stdout = subprocess.PIPE,
+			stderr = subprocess.PIPE,
+			universal_newlines = True,
+		)
+		if probe.returncode != 0:
+			self.stderr.write(probe.stderr[-3000:])
+			raise SystemExit(probe.returncode)
+		return json.loads(probe.stdout.strip().splitlines()[-1]),parse_importtime(probe.stderr)
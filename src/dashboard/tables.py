@@ -0,0 +1,97 @@
+from django.db.models import DurationField,ExpressionWrapper,F
+from django.urls import reverse
+from employee.models import EmployeeDirectory
+from leave.models import Leave
+from .datatables import Column,DataTable,EXACT
+
+
+'''
+server-side tables of the dashboard (see dashboard/datatables.py) - employees from the directory
+read table, leaves with just the fields the tables show
+'''
+
+
+
+class EmployeeTable(DataTable):
+	columns = (
+		Column('employeeid'),
+		Column('fullname'),
+		Column('username'),
+		Column('department','department_name'),
+		Column('role','role_name'),
+		Column('age_band',search = EXACT),
+	)
+	default_order = ('-created',)
+
+
+	def queryset(self,request):
+		return EmployeeDirectory.objects.filter(is_deleted = False).only(
+			'employee_id','employeeid','fullname','username','department_name','role_name','age_band','avatar_url',
+		)
+
+
+	def row(self,entry):
+		return {
+			'DT_RowId':'employee-{0}'.format(entry.employee_id),
+			'employeeid':entry.employeeid,
+			'fullname':entry.fullname,
+			'username':entry.username,
+			'department':entry.department_name,
+			'role':entry.role_name,
+			'age_band':entry.age_band,
+			'avatar_url':entry.avatar_url,
+			'url':reverse('dashboard:employeeinfo',args = [entry.employee_id]),
+		}
+
+
+
+class LeaveTable(DataTable):
+	'''
+	scope -> a status ('pending','approved','cancelled','rejected') for approvers, 'mine' for the
+	requester's own leaves
+	'''
+	SCOPES = ('pending','approved','cancelled','rejected','mine')
+	ACTIONS = {'approved':'dashboard:userleaveunapprove','cancelled':'dashboard:userleaveuncancel','rejected':'dashboard:unreject'}
+
+	columns = (
+		Column('user','user__username'),
+		Column('leavetype',search = EXACT),
+		Column('startdate',search = None),
+		Column('enddate',search = None),
+		Column('days',search = None),
+		Column('status',search = EXACT),
+		Column('created',search = None),
+	)
+	default_order = ('-created',)
+
+
+	def __init__(self,scope):
+		self.scope = scope
+
+
+	def queryset(self,request):
+		leaves = Leave.objects.select_related('user').only(
+			'id','user__username','leavetype','startdate','enddate','status','is_approved','created',
+		).annotate(days = ExpressionWrapper(F('enddate') - F('startdate'),output_field = DurationField()))
+		if self.scope == 'mine':
+			return leaves.filter(user = request.user)
+		return leaves.filter(status = self.scope)
+
+
+	def row(self,leave):
+		action = self.ACTIONS.get(self.scope)
+		if self.scope == 'cancelled' and leave.is_approved:
+			action = None # approved leaves can't be uncancelled
+		return {
+			'DT_RowId':'leave-{0}'.format(leave.id),
+			'user':leave.user.username,
+			'leavetype':leave.get_leavetype_display(),
+			'startdate':leave.startdate,
+			'enddate':leave.enddate,
+			'days':leave.days.days if leave.days is not None and leave.days.days >= 0 else None,
+			'status':leave.status,
+			'is_approved':leave.is_approved,
+			'created':leave.created,
+			'url':reverse('dashboard:userleaveview',args = [leave.id]),
+			'action':reverse(action,args = [leave.id]) if action else None,
+		}
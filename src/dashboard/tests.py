@@ -1,3 +1,109 @@
+import datetime
+from unittest import mock
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from employee.models import Department,Employee
+from leave.models import Leave
 
-# Create your tests here.
+
+
+def columns(*names):
+	'''
+	the columns[i][data] parameters DataTables sends for the table's columns
+	'''
+	return {'columns[{0}][data]'.format(index):name for index,name in enumerate(names)}
+
+
+
+class LeaveTableTests(TestCase):
+	def setUp(self):
+		self.admin = User.objects.create_superuser('admin')
+		self.client.force_login(self.admin)
+		self.users = [User.objects.create_user(name) for name in ('ada','Adele','bob')]
+		self.leaves = [
+			Leave.objects.create(user = user,startdate = datetime.date(2026,3,2),enddate = datetime.date(2026,3,2) + datetime.timedelta(days = days))
+			for user,days in zip(self.users,(4,1,2))
+		]
+
+
+	def page(self,status = 'pending',**params):
+		return self.client.get(reverse('dashboard:leavesdata',args = [status]),params).json()
+
+
+	def test_paging(self):
+		page = self.page(draw = 3,start = 1,length = 1,**columns('user','days'),**{'order[0][column]':'1','order[0][dir]':'asc'})
+		self.assertEqual((page['draw'],page['recordsTotal'],page['recordsFiltered']),(3,3,3))
+		self.assertEqual([row['user'] for row in page['data']],['bob'])
+		self.assertEqual(self.page(start = 10)['data'],[])
+
+
+	def test_ordering(self):
+		page = self.page(**columns('user','days'),**{'order[0][column]':'1','order[0][dir]':'desc'})
+		self.assertEqual([(row['user'],row['days']) for row in page['data']],[('ada',4),('bob',2),('Adele',1)])
+		page = self.page(**columns('user'),**{'order[0][column]':'7'})# unknown columns fall back to the newest first
+		self.assertEqual([row['user'] for row in page['data']],['bob','Adele','ada'])
+
+
+	def test_search(self):
+		page = self.page(**{'search[value]':'AD'})
+		self.assertEqual((page['recordsTotal'],page['recordsFiltered']),(3,2))
+		self.assertEqual(sorted(row['user'] for row in page['data']),['Adele','ada'])
+		page = self.page(**columns('user','status'),**{'columns[0][search][value]':'b','columns[1][search][value]':'pending'})
+		self.assertEqual([row['user'] for row in page['data']],['bob'])
+		self.assertEqual(self.page(**{'search[value]':'pend'})['recordsFiltered'],0)# choice columns match exactly
+
+
+	def test_length_capped(self):
+		with mock.patch('dashboard.datatables.MAX_LENGTH',2):
+			self.assertEqual(len(self.page(length = -1)['data']),2)
+			self.assertEqual(len(self.page(length = 1000)['data']),2)
+
+
+	def test_scopes(self):
+		Leave.objects.filter(pk = self.leaves[0].pk).update(status = 'cancelled',is_approved = True)
+		Leave.objects.filter(pk = self.leaves[1].pk).update(status = 'cancelled')
+		page = self.page('cancelled',**columns('days'),**{'order[0][column]':'0'})
+		self.assertEqual([(row['user'],row['action']) for row in page['data']],[
+			('Adele',reverse('dashboard:userleaveuncancel',args = [self.leaves[1].pk])),
+			('ada',None),# approved leaves can't be uncancelled
+		])
+		self.assertEqual(self.client.get(reverse('dashboard:leavesdata',args = ['mine'])).status_code,404)
+
+		self.client.force_login(self.users[2])
+		page = self.client.get(reverse('dashboard:staffleavetabledata')).json()
+		self.assertEqual([row['DT_RowId'] for row in page['data']],['leave-{0}'.format(self.leaves[2].pk)])
+
+
+	def test_list_pages_load_no_rows(self):
+		for name in ('leaveslist','approvedleaveslist','canceleaveslist','leavesrejected','staffleavetable'):
+			response = self.client.get(reverse('dashboard:' + name))
+			self.assertContains(response,'data-leave-list=')
+			self.assertNotIn('leave_list',response.context)
+
+
+
+class EmployeeTableTests(TestCase):
+	def setUp(self):
+		self.client.force_login(User.objects.create_superuser('admin'))
+		research = Department.objects.create(name = 'Research')
+		for name,department in (('ada',research),('grace',None),('linus',research)):
+			Employee.objects.create(user = User.objects.create_user(name),firstname = name.title(),lastname = 'Test',birthday = datetime.date(1990,1,1),department = department)
+
+
+	def page(self,**params):
+		return self.client.get(reverse('dashboard:employeesdata'),params).json()
+
+
+	def test_search_any_case(self):
+		page = self.page(**{'search[value]':'rES'})
+		self.assertEqual(sorted(row['username'] for row in page['data']),['ada','linus'])
+		page = self.page(**columns('fullname','department'),**{'columns[0][search][value]':'grace t'})
+		self.assertEqual([row['fullname'] for row in page['data']],['Grace Test'])
+
+
+	def test_rows(self):
+		page = self.page(**columns('username'),**{'order[0][column]':'0','length':'1'})
+		self.assertEqual((page['recordsTotal'],page['recordsFiltered']),(3,3))
+		self.assertEqual(page['data'][0]['username'],'ada')
+		self.assertEqual(page['data'][0]['department'],'Research')
@@ -1,16 +1,23 @@
+from django.conf import settings
 from django.urls import path
 from .import views
+from .import async_views
+
+
+# read heavy pages are served by their async versions under ASGI (hrsuit/asgi.py)
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 
 app_name = 'dashboard'
 
 urlpatterns = [
-    path('welcome/',views.dashboard,name='dashboard'),
+    path('welcome/',read_views.dashboard,name='dashboard'),
 
     # Employee
     path('employees/all/',views.dashboard_employees,name='employees'),
+    path('employees/data/',views.employees_data,name='employeesdata'),
     path('employee/create/',views.dashboard_employees_create,name='employeecreate'),
-    path('employee/profile/<int:id>/',views.dashboard_employee_info,name='employeeinfo'),
+    path('employee/profile/<int:id>/',read_views.dashboard_employee_info,name='employeeinfo'),
     path('employee/profile/edit/<int:id>/',views.employee_edit_data,name='edit'),
 
     # # Emergency
@@ -27,20 +34,27 @@ urlpatterns = [
     #---work-on-edit-view------#
     # path('bank/edit/<int:id>/',views.employee_bank_account_update,name='accountedit'),
     path('leave/apply/',views.leave_creation,name='createleave'),
-    path('leaves/pending/all/',views.leaves_list,name='leaveslist'),
-    path('leaves/approved/all/',views.leaves_approved_list,name='approvedleaveslist'),
-    path('leaves/cancel/all/',views.cancel_leaves_list,name='canceleaveslist'),
+    path('leaves/pending/all/',read_views.leaves_list,name='leaveslist'),
+    path('leaves/approved/all/',read_views.leaves_approved_list,name='approvedleaveslist'),
+    path('leaves/cancel/all/',read_views.cancel_leaves_list,name='canceleaveslist'),
     path('leaves/all/view/<int:id>/',views.leaves_view,name='userleaveview'),
-    path('leaves/view/table/',views.view_my_leave_table,name='staffleavetable'),
+    path('leaves/view/table/',read_views.view_my_leave_table,name='staffleavetable'),
+    path('leaves/view/table/data/',views.my_leaves_data,name='staffleavetabledata'),
+    path('leaves/<str:status>/data/',views.leaves_data,name='leavesdata'),
     path('leave/approve/<int:id>/',views.approve_leave,name='userleaveapprove'),
     path('leave/unapprove/<int:id>/',views.unapprove_leave,name='userleaveunapprove'),
     path('leave/cancel/<int:id>/',views.cancel_leave,name='userleavecancel'),
     path('leave/uncancel/<int:id>/',views.uncancel_leave,name='userleaveuncancel'),
-    path('leaves/rejected/all/',views.leave_rejected_list,name='leavesrejected'),
+    path('leaves/rejected/all/',read_views.leave_rejected_list,name='leavesrejected'),
     path('leave/reject/<int:id>/',views.reject_leave,name='reject'),
     path('leave/unreject/<int:id>/',views.unreject_leave,name='unreject'),
+    path('leaves/stream/',views.leave_stream,name='leavestream'),
+    path('leaves/feed/<str:token>.ics',views.leave_feed,name='leavefeed'),
+    path('leave/letter/<int:id>/',views.leave_letter,name='leaveletter'),
+    path('leaves/inbox/',views.approval_inbox,name='approvalinbox'),
+    path('leave/inbox/<int:id>/<str:decision>/',views.approval_decide,name='approvaldecide'),
     # BIRTHDAY ROUTE
-    # path('birthdays/all/',views.birthday_this_month,name='birthdays'),
+    path('birthdays/all/',views.birthday_this_month,name='birthdays'),
 
 
 
@@ -1,17 +1,27 @@
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.shortcuts import render,redirect,get_object_or_404
-from django.http import HttpResponse,HttpResponseRedirect
+from django.http import FileResponse,HttpResponse,HttpResponseRedirect,Http404,StreamingHttpResponse
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db.models import Q
 import datetime
 from django.core.mail import send_mail
+from django.core.cache import cache
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.urls import reverse
+from django.views.decorators.http import condition,require_POST
 from employee.forms import EmployeeCreateForm
-from leave.models import Leave
+from leave.models import Leave,ApprovalTask
+from leave import approvals,feeds,forecast,letters,streams
+from hrsuit import metrics,tenancy
+from .conditional import conditional_page,employee_page_stamp,leave_page_stamp
+from .tables import EmployeeTable,LeaveTable
+from accounts.permissions import has_permission
 from employee.models import *
+from employee.identity import get_employee
+from employee import refcache
 from leave.forms import LeaveCreationForm
+from accounts.permissions import action_required,APPROVE_LEAVES,MANAGE_EMPLOYEES
 
 
 def dashboard(request):
@@ -28,16 +38,9 @@ def dashboard(request):
 	if not request.user.is_authenticated:
 		return redirect('accounts:login')
 
-	employees = Employee.objects.all()
-	leaves = Leave.objects.all_pending_leaves()
-	
-	staff_leaves = Leave.objects.filter(user = user)
-
-	
-	dataset['employees'] = employees
-	dataset['leaves'] = leaves
-	
-	dataset['staff_leaves'] = staff_leaves
+	dataset['employee_count'] = Employee.objects.count()
+	dataset['pending_count'] = Leave.objects.all_pending_leaves().count()
+	dataset['staff_leave_count'] = Leave.objects.filter(user = user).count()
 	dataset['title'] = 'summary'
 	
 
@@ -46,21 +49,18 @@ def dashboard(request):
 
 
 
+@action_required(MANAGE_EMPLOYEES)
 def dashboard_employees(request):
-	if not (request.user.is_authenticated and request.user.is_superuser and request.user.is_staff):
-		return redirect('/')
-
+	'''
+	employee list -> from the directory read table, every query hits that single table
+	'''
 	dataset = dict()
-	departments = Department.objects.all()
-	employees = Employee.objects.all()
+	employees = EmployeeDirectory.objects.filter(is_deleted = False)
 
 	#pagination
 	query = request.GET.get('search')
 	if query:
-		employees = employees.filter(
-			Q(firstname__icontains = query) |
-			Q(lastname__icontains = query)
-		)
+		employees = employees.filter(fullname__icontains = query)
 
 
 
@@ -70,19 +70,25 @@ def dashboard_employees(request):
 	employees_paginated = paginator.get_page(page)
 
 
+	dataset['all_employees'] = employees
+	dataset['employees'] = employees_paginated
+	dataset['query'] = query
+	return render(request,'dashboard/employee_app.html',dataset)
 
-	blocked_employees = Employee.objects.all_blocked_employees()
 
 
-	return render(request,'dashboard/employee_app.html',dataset)
 
+@action_required(MANAGE_EMPLOYEES)
+def employees_data(request):
+	'''
+	DataTables server-side json for the employees table
+	'''
+	return EmployeeTable().response(request)
 
 
 
+@action_required(MANAGE_EMPLOYEES)
 def dashboard_employees_create(request):
-	if not (request.user.is_authenticated and request.user.is_superuser and request.user.is_staff):
-		return redirect('/')
-
 	if request.method == 'POST':
 		form = EmployeeCreateForm(request.POST,request.FILES)
 		if form.is_valid():
@@ -107,8 +113,7 @@ def dashboard_employees_create(request):
 
 
 			role = request.POST.get('role')
-			role_instance = Role.objects.get(id = role)
-			instance.role = role_instance
+			instance.role = refcache.get(Role,role)
 
 			instance.startdate = request.POST.get('startdate')
 			instance.employeetype = request.POST.get('employeetype')
@@ -134,9 +139,8 @@ def dashboard_employees_create(request):
 	return render(request,'dashboard/employee_create.html',dataset)
 
 
+@action_required(MANAGE_EMPLOYEES)
 def employee_edit_data(request,id):
-	if not (request.user.is_authenticated and request.user.is_superuser and request.user.is_staff):
-		return redirect('/')
 	employee = get_object_or_404(Employee, id = id)
 	if request.method == 'POST':
 		form = EmployeeCreateForm(request.POST or None,request.FILES or None,instance = employee)
@@ -155,17 +159,8 @@ def employee_edit_data(request,id):
 			
 			instance.birthday = request.POST.get('birthday')
 
-			religion_id = request.POST.get('religion')
-			religion = Religion.objects.get(id = religion_id)
-			instance.religion = religion
-
-			nationality_id = request.POST.get('nationality')
-			nationality = Nationality.objects.get(id = nationality_id)
-			instance.nationality = nationality
-
 			department_id = request.POST.get('department')
-			department = Department.objects.get(id = department_id)
-			instance.department = department
+			instance.department = refcache.get(Department,department_id)
 
 
 			instance.hometown = request.POST.get('hometown')
@@ -179,8 +174,7 @@ def employee_edit_data(request,id):
 			instance.tinnumber = request.POST.get('tinnumber')
 
 			role = request.POST.get('role')
-			role_instance = Role.objects.get(id = role)
-			instance.role = role_instance
+			instance.role = refcache.get(Role,role)
 
 			instance.startdate = request.POST.get('startdate')
 			instance.employeetype = request.POST.get('employeetype')
@@ -211,6 +205,7 @@ def employee_edit_data(request,id):
 
 
 
+@conditional_page(employee_page_stamp,'dashboard/employee_detail.html')
 def dashboard_employee_info(request,id):
 	if not request.user.is_authenticated:
 		return redirect('/')
@@ -228,8 +223,40 @@ def dashboard_employee_info(request,id):
 
 
 
+def birthday_this_month(request):
+	'''
+	dashboard widget -> upcoming birthdays and work anniversaries for the next ?days= (default 30)
+	rendered fragment is cached per day, so the feed costs one index range scan per query per day
+	'''
+	if not request.user.is_authenticated:
+		return redirect('accounts:login')
+
+	try:
+		days = max(1,min(int(request.GET.get('days',30)),366))
+	except ValueError:
+		days = 30
+
+	today = datetime.date.today()
+	key = 'dashboard:birthdays:{0}:{1}'.format(today.isoformat(),days)
+	html = cache.get(key)
+	if html is None:
+		dataset = dict()
+		dataset['birthdays'] = Employee.objects.upcoming_birthdays(days,today = today).only('id','firstname','lastname','othername','birthday')
+		dataset['anniversaries'] = Employee.objects.upcoming_anniversaries(days,today = today).only('id','firstname','lastname','othername','startdate')
+		dataset['days'] = days
+		html = render_to_string('dashboard/birthdays_widget.html',dataset)
+		cache.set(key,html,60 * 15)
+	return HttpResponse(html)
+
+
+
+
+
+
 # ---------------------LEAVE-------------------------------------------
 
+LEAVE_SUBMISSIONS = metrics.counter('hrsuit_leave_submissions_total','leave requests submitted',('leavetype','tenant'))
+
 
 
 def leave_creation(request):
@@ -242,6 +269,9 @@ def leave_creation(request):
 			user = request.user
 			instance.user = user
 			instance.save()
+			approvals.start(instance,request.employee)
+			streams.publish_leaves([instance.id])
+			LEAVE_SUBMISSIONS.inc(instance.leavetype or '',tenancy.current_tenant() or '')
 
 
 			# print(instance.defaultdays)
@@ -265,31 +295,27 @@ def leave_creation(request):
 
 
 
+@action_required(APPROVE_LEAVES)
 def leaves_list(request):
-	if not (request.user.is_staff and request.user.is_superuser):
-		return redirect('/')
-	leaves = Leave.objects.all_pending_leaves()
-	return render(request,'dashboard/leaves_recent.html',{'leave_list':leaves,'title':'leaves list - pending'})
+	return render(request,'dashboard/leaves_recent.html',{'title':'leaves list - pending'})# rows from leaves_data
 
 
 
+@action_required(APPROVE_LEAVES)
 def leaves_approved_list(request):
-	if not (request.user.is_superuser and request.user.is_staff):
-		return redirect('/')
-	leaves = Leave.objects.all_approved_leaves() #approved leaves -> calling model manager method
-	return render(request,'dashboard/leaves_approved.html',{'leave_list':leaves,'title':'approved leave list'})
+	return render(request,'dashboard/leaves_approved.html',{'title':'approved leave list'})# rows from leaves_data
 
 
 
+@conditional_page(leave_page_stamp,'dashboard/leave_detail_view.html')
 def leaves_view(request,id):
 	if not (request.user.is_authenticated):
 		return redirect('/')
 
-	leave = get_object_or_404(Leave, id = id)
-	print(leave.user)
-	employee = Employee.objects.filter(user = leave.user)[0]
-	print(employee)
-	return render(request,'dashboard/leave_detail_view.html',{'leave':leave,'employee':employee,'title':'{0}-{1} leave'.format(leave.user.username,leave.status)})
+	leave = get_object_or_404(Leave.objects.select_related('user'), id = id)
+	employee = get_employee(leave.user_id)
+	staffing = forecast.leave_forecast(leave,employee) if has_permission(request.user,APPROVE_LEAVES) else None
+	return render(request,'dashboard/leave_detail_view.html',{'leave':leave,'employee':employee,'staffing':staffing,'title':'{0}-{1} leave'.format(leave.user.username,leave.status)})
 
 
 
@@ -299,29 +325,24 @@ def leaves_view(request,id):
 
 
 
+@action_required(APPROVE_LEAVES)
 def approve_leave(request,id):
-	if not (request.user.is_superuser and request.user.is_authenticated):
-		return redirect('/')
 	leave = get_object_or_404(Leave, id = id)
-	user = leave.user
-	employee = Employee.objects.filter(user = user)[0]
+	employee = get_employee(leave.user_id)
 	leave.approve_leave
 
 	messages.error(request,'Leave successfully approved for {0}'.format(employee.get_full_name),extra_tags = 'alert alert-success alert-dismissible show')
 	return redirect('dashboard:userleaveview', id = id)
 
 
+@action_required(APPROVE_LEAVES)
 def cancel_leaves_list(request):
-	if not (request.user.is_superuser and request.user.is_authenticated):
-		return redirect('/')
-	leaves = Leave.objects.all_cancel_leaves()
-	return render(request,'dashboard/leaves_cancel.html',{'leave_list_cancel':leaves,'title':'Cancel leave list'})
+	return render(request,'dashboard/leaves_cancel.html',{'title':'Cancel leave list'})# rows from leaves_data
 
 
 
+@action_required(APPROVE_LEAVES)
 def unapprove_leave(request,id):
-	if not (request.user.is_authenticated and request.user.is_superuser):
-		return redirect('/')
 	leave = get_object_or_404(Leave, id = id)
 	leave.unapprove_leave
 	return redirect('dashboard:leaveslist') #redirect to unapproved list
@@ -329,9 +350,8 @@ def unapprove_leave(request,id):
 
 
 
+@action_required(APPROVE_LEAVES)
 def cancel_leave(request,id):
-	if not (request.user.is_superuser and request.user.is_authenticated):
-		return redirect('/')
 	leave = get_object_or_404(Leave, id = id)
 	leave.leaves_cancel
 
@@ -340,28 +360,22 @@ def cancel_leave(request,id):
 
 
 # Current section -> here
+@action_required(APPROVE_LEAVES)
 def uncancel_leave(request,id):
-	if not (request.user.is_superuser and request.user.is_authenticated):
-		return redirect('/')
 	leave = get_object_or_404(Leave, id = id)
-	leave.status = 'pending'
-	leave.is_approved = False
-	leave.save()
+	leave.reset_leave
 	messages.success(request,'Leave is uncanceled,now in pending list',extra_tags = 'alert alert-success alert-dismissible show')
 	return redirect('dashboard:canceleaveslist')#work on redirecting to instance leave - detail view
 
 
 
+@action_required(APPROVE_LEAVES)
 def leave_rejected_list(request):
-
-	dataset = dict()
-	leave = Leave.objects.all_rejected_leaves()
-
-	dataset['leave_list_rejected'] = leave
-	return render(request,'dashboard/rejected_leaves_list.html',dataset)
+	return render(request,'dashboard/rejected_leaves_list.html',{'title':'rejected leave list'})# rows from leaves_data
 
 
 
+@action_required(APPROVE_LEAVES)
 def reject_leave(request,id):
 	dataset = dict()
 	leave = get_object_or_404(Leave, id = id)
@@ -372,28 +386,43 @@ def reject_leave(request,id):
 	# return HttpResponse(id)
 
 
+@action_required(APPROVE_LEAVES)
 def unreject_leave(request,id):
 	leave = get_object_or_404(Leave, id = id)
-	leave.status = 'pending'
-	leave.is_approved = False
-	leave.save()
+	leave.reset_leave
 	messages.success(request,'Leave is now in pending list ',extra_tags = 'alert alert-success alert-dismissible show')
 
 	return redirect('dashboard:leavesrejected')
 
 
 
+@action_required(APPROVE_LEAVES)
+def leaves_data(request,status):
+	'''
+	DataTables server-side json for the pending/approved/cancelled/rejected leave tables
+	'''
+	if status not in LeaveTable.SCOPES or status == 'mine':
+		raise Http404
+	return LeaveTable(status).response(request)
+
+
+
+def my_leaves_data(request):
+	if not request.user.is_authenticated:
+		return redirect('accounts:login')
+	return LeaveTable('mine').response(request)
+
+
+
 #  staffs leaves table user only
 def view_my_leave_table(request):
 	# work on the logics
 	if request.user.is_authenticated:
 		user = request.user
-		leaves = Leave.objects.filter(user = user)
-		employee = Employee.objects.filter(user = user).first()
-		print(leaves)
+		employee = request.employee
 		dataset = dict()
-		dataset['leave_list'] = leaves
-		dataset['employee'] = employee
+		dataset['employee'] = employee# rows from my_leaves_data
+		dataset['feeds'] = feeds.feed_urls(user,employee)
 		dataset['title'] = 'Leaves List'
 	else:
 		return redirect('accounts:login')
@@ -403,3 +432,104 @@ def view_my_leave_table(request):
 
 
 
+# live dashboard updates (server-sent events) - see leave/streams.py
+def leave_stream(request):
+	if not request.user.is_authenticated:
+		return HttpResponse('login required',status = 403)
+	subscription = streams.Subscription(request.user.id,has_permission(request.user,APPROVE_LEAVES))
+	if settings.LIVE_UPDATES:
+		events = streams.sync_events(subscription,streams.initial_events(subscription))
+	else:
+		events = streams.single_batch(streams.initial_events(subscription))# WSGI: never hold a worker for an open tab
+	response = StreamingHttpResponse(events,content_type = 'text/event-stream')
+	response['Cache-Control'] = 'no-cache'
+	response['X-Accel-Buffering'] = 'no'
+	return response
+
+
+
+
+
+# pdf approval letter - rendered in the background on approval, see leave/letters.py
+def leave_letter(request,id):
+	if not request.user.is_authenticated:
+		return redirect('accounts:login')
+	leave = get_object_or_404(Leave,id = id,status = 'approved')
+	if leave.user_id != request.user.id and not has_permission(request.user,APPROVE_LEAVES):
+		raise Http404
+
+	path,data = letters.letter_file(leave.id)
+	if path is None:
+		letters.queue([leave.id])
+		messages.success(request,'The approval letter is being prepared, try again in a moment',extra_tags = 'alert alert-success alert-dismissible show')
+		return redirect('dashboard:userleaveview',id = id)
+	return FileResponse(open(path,'rb'),as_attachment = True,filename = 'leave-letter-{0}.pdf'.format(leave.id),content_type = 'application/pdf')
+
+
+
+
+
+# calendar feeds (.ics) - the signed token in the url is the credential (checked against its holder), see leave/feeds.py
+def _feed(request,token):
+	if not hasattr(request,'feed'):
+		request.feed = feeds.open_feed(token)# one holder lookup per request
+	return request.feed
+
+
+
+def _feed_stamp(request,token):
+	if not hasattr(request,'feed_stamp'):
+		feed = _feed(request,token)
+		request.feed_stamp = feeds.feed_stamp(*feed) if feed else None
+	return request.feed_stamp
+
+
+
+def _feed_etag(request,token):
+	stamp = _feed_stamp(request,token)
+	return '"{0}"'.format(stamp) if stamp else None
+
+
+
+def _feed_modified(request,token):
+	stamp = _feed_stamp(request,token)
+	return datetime.datetime.fromtimestamp(stamp / 1000.0,datetime.timezone.utc) if stamp else None
+
+
+
+@condition(etag_func = _feed_etag,last_modified_func = _feed_modified)
+def leave_feed(request,token):
+	feed = _feed(request,token)
+	if feed is None:
+		raise Http404
+	response = HttpResponse(feeds.cached_feed(feed[0],feed[1],_feed_stamp(request,token)),content_type = 'text/calendar; charset=utf-8')
+	response['Content-Disposition'] = 'inline; filename="leaves.ics"'
+	return response
+
+
+
+
+
+# approver inbox - leaves waiting on request.user in a configured approval chain
+def approval_inbox(request):
+	if not request.user.is_authenticated:
+		return redirect('accounts:login')
+	tasks = ApprovalTask.objects.inbox(request.user)
+	return render(request,'dashboard/approval_inbox.html',{'tasks':tasks,'title':'my approvals'})
+
+
+
+@require_POST
+def approval_decide(request,id,decision):
+	'''
+	changes the leave -> POST only (csrf checked), a link or image can't decide for the approver
+	'''
+	if not request.user.is_authenticated:
+		return redirect('accounts:login')
+	if decision not in ('approve','reject'):
+		raise Http404
+	task = get_object_or_404(ApprovalTask.objects.select_related('leave'),id = id,approver = request.user,state = ApprovalTask.OPEN)
+	approvals.decide(task,decision == 'approve',request.user)
+
+	messages.success(request,'Leave {0}'.format('approved' if decision == 'approve' else 'rejected'),extra_tags = 'alert alert-success alert-dismissible show')
+	return redirect('dashboard:approvalinbox')
@@ -0,0 +1,119 @@
+from django.core.files.storage import default_storage
+from django.db import router,transaction
+from .models import Employee,EmployeeDirectory
+from .utility import age_band,full_name
+
+
+'''
+EmployeeDirectory - the read model behind the employee/user list pages.
+every write that changes what a list shows refreshes the affected rows right away (signals, wired in
+employee/signals.py): an employee save rewrites its row, a user save the row of its employee,
+a department/role rename or delete one UPDATE over the rows pointing at it.
+refresh() rebuilds rows from one projected query, rebuild() the whole table in batches.
+'''
+
+BATCH_SIZE = 500 # ids per statement, below sqlite's 999 variables
+
+SOURCE_FIELDS = (
+	'id','user_id','user__username','user__is_active','user__is_superuser',
+	'firstname','lastname','othername','employeeid','birthday','image',
+	'department_id','department__name','role_id','role__name',
+	'is_blocked','is_deleted','created',
+)
+USER_FIELDS = {'username','is_active','is_superuser'} # user saves touching nothing else are skipped (last_login)
+
+
+
+def _entry(row):
+	image = row['image']
+	return EmployeeDirectory(
+		employee_id = row['id'],
+		user_id = row['user_id'],
+		username = row['user__username'],
+		is_active = bool(row['user__is_active']),
+		is_superuser = bool(row['user__is_superuser']),
+		fullname = full_name(row['firstname'],row['lastname'],row['othername']),
+		employeeid = row['employeeid'],
+		age_band = age_band(row['birthday']),
+		department_id = row['department_id'],
+		department_name = row['department__name'],
+		role_id = row['role_id'],
+		role_name = row['role__name'],
+		avatar_url = default_storage.url(image) if image else None,
+		is_blocked = row['is_blocked'],
+		is_deleted = row['is_deleted'],
+		created = row['created'],
+	)
+
+
+
+def refresh(employee_ids):
+	'''
+	rewrite the directory rows of these employees (deleted and blocked included) -> rows written
+	three statements per batch: select, delete, insert
+	'''
+	employee_ids = list(employee_ids)
+	written = 0
+	with transaction.atomic(using = router.db_for_write(EmployeeDirectory)):
+		for start in range(0,len(employee_ids),BATCH_SIZE):
+			batch = employee_ids[start:start + BATCH_SIZE]
+			entries = [_entry(row) for row in Employee.objects.all_employees().filter(id__in = batch).values(*SOURCE_FIELDS)]
+			EmployeeDirectory.objects.filter(employee_id__in = batch).delete()
+			EmployeeDirectory.objects.bulk_create(entries)
+			written += len(entries)
+	return written
+
+
+
+def rebuild(batch_size = BATCH_SIZE):
+	'''
+	refresh every row and drop rows of employees that are gone -> rows written
+	one transaction per batch, the pages keep working during a rebuild
+	'''
+	written = 0
+	last = 0
+	while True:
+		ids = list(Employee.objects.all_employees().filter(id__gt = last).order_by('id').values_list('id',flat = True)[:batch_size])
+		if not ids:
+			break
+		written += refresh(ids)
+		last = ids[-1]
+	EmployeeDirectory.objects.exclude(employee_id__in = Employee.objects.all_employees().values('id')).delete()
+	return written
+
+
+
+# signal receivers --------------------------------------------------------------
+def employee_saved(sender,instance,**kwargs):
+	refresh([instance.pk])
+
+
+
+def user_saved(sender,instance,created = False,update_fields = None,**kwargs):
+	if created or (update_fields and not USER_FIELDS.intersection(update_fields)):
+		return
+	EmployeeDirectory.objects.filter(user_id = instance.pk).update(
+		username = instance.username,
+		is_active = instance.is_active,
+		is_superuser = instance.is_superuser,
+	)
+
+
+
+def department_saved(sender,instance,**kwargs):
+	EmployeeDirectory.objects.filter(department_id = instance.pk).update(department_name = instance.name)
+
+
+
+def department_deleted(sender,instance,**kwargs):
+	EmployeeDirectory.objects.filter(department_id = instance.pk).update(department_id = None,department_name = None)
+
+
+
+def role_saved(sender,instance,**kwargs):
+	EmployeeDirectory.objects.filter(role_id = instance.pk).update(role_name = instance.name)
+
+
+
+def role_deleted(sender,instance,**kwargs):
+	EmployeeDirectory.objects.filter(role_id = instance.pk).update(role_id = None,role_name = None)
@@ -1,16 +1,71 @@
 from django import forms
-from employee.models import Role,Department,Employee
+from employee.models import Role,Department,Employee,EmployeeIdSequence
 from django.contrib.auth.models import User
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from employee.utility import code_format
+from employee.refcache import ReferenceChoiceField
+
+
+class UserSearchWidget(forms.HiddenInput):
+	'''
+	user id in a hidden input + a search box backed by accounts:userautocomplete (jquery ui, see _layout.html)
+	-> the page no longer carries one <option> per user, only the selected username is looked up
+	'''
+	is_hidden = False # rendered (and labelled) as a normal field
+
+	def render(self,name,value,attrs = None,renderer = None):
+		hidden = super().render(name,value,attrs,renderer)
+		username = ''
+		if value:
+			username = User.objects.filter(pk = value).values_list('username',flat = True).first() or ''
+		search = forms.TextInput(attrs = {
+			'class':'form-control user-autocomplete',
+			'placeholder':'type a username or email',
+			'autocomplete':'off',
+			'data-target':(attrs or dict()).get('id','id_' + name),
+			'data-url':reverse('accounts:userautocomplete'),
+		})
+		return mark_safe(hidden + search.render(name + '_search',username,{'id':'id_{0}_search'.format(name)},renderer))
+
 
 
 # EMPLoYEE
 class EmployeeCreateForm(forms.ModelForm):
-	employeeid = forms.CharField(widget=forms.TextInput(attrs={'placeholder':'please enter 5 characters without RGL or slashes eg. A0025'}))
+	employeeid = forms.CharField(required=False,widget=forms.TextInput(attrs={'placeholder':'leave blank for the next free id, or 5 characters without RGL or slashes of an id issued before eg. 00025'}))
 	image = forms.ImageField(widget=forms.FileInput(attrs={'onchange':'previewImage(this);'}))
 	class Meta:
 		model = Employee
 		exclude = ['is_blocked','is_deleted','created','updated']
+		field_classes = {
+				'department':ReferenceChoiceField,
+				'role':ReferenceChoiceField,
+		}
 		widgets = {
-				'bio':forms.Textarea(attrs={'cols':5,'rows':5})
+				'bio':forms.Textarea(attrs={'cols':5,'rows':5}),
+				'user':UserSearchWidget,
 		}
 
+
+	def __init__(self,*args,**kwargs):
+		super().__init__(*args,**kwargs)
+		# only users without a profile (or this profile's own user) are valid choices
+		unlinked = Q(employee__isnull = True)
+		if self.instance.pk:
+			unlinked |= Q(employee = self.instance)
+		self.fields['user'].queryset = User.objects.filter(unlinked)
+
+
+	def clean_employeeid(self):
+		'''
+		typed ids are checked in their stored RGL/XX/NNN form - the unique index is the final guard.
+		a changed id must have been handed out by the sequence already (see Employee.save)
+		'''
+		employeeid = self.cleaned_data.get('employeeid')
+		code = code_format(employeeid)
+		if code and code != self.instance.employeeid and not EmployeeIdSequence.objects.issued(code):
+			raise forms.ValidationError('Employee ID {0} has not been issued yet, leave it blank for the next free id'.format(code))
+		if code and Employee.objects.all_employees().filter(employeeid = code).exclude(id = self.instance.id).exists():
+			raise forms.ValidationError('Employee ID {0} is already taken'.format(code))
+		return employeeid
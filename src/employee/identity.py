@@ -0,0 +1,69 @@
+from asgiref.local import Local
+from employee.models import Employee
+
+
+'''
+request scoped identity map for Employee profiles.
+get_employee(user) loads a user's employee at most once per request - views, templates,
+permissions and Leave properties all share the same instance.
+outside a request (shell, commands) every call queries.
+'''
+
+_state = Local() # per thread under WSGI, per request task under ASGI (shared with its sync_to_async calls)
+
+
+
+def activate():
+	_state.employees = dict()
+
+
+
+def deactivate():
+	_state.employees = None
+
+
+
+def _identity_map():
+	return getattr(_state,'employees',None)
+
+
+
+def get_employee(user):
+	'''
+	user instance or user id -> active Employee or None
+	'''
+	user_id = getattr(user,'pk',user)
+	if user_id is None:
+		return
+	employees = _identity_map()
+	if employees is not None and user_id in employees:
+		return employees[user_id]
+
+	employee = Employee.objects.select_related('department','role').filter(user_id = user_id).first()
+	if employees is not None:
+		employees[user_id] = employee
+	return employee
+
+
+
+def prime(user_ids):
+	'''
+	load the employees of many users in one query -> use before looping over leaves in a list
+	'''
+	employees = _identity_map()
+	if employees is None:
+		return
+	missing = set(user_ids) - set(employees)
+	if not missing:
+		return
+	for employee in Employee.objects.select_related('department','role').filter(user_id__in = missing):
+		employees[employee.user_id] = employee
+	for user_id in missing:
+		employees.setdefault(user_id,None)
+
+
+
+def forget(user_id):
+	employees = _identity_map()
+	if employees is not None:
+		employees.pop(user_id,None)
@@ -0,0 +1,95 @@
+import datetime
+import json
+import os
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand,CommandError
+from employee import retention
+from employee.models import Employee
+
+
+
+class Command(BaseCommand):
+	help = 'Delete employees (and their users, leaves, files) who left more than RETENTION_YEARS ago, in small batches'
+
+	def add_arguments(self,parser):
+		parser.add_argument('--years',type = int,default = None,help = 'default: settings.RETENTION_YEARS')
+		parser.add_argument('--batch-size',type = int,default = 100,help = 'people per transaction')
+		parser.add_argument('--sleep',type = float,default = 0.5,help = 'seconds between batches, keeps lock time short for the site')
+		parser.add_argument('--state',default = 'purge_retention.json',help = 'progress file, used by --resume')
+		parser.add_argument('--resume',action = 'store_true',help = 'continue an interrupted run with its cutoff date')
+		parser.add_argument('--dry-run',action = 'store_true',help = 'only count what would be purged')
+
+
+	def handle(self,*args,**options):
+		state = self.load_state(options)
+		cutoff = datetime.date.fromisoformat(state['cutoff'])
+
+		users = retention.expired_users(cutoff)
+		profiles = retention.expired_profiles(cutoff)
+		self.stderr.write('cutoff {0}: {1} user(s), {2} profile(s) without user to purge'.format(cutoff,users.count(),profiles.count()))
+		if options['dry_run']:
+			for action,model,lookup,field in retention.deletion_plan(User):
+				self.stderr.write('  {0} {1} {2}'.format(action,model._meta.label,field or 'where ' + lookup))
+			return
+
+		try:
+			for model,queryset in ((User,users),(Employee,profiles)):
+				self.run(model,queryset,state,options)
+		finally:
+			retention.refresh_caches()
+		self.stderr.write('done: {0}'.format(self.describe(state['deleted'])))
+		os.remove(options['state'])
+
+
+	def run(self,model,queryset,state,options):
+		plan = retention.deletion_plan(model)
+		label = model._meta.label
+		while True:
+			ids = list(queryset.filter(pk__gt = state['last'].get(label,0)).order_by('pk').values_list('pk',flat = True)[:options['batch_size']])
+			if not ids:
+				return
+
+			if model is User:
+				files = retention.personal_files(user_ids = ids)
+			else:
+				files = retention.personal_files(employee_ids = ids)
+			counts = retention.purge(model,ids,plan)
+			retention.remove_files(files) # the batch is committed
+
+			state['last'][label] = ids[-1]
+			state['batches'] += 1
+			for name,rows in counts.items():
+				state['deleted'][name] = state['deleted'].get(name,0) + rows
+			self.save_state(options['state'],state)
+			self.stderr.write('batch {0}: {1} {2} ({3})'.format(state['batches'],len(ids),label,self.describe(counts)))
+			time.sleep(options['sleep'])
+
+
+	def load_state(self,options):
+		if options['resume']:
+			if not os.path.exists(options['state']):
+				raise CommandError('nothing to resume - {0} not found'.format(options['state']))
+			with open(options['state']) as handle:
+				state = json.load(handle)
+			self.stderr.write('resuming after {0} batch(es)'.format(state['batches']))
+			return state
+		if os.path.exists(options['state']) and not options['dry_run']:
+			raise CommandError('{0} exists - pass --resume to continue that run or delete it'.format(options['state']))
+		return {
+			'cutoff':retention.cutoff_date(options['years']).isoformat(),
+			'last':dict(),
+			'batches':0,
+			'deleted':dict(),
+		}
+
+
+	def save_state(self,path,state):
+		partial = path + '.tmp'
+		with open(partial,'w') as handle:
+			json.dump(state,handle)
+		os.replace(partial,path)
+
+
+	def describe(self,counts):
+		return ', '.join('{0} {1}'.format(rows,name) for name,rows in sorted(counts.items())) or 'nothing'
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from employee import directory
+
+
+
+class Command(BaseCommand):
+	help = 'Rebuild the employee directory read table (list pages) from Employee, User, Department and Role'
+
+	def add_arguments(self,parser):
+		parser.add_argument('--batch-size',type = int,default = directory.BATCH_SIZE,help = 'employees per transaction')
+
+
+	def handle(self,*args,**options):
+		started = time.monotonic()
+		written = directory.rebuild(options['batch_size'])
+		self.stderr.write('{0} directory row(s) written in {1:.1f}s'.format(written,time.monotonic() - started))
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models,router,transaction
+from django.db.models import Case,When,F,Q,IntegerField
+from employee.utility import day_of_year,day_of_year_window,is_leap,sequence_code,sequence_number
 import datetime
 
 class EmployeeManager(models.Manager):
@@ -25,8 +27,73 @@ class EmployeeManager(models.Manager):
 
 
 
+    def _upcoming(self,field,days,today):
+        '''
+        index range scan on the denormalized day of year column, ordered by how soon the day comes round
+        days_away counts real days: the day of year numbers are leap year ones, so outside leap years
+        one day comes off for every feb 29 (60) between today and the day (feb 29 itself is march 1)
+        '''
+        today = today or datetime.date.today()
+        ranges = day_of_year_window(today,days)
+        condition = Q()
+        for first,last in ranges:
+            condition |= Q(**{field + '__range':(first,last)})
+        first = day_of_year(today)
+        this_year = 1 if not is_leap(today.year) and first <= 60 else 0 # feb 29 still ahead this year
+        next_year = 0 if is_leap(today.year + 1) else 1
+        return self.get_queryset().filter(condition).annotate(
+            days_away = Case(
+                When(**{field + '__gte':first,field + '__gt':60,'then':F(field) - first - this_year}),
+                When(**{field + '__gte':first,'then':F(field) - first}),
+                When(**{field + '__gt':60,'then':F(field) + 366 - first - this_year - next_year}),
+                default = F(field) + 366 - first - this_year,
+                output_field = IntegerField(),
+            )
+        ).order_by('days_away','firstname')
+
+
+    def upcoming_birthdays(self,days = 30,today = None):
+        '''
+        Employee.objects.upcoming_birthdays(30) -> active employees with a birthday in the next 30 days
+        handles the december -> january wrap, each row carries days_away
+        '''
+        return self._upcoming('birthday_doy',days,today)
+
+
+    def upcoming_anniversaries(self,days = 30,today = None):
+        '''
+        Employee.objects.upcoming_anniversaries(30) -> active employees whose employment date comes round in the next 30 days
+        '''
+        today = today or datetime.date.today()
+        return self._upcoming('startdate_doy',days,today).filter(startdate__lt = today)
+
+
 
 
-    
+class EmployeeIdSequenceManager(models.Manager):
+    def allocate(self,count = 1,name = 'employee'):
+        '''
+        EmployeeIdSequence.objects.allocate(50) -> 50 consecutive RGL/XX/NNN codes
+        the UPDATE takes the row (sqlite: database) write lock first, so parallel callers
+        queue behind each other and always get disjoint blocks - no retry needed
+        '''
+        if count < 1:
+            return []
+        with transaction.atomic(using = router.db_for_write(self.model)):
+            if not self.filter(name = name).update(value = models.F('value') + count):
+                self.get_or_create(name = name)
+                self.filter(name = name).update(value = models.F('value') + count)
+            end = self.filter(name = name).values_list('value',flat = True).get()
+        return [sequence_code(number) for number in range(end - count,end)]
 
 
+    def issued(self,code,name = 'employee'):
+        '''
+        may this typed code be stored -> a RGL/XX/NNN code only once the sequence has handed it out
+        (below its value), so allocate() never gives it out again and a typo can't move the sequence.
+        codes outside the layout never collide with allocated ones. one read, no lock
+        '''
+        number = sequence_number(code)
+        if number is None:
+            return True
+        return number < (self.filter(name = name).values_list('value',flat = True).first() or 0)
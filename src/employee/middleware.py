@@ -0,0 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+from . import identity
+
+
+
+class EmployeeIdentityMiddleware:
+	'''
+	request.employee -> the logged in user's Employee, loaded lazily and only once
+	'''
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+
+	def __call__(self, request):
+		identity.activate()
+		request.employee = SimpleLazyObject(lambda: identity.get_employee(request.user) if request.user.is_authenticated else None)
+		try:
+			response = self.get_response(request)
+		finally:
+			identity.deactivate()
+		return response
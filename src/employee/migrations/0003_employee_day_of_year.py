@@ -0,0 +1,35 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:01
+
+from django.db import migrations, models
+from employee.utility import day_of_year
+
+
+def fill_day_of_year(apps, schema_editor):
+    Employee = apps.get_model('employee', 'Employee')
+    db = schema_editor.connection.alias
+    employees = list(Employee.objects.using(db).only('id', 'birthday', 'startdate'))
+    for employee in employees:
+        employee.birthday_doy = day_of_year(employee.birthday)
+        employee.startdate_doy = day_of_year(employee.startdate)
+    Employee.objects.using(db).bulk_update(employees, ['birthday_doy', 'startdate_doy'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0002_auto_20200904_1545'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='birthday_doy',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='startdate_doy',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_day_of_year, migrations.RunPython.noop),
+    ]
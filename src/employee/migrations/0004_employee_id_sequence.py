@@ -0,0 +1,59 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:01
+
+from django.db import migrations, models
+from employee.utility import sequence_code, sequence_number
+
+
+def start_sequence(apps, schema_editor):
+    '''
+    start the sequence after every existing code that follows the RGL/XX/NNN layout,
+    then give duplicated ids fresh codes so the unique index can be built. the row that keeps a code
+    is picked like 0005 picks the profile a user keeps (active, most recently updated) -> a user's
+    surviving profile keeps its original id
+    '''
+    Employee = apps.get_model('employee', 'Employee')
+    EmployeeIdSequence = apps.get_model('employee', 'EmployeeIdSequence')
+    db = schema_editor.connection.alias
+
+    rows = list(Employee.objects.using(db).order_by('is_deleted', '-updated', '-id').values_list('id', 'employeeid'))
+    numbers = [sequence_number(code) for _, code in rows]
+    value = max([number for number in numbers if number is not None], default=-1) + 1
+
+    seen = set()
+    for employee_id, code in rows:
+        if code is None:
+            continue
+        if code in seen:
+            Employee.objects.using(db).filter(id=employee_id).update(employeeid=sequence_code(value))
+            value += 1
+        seen.add(code)
+
+    EmployeeIdSequence.objects.using(db).create(name='employee', value=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0003_employee_day_of_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeIdSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Employee ID Sequence',
+                'verbose_name_plural': 'Employee ID Sequences',
+            },
+        ),
+        migrations.RunPython(start_sequence, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='employee',
+            name='employeeid',
+            field=models.CharField(blank=True, help_text='leave blank to allocate the next free id', max_length=10, null=True, unique=True, verbose_name='Employee ID Number'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def detach_duplicate_profiles(apps, schema_editor):
+    '''
+    one employee per user - keep the active, most recently updated profile and
+    detach the others (user = NULL, is_deleted = True) so their data is not lost.
+    same order as 0004 -> the kept profile is the one that kept its employee id
+    '''
+    Employee = apps.get_model('employee', 'Employee')
+    db = schema_editor.connection.alias
+    duplicated = (Employee.objects.using(db).order_by().values('user_id').annotate(total=Count('id'))
+                  .filter(total__gt=1).values_list('user_id', flat=True))
+    for user_id in list(duplicated):
+        profiles = list(Employee.objects.using(db).filter(user_id=user_id).order_by('is_deleted', '-updated', '-id')
+                        .values_list('id', flat=True))
+        Employee.objects.using(db).filter(id__in=profiles[1:]).update(user=None, is_deleted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('employee', '0004_employee_id_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employee',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(detach_duplicate_profiles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='employee',
+            name='user',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='employee', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0005_employee_user_one_to_one'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='dateleft',
+            field=models.DateField(blank=True, db_index=True, help_text='last working day - personal data is purged settings.RETENTION_YEARS later', null=True, verbose_name='Date Left'),
+        ),
+    ]
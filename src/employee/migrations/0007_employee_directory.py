@@ -0,0 +1,75 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:29
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+import django.db.models.deletion
+from employee.utility import age_band, full_name
+
+
+def fill_directory(apps, schema_editor):
+    '''
+    first build of the read model - manage.py rebuild_directory does the same later on
+    '''
+    Employee = apps.get_model('employee', 'Employee')
+    EmployeeDirectory = apps.get_model('employee', 'EmployeeDirectory')
+    db = schema_editor.connection.alias
+    rows = Employee.objects.using(db).values(
+        'id', 'user_id', 'user__username', 'user__is_active', 'user__is_superuser',
+        'firstname', 'lastname', 'othername', 'employeeid', 'birthday', 'image',
+        'department_id', 'department__name', 'role_id', 'role__name', 'is_blocked', 'is_deleted', 'created',
+    )
+    EmployeeDirectory.objects.using(db).bulk_create([EmployeeDirectory(
+        employee_id=row['id'],
+        user_id=row['user_id'],
+        username=row['user__username'],
+        is_active=bool(row['user__is_active']),
+        is_superuser=bool(row['user__is_superuser']),
+        fullname=full_name(row['firstname'], row['lastname'], row['othername']),
+        employeeid=row['employeeid'],
+        age_band=age_band(row['birthday']),
+        department_id=row['department_id'],
+        department_name=row['department__name'],
+        role_id=row['role_id'],
+        role_name=row['role__name'],
+        avatar_url=default_storage.url(row['image']) if row['image'] else None,
+        is_blocked=row['is_blocked'],
+        is_deleted=row['is_deleted'],
+        created=row['created'],
+    ) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0006_employee_dateleft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeDirectory',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='directory', serialize=False, to='employee.employee')),
+                ('user_id', models.IntegerField(db_index=True, null=True)),
+                ('username', models.CharField(max_length=150, null=True)),
+                ('is_active', models.BooleanField(default=False)),
+                ('is_superuser', models.BooleanField(default=False)),
+                ('fullname', models.CharField(max_length=380, null=True)),
+                ('employeeid', models.CharField(max_length=10, null=True)),
+                ('age_band', models.CharField(max_length=20, null=True)),
+                ('department_id', models.IntegerField(db_index=True, null=True)),
+                ('department_name', models.CharField(max_length=125, null=True)),
+                ('role_id', models.IntegerField(db_index=True, null=True)),
+                ('role_name', models.CharField(max_length=125, null=True)),
+                ('avatar_url', models.CharField(max_length=255, null=True)),
+                ('is_blocked', models.BooleanField(default=False)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Employee Directory Entry',
+                'verbose_name_plural': 'Employee Directory',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.RunPython(fill_directory, migrations.RunPython.noop),
+    ]
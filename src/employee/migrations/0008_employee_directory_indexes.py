@@ -0,0 +1,29 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0007_employee_directory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeedirectory',
+            index=models.Index(fields=['is_deleted', 'created'], name='employee_em_is_dele_28ea01_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeedirectory',
+            index=models.Index(fields=['is_blocked', 'created'], name='employee_em_is_bloc_fb83e2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeedirectory',
+            index=models.Index(fields=['username'], name='employee_em_usernam_6ea5af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeedirectory',
+            index=models.Index(fields=['fullname'], name='employee_em_fullnam_02efa3_idx'),
+        ),
+    ]
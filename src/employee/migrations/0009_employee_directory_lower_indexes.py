@@ -0,0 +1,48 @@
+# Generated by Django 3.1.14 on 2026-10-19 00:10
+
+from django.db import migrations, models
+
+
+INDEXES = (
+    ('employee_directory_username_lower_idx', 'username'),
+    ('employee_directory_fullname_lower_idx', 'fullname'),
+    ('employee_directory_employeeid_lower_idx', 'employeeid'),
+    ('employee_directory_department_lower_idx', 'department_name'),
+    ('employee_directory_role_lower_idx', 'role_name'),
+)
+VENDORS = ('sqlite', 'postgresql') # as accounts 0003 - mysql compares case-insensitively already
+
+
+def add_lower_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in VENDORS:
+        return
+    table = schema_editor.quote_name(apps.get_model('employee', 'EmployeeDirectory')._meta.db_table)
+    for name, column in INDEXES:
+        schema_editor.execute('CREATE INDEX {0} ON {1} (LOWER({2}))'.format(schema_editor.quote_name(name), table, schema_editor.quote_name(column)))
+
+
+def remove_lower_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in VENDORS:
+        return
+    for name, column in INDEXES:
+        schema_editor.execute('DROP INDEX {0}'.format(schema_editor.quote_name(name)))
+
+
+class Migration(migrations.Migration):
+    '''
+    the server-side tables search the directory by prefix ranges on LOWER(column) (dashboard/datatables.py),
+    these expression indexes (and age_band's plain one) keep every searched column a range scan, so the
+    global search is a multi-index OR. the plain username and fullname indexes of 0008 stay for ordering
+    '''
+
+    dependencies = [
+        ('employee', '0008_employee_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeedirectory',
+            index=models.Index(fields=['age_band'], name='employee_em_age_ban_efe20b_idx'),
+        ),
+        migrations.RunPython(add_lower_indexes, remove_lower_indexes),
+    ]
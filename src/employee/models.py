@@ -1,11 +1,9 @@
 import datetime
-from employee.utility import code_format
+from employee.utility import code_format,day_of_year,full_name
 from django.db import models
-from employee.managers import EmployeeManager
-from phonenumber_field.modelfields import PhoneNumberField
+from employee.managers import EmployeeManager,EmployeeIdSequenceManager
 from django.utils.translation import ugettext as _
 from django.contrib.auth.models import User
-from leave.models import Leave
 
 
 
@@ -50,6 +48,26 @@ class Department(models.Model):
 
 
 
+class EmployeeIdSequence(models.Model):
+    '''
+    next number to hand out for generated employee ids - see EmployeeIdSequenceManager.allocate
+    '''
+    name = models.CharField(max_length=50,unique=True)
+    value = models.PositiveIntegerField(default=0)
+
+    objects = EmployeeIdSequenceManager()
+
+
+    class Meta:
+        verbose_name = _('Employee ID Sequence')
+        verbose_name_plural = _('Employee ID Sequences')
+
+
+    def __str__(self):
+        return '{0} - {1}'.format(self.name,self.value)
+
+
+
 class Employee(models.Model):
 
     MALE = 'male'
@@ -97,7 +115,7 @@ class Employee(models.Model):
     
     
     # PERSONAL DATA
-    user = models.ForeignKey(User,on_delete=models.CASCADE,default=1)
+    user = models.OneToOneField(User,on_delete=models.CASCADE,null=True,related_name='employee')# null only for duplicate profiles detached by migration 0005
     
     image = models.FileField(_('Profile Image'),upload_to='profiles',default='default.png',blank=True,null=True,help_text='upload image size less than 2.0MB')#work on path username-date/image
     firstname = models.CharField(_('Firstname'),max_length=125,null=False,blank=False)
@@ -110,8 +128,13 @@ class Employee(models.Model):
     role =  models.ForeignKey(Role,verbose_name =_('Role'),on_delete=models.SET_NULL,null=True,default=None)
     startdate = models.DateField(_('Employement Date'),help_text='date of employement',blank=False,null=True)
     employeetype = models.CharField(_('Employee Type'),max_length=15,default=FULL_TIME,choices=EMPLOYEETYPE,blank=False,null=True)
-    employeeid = models.CharField(_('Employee ID Number'),max_length=10,null=True,blank=True)
+    employeeid = models.CharField(_('Employee ID Number'),max_length=10,null=True,blank=True,unique=True,help_text='leave blank to allocate the next free id')
     dateissued = models.DateField(_('Date Issued'),help_text='date staff id was issued',blank=False,null=True)
+    dateleft = models.DateField(_('Date Left'),help_text='last working day - personal data is purged settings.RETENTION_YEARS later',blank=True,null=True,db_index=True)
+
+    # denormalized day of year (1-366) for birthday/anniversary feeds - kept in sync by save()
+    birthday_doy = models.PositiveSmallIntegerField(null=True,editable=False,db_index=True)
+    startdate_doy = models.PositiveSmallIntegerField(null=True,editable=False,db_index=True)
 
     # app related
     is_blocked = models.BooleanField(_('Is Blocked'),help_text='button to toggle employee block and unblock',default=False)
@@ -123,6 +146,7 @@ class Employee(models.Model):
 
     #PLUG MANAGERS
     objects = EmployeeManager()
+    _loaded_employeeid = None # the stored employee id, see from_db
 
     
     
@@ -140,18 +164,7 @@ class Employee(models.Model):
 
     @property
     def get_full_name(self):
-        fullname = ''
-        firstname = self.firstname
-        lastname = self.lastname
-        othername = self.othername
-
-        if (firstname and lastname) or othername is None:
-            fullname = firstname +' '+ lastname
-            return fullname
-        elif othername:
-            fullname = firstname + ' '+ lastname +' '+othername
-            return fullname
-        return
+        return full_name(self.firstname,self.lastname,self.othername)
 
 
     @property
@@ -180,6 +193,17 @@ class Employee(models.Model):
 
 
 
+    @classmethod
+    def from_db(cls,db,field_names,values):
+        '''
+        remembers the stored employee id -> save() only checks a typed id when it changed
+        '''
+        instance = super().from_db(db,field_names,values)
+        instance._loaded_employeeid = dict(zip(field_names,values)).get('employeeid')
+        return instance
+
+
+
     def save(self,*args,**kwargs):
         '''
         overriding the save method - for every instance that calls the save method 
@@ -189,15 +213,58 @@ class Employee(models.Model):
         '''
         get_id = self.employeeid #grab employee_id number from submitted form field
         data = code_format(get_id)
+        if not data:
+            data = EmployeeIdSequence.objects.allocate()[0] # nothing usable typed -> next free id
+        elif data != self._loaded_employeeid and not EmployeeIdSequence.objects.issued(data):
+            raise ValueError('employee id {0} has not been issued yet - leave it blank for the next free id'.format(data))
         self.employeeid = data #pass the new code to the employee_id as its orifinal or actual code
+        self.birthday_doy = day_of_year(self.birthday)
+        self.startdate_doy = day_of_year(self.startdate)
         super().save(*args,**kwargs) # call the parent save method
+        self._loaded_employeeid = data
         # print(self.employeeid)
 
 
 
+class EmployeeDirectory(models.Model):
+    '''
+    flat read copy of Employee + User + Department + Role for the list pages -> one single table query,
+    names and bands computed once on write. kept up to date by employee/directory.py (signals),
+    manage.py rebuild_directory refreshes it in bulk. never edit it directly
+    '''
+    employee = models.OneToOneField(Employee,on_delete=models.CASCADE,primary_key=True,related_name='directory')
+    user_id = models.IntegerField(null=True,db_index=True)
+    username = models.CharField(max_length=150,null=True)
+    is_active = models.BooleanField(default=False)
+    is_superuser = models.BooleanField(default=False)
 
+    fullname = models.CharField(max_length=380,null=True)
+    employeeid = models.CharField(max_length=10,null=True)
+    age_band = models.CharField(max_length=20,null=True)
+    department_id = models.IntegerField(null=True,db_index=True)
+    department_name = models.CharField(max_length=125,null=True)
+    role_id = models.IntegerField(null=True,db_index=True)
+    role_name = models.CharField(max_length=125,null=True)
+    avatar_url = models.CharField(max_length=255,null=True)
 
+    is_blocked = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+    created = models.DateTimeField(null=True)
 
 
+    class Meta:
+        verbose_name = _('Employee Directory Entry')
+        verbose_name_plural = _('Employee Directory')
+        ordering = ['-created']
+        indexes = [ # server-side tables page through these in order (dashboard/datatables.py)
+            models.Index(fields=['is_deleted','created']),
+            models.Index(fields=['is_blocked','created']),
+            models.Index(fields=['username']),
+            models.Index(fields=['fullname']),
+            models.Index(fields=['age_band']), # with the LOWER() indexes of 0009 the global search is a multi-index OR
+        ]
 
 
+    def __str__(self):
+        return self.fullname or str(self.pk)
+
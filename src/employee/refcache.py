@@ -0,0 +1,116 @@
+import threading
+import uuid
+from django import forms
+from django.core.cache import caches
+from hrsuit import tenancy
+
+
+'''
+reference tables (Role, Department) kept in process memory.
+each table is loaded once per process into a dict keyed by id. a version stamp per table lives in the
+'shared' cache (file based, CACHES in settings - the default cache is per process) and is replaced by
+save/delete signals (employee/signals.py) - every read compares one shared value and reloads the table
+only after it changed, so every process notices an edit made by any other.
+a bump writes a new random stamp instead of incrementing: two processes bumping at once can't both
+write the same number. tables are kept per tenant database (the key function namespaces the stamps).
+
+refcache.get(Department,3) -> Department or None
+refcache.objects(Role) -> [Role,...] in Meta.ordering
+'''
+
+REFERENCE_MODELS = ('employee.Role','employee.Department')
+
+_tables = dict() # (database,label) -> (version,{id:instance},[instances])
+_lock = threading.Lock()
+
+
+
+def _version_key(model):
+	return 'refcache:version:{0}'.format(model._meta.label_lower)
+
+
+
+def version(model):
+	shared = caches['shared']
+	key = _version_key(model)
+	stamp = shared.get(key)
+	if stamp is None:
+		shared.add(key,uuid.uuid4().hex,None)
+		stamp = shared.get(key)
+	return stamp
+
+
+
+def bump(sender,**kwargs):
+	'''
+	post_save/post_delete receiver -> every process reloads the table on its next read
+	'''
+	caches['shared'].set(_version_key(sender),uuid.uuid4().hex,None)
+
+
+
+def _table(model):
+	label = (tenancy.current_database(),model._meta.label_lower)
+	stamp = version(model)
+	table = _tables.get(label)
+	if table is None or table[0] != stamp:
+		with _lock:
+			table = _tables.get(label)
+			if table is None or table[0] != stamp:
+				rows = list(model._default_manager.all())
+				table = _tables[label] = (stamp,{row.pk:row for row in rows},rows)
+	return table
+
+
+
+def get(model,pk):
+	'''
+	instance by id from memory -> None for unknown or empty ids
+	instances are shared by the whole process, treat them as read only
+	'''
+	try:
+		pk = int(pk)
+	except (TypeError,ValueError):
+		return None
+	return _table(model)[1].get(pk)
+
+
+
+def objects(model):
+	return list(_table(model)[2])
+
+
+
+def clear():
+	with _lock:
+		_tables.clear()
+
+
+
+class ReferenceChoiceIterator(forms.models.ModelChoiceIterator):
+	def __iter__(self):
+		if self.field.empty_label is not None:
+			yield ('',self.field.empty_label)
+		for instance in objects(self.queryset.model):
+			yield self.choice(instance)
+
+
+	def __len__(self):
+		return len(_table(self.queryset.model)[1]) + (1 if self.field.empty_label is not None else 0)
+
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+	'''
+	ModelChoiceField for a reference table -> renders and validates from the process cache,
+	no queries. use through ModelForm Meta.field_classes
+	'''
+	iterator = ReferenceChoiceIterator
+
+	def to_python(self,value):
+		if value in self.empty_values:
+			return None
+		instance = get(self.queryset.model,value)
+		if instance is None:
+			raise forms.ValidationError(self.error_messages['invalid_choice'],code = 'invalid_choice')
+		return instance
@@ -0,0 +1,149 @@
+import datetime
+import os
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db import models,router,transaction
+from .models import Employee
+
+
+'''
+data retention - personal data of employees who left more than settings.RETENTION_YEARS ago.
+
+Model.delete() / QuerySet.delete() load every cascaded object into memory to send signals.
+here the cascade is planned once from the model metadata and executed per batch of ids as
+set based statements, children first:
+	UPDATE child SET fk = NULL WHERE fk IN (...)   for SET_NULL relations
+	DELETE FROM child WHERE fk IN (...)            for CASCADE relations (their own children before them)
+	DELETE FROM parent WHERE id IN (...)
+no signals are sent - caches fed by signals are refreshed once after a run, the monthly leave stats
+of purged leaves are marked stale in the batch that deletes them.
+'''
+
+
+
+class RetentionError(Exception):
+	pass
+
+
+
+def cutoff_date(years = None,today = None):
+	'''
+	employees whose dateleft is before this date are expired
+	'''
+	years = settings.RETENTION_YEARS if years is None else years
+	today = today or datetime.date.today()
+	try:
+		return today.replace(year = today.year - years)
+	except ValueError: # 29 February
+		return today.replace(year = today.year - years,day = 28)
+
+
+
+def expired_users(cutoff):
+	return User.objects.filter(employee__dateleft__lt = cutoff)
+
+
+
+def expired_profiles(cutoff):
+	'''
+	profiles without a user account (nothing else to purge through)
+	'''
+	return Employee.objects.filter(user = None,dateleft__lt = cutoff)
+
+
+
+def deletion_plan(model,lookup = 'pk',stack = ()):
+	'''
+	model -> [(action,related model,lookup to the root pk,field),...] in execution order
+	action is 'null' or 'delete', the root rows themselves are not part of the plan
+	'''
+	plan = []
+	stack = stack + (model,)
+	relations = [
+		field for field in model._meta.get_fields(include_hidden = True)
+		if field.auto_created and not field.concrete and (field.one_to_many or field.one_to_one)
+	]
+	for relation in relations:
+		child = relation.related_model
+		on_delete = relation.on_delete
+		child_lookup = '{0}__{1}'.format(relation.field.name,lookup)
+		if on_delete is models.DO_NOTHING:
+			continue
+		if on_delete is models.SET_NULL:
+			plan.append(('null',child,child_lookup,relation.field.name))
+		elif on_delete is models.CASCADE:
+			if child in stack:
+				raise RetentionError('cascade cycle through {0}'.format(child._meta.label))
+			plan += deletion_plan(child,child_lookup,stack)
+			plan.append(('delete',child,child_lookup,None))
+		else:
+			raise RetentionError('{0}.{1} ({2}) blocks the purge'.format(child._meta.label,relation.field.name,getattr(on_delete,'__name__',on_delete)))
+	return plan
+
+
+
+def purge(model,ids,plan = None):
+	'''
+	delete model rows ids and everything that cascades from them in one transaction
+	-> {'app.Model':rows,...} (nullified rows are counted as 'app.Model.field')
+	'''
+	from leave import stats
+	from leave.models import Leave
+
+	plan = deletion_plan(model) if plan is None else plan
+	counts = dict()
+	with transaction.atomic(using = router.db_for_write(model)):
+		for action,child,lookup,field in plan:
+			queryset = child._base_manager.filter(**{lookup + '__in':ids})
+			if action == 'null':
+				rows = queryset.update(**{field:None})
+				label = '{0}.{1}'.format(child._meta.label,field)
+			else:
+				if child is Leave: # what the post_delete signal would have done
+					stats.mark_stale(*queryset.values_list('startdate','enddate').distinct())
+				rows = queryset._raw_delete(queryset.db)
+				label = child._meta.label
+			if rows:
+				counts[label] = counts.get(label,0) + rows
+		queryset = model._base_manager.filter(pk__in = ids)
+		counts[model._meta.label] = queryset._raw_delete(queryset.db)
+	return counts
+
+
+
+def personal_files(user_ids = (),employee_ids = ()):
+	'''
+	profile images and approval letters of these people -> paths relative to MEDIA_ROOT
+	collected before the rows are gone (the letter path is derived from the letter data)
+	'''
+	from leave import letters
+	from leave.models import Leave
+
+	default_image = Employee._meta.get_field('image').default
+	images = Employee.objects.filter(models.Q(user_id__in = user_ids) | models.Q(id__in = employee_ids)).exclude(image = default_image).values_list('image',flat = True)
+	paths = [image for image in images if image]
+	for leave_id in Leave.objects.filter(user_id__in = user_ids,status = 'approved').values_list('id',flat = True):
+		path,data = letters.letter_file(leave_id)
+		if path:
+			paths.append(os.path.relpath(path,settings.MEDIA_ROOT))
+	return paths
+
+
+
+def remove_files(paths):
+	for path in paths:
+		if default_storage.exists(path):
+			default_storage.delete(path)
+
+
+
+def refresh_caches():
+	'''
+	raw deletes send no signals - invalidate what the signals would have
+	'''
+	from accounts.permissions import bump_permissions_version
+	from leave import feeds
+
+	bump_permissions_version()
+	feeds.memberships_changed()
@@ -0,0 +1,26 @@
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save,post_delete
+from . import directory,refcache
+
+
+
+def connect():
+	'''
+	reference tables are cached per process until they change - see employee/refcache.py
+	the employee directory follows every change of what it copies - see employee/directory.py
+	'''
+	for label in refcache.REFERENCE_MODELS:
+		model = apps.get_model(label)
+		post_save.connect(refcache.bump,sender = model,dispatch_uid = 'refcache_{0}_save'.format(model.__name__))
+		post_delete.connect(refcache.bump,sender = model,dispatch_uid = 'refcache_{0}_delete'.format(model.__name__))
+
+	Employee = apps.get_model('employee','Employee')
+	Department = apps.get_model('employee','Department')
+	Role = apps.get_model('employee','Role')
+	post_save.connect(directory.employee_saved,sender = Employee,dispatch_uid = 'directory_employee_save')
+	post_save.connect(directory.user_saved,sender = User,dispatch_uid = 'directory_user_save')
+	post_save.connect(directory.department_saved,sender = Department,dispatch_uid = 'directory_department_save')
+	post_delete.connect(directory.department_deleted,sender = Department,dispatch_uid = 'directory_department_delete')
+	post_save.connect(directory.role_saved,sender = Role,dispatch_uid = 'directory_role_save')
+	post_delete.connect(directory.role_deleted,sender = Role,dispatch_uid = 'directory_role_delete')
@@ -1,3 +1,203 @@
+import datetime
+import io
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from . import directory,retention
+from .forms import EmployeeCreateForm
+from .models import Department,Employee,EmployeeDirectory,EmployeeIdSequence
+from .utility import day_of_year,day_of_year_window,sequence_code,sequence_number
 
-# Create your tests here.
+
+
+def make_employee(username,birthday,startdate = None,**fields):
+	return Employee.objects.create(
+		user = User.objects.create_user(username),
+		firstname = username.title(),
+		lastname = 'Test',
+		birthday = birthday,
+		startdate = startdate,
+		**fields
+	)
+
+
+
+class UpcomingTests(TestCase):
+	def upcoming(self,days,today):
+		return [(employee.firstname,employee.days_away) for employee in Employee.objects.upcoming_birthdays(days,today = today)]
+
+
+	def test_window(self):
+		self.assertEqual(day_of_year_window(datetime.date(2027,3,1),10),[(61,70)])
+		self.assertEqual(day_of_year_window(datetime.date(2027,12,25),14),[(360,366),(1,7)])
+		self.assertEqual(day_of_year_window(datetime.date(2027,2,20),14),[(51,65)]) # no feb 29 in 2027
+
+
+	def test_wraps_past_year_end(self):
+		make_employee('ada',datetime.date(1990,12,30))
+		make_employee('grace',datetime.date(1985,1,3))
+		make_employee('linus',datetime.date(1980,1,20))
+		self.assertEqual(self.upcoming(14,datetime.date(2027,12,25)),[('Ada',5),('Grace',9)])
+		self.assertEqual(self.upcoming(14,datetime.date(2028,1,1)),[('Grace',2)])
+
+
+	def test_feb_29_outside_leap_years(self):
+		make_employee('ada',datetime.date(1992,2,29))
+		make_employee('grace',datetime.date(1990,3,1))
+		make_employee('linus',datetime.date(1990,3,2))
+		self.assertEqual(self.upcoming(3,datetime.date(2027,2,27)),[('Ada',2),('Grace',2)]) # feb 29 comes round on mar 1
+		self.assertEqual(self.upcoming(4,datetime.date(2028,2,27)),[('Ada',2),('Grace',3)])
+		self.assertEqual(self.upcoming(400,datetime.date(2027,3,2)),[('Linus',0),('Ada',364),('Grace',365)]) # 2028 has feb 29
+
+
+	def test_days_across_feb_in_the_next_year(self):
+		make_employee('ada',datetime.date(1990,3,5))
+		self.assertEqual(self.upcoming(120,datetime.date(2026,12,1)),[('Ada',94)]) # 2027 has no feb 29
+		self.assertEqual(self.upcoming(120,datetime.date(2027,12,1)),[('Ada',95)])
+
+
+	def test_anniversaries(self):
+		make_employee('ada',datetime.date(1990,1,1),startdate = datetime.date(2020,1,10))
+		make_employee('grace',datetime.date(1990,1,1),startdate = datetime.date(2027,1,5)) # starts this year, no anniversary yet
+		self.assertEqual([(employee.firstname,employee.days_away) for employee in Employee.objects.upcoming_anniversaries(14,today = datetime.date(2027,1,1))],[('Ada',9)])
+
+
+	def test_deleted_left_out(self):
+		make_employee('ada',datetime.date(1990,6,2),is_deleted = True)
+		self.assertEqual(self.upcoming(30,datetime.date(2027,6,1)),[])
+		self.assertEqual(day_of_year(datetime.date(1990,6,2)),154)
+
+
+
+class EmployeeIdTests(TestCase):
+	def test_allocate_disjoint_blocks(self):
+		first = EmployeeIdSequence.objects.allocate(3)
+		second = EmployeeIdSequence.objects.allocate(2)
+		self.assertEqual(first,['RGL/00/000','RGL/00/001','RGL/00/002'])
+		self.assertEqual(second,['RGL/00/003','RGL/00/004'])
+		self.assertEqual(EmployeeIdSequence.objects.allocate(0),[])
+		self.assertEqual(sequence_number(sequence_code(360091)),360091)
+		self.assertEqual(sequence_code(360091),'RGL/A0/091')
+
+
+	def test_blank_id_allocated(self):
+		EmployeeIdSequence.objects.allocate(5)
+		self.assertEqual(make_employee('ada',datetime.date(1990,1,1)).employeeid,'RGL/00/005')
+
+
+	def test_typed_id_must_be_issued(self):
+		EmployeeIdSequence.objects.allocate(5)
+		self.assertEqual(make_employee('ada',datetime.date(1990,1,1),employeeid = '00003').employeeid,'RGL/00/003')
+		with self.assertRaises(ValueError):
+			make_employee('grace',datetime.date(1990,1,1),employeeid = 'ZZ999')
+		self.assertEqual(make_employee('linus',datetime.date(1990,1,1),employeeid = 'XYABC').employeeid,'RGL/XY/ABC') # outside the layout
+		self.assertEqual(EmployeeIdSequence.objects.get().value,5) # typed ids never move the sequence
+		self.assertEqual(make_employee('alan',datetime.date(1990,1,1)).employeeid,'RGL/00/005')
+
+
+	def test_unchanged_id_not_checked(self):
+		employee = make_employee('ada',datetime.date(1990,1,1))
+		EmployeeIdSequence.objects.update(value = 0) # eg. a code kept from before the sequence
+		employee = Employee.objects.get(pk = employee.pk)
+		employee.firstname = 'Augusta'
+		employee.save()
+		employee.employeeid = '00009'
+		with self.assertRaises(ValueError):
+			employee.save()
+
+
+	def test_form_rejects_unissued_id(self):
+		EmployeeIdSequence.objects.allocate(5)
+		form = EmployeeCreateForm(data = {'employeeid':'A0026'})
+		form.is_valid()
+		self.assertIn('has not been issued yet',form.errors['employeeid'][0])
+
+
+
+class RetentionTests(TestCase):
+	def setUp(self):
+		from leave.models import Leave
+
+		self.gone = make_employee('ada',datetime.date(1960,1,1),dateleft = datetime.date(2010,6,30))
+		self.staying = make_employee('grace',datetime.date(1970,1,1))
+		self.leave = Leave.objects.create(user = self.gone.user,startdate = datetime.date(2010,5,28),enddate = datetime.date(2010,6,3))
+		Leave.objects.create(user = self.staying.user,startdate = datetime.date(2010,5,3),enddate = datetime.date(2010,5,5))
+		self.cutoff = retention.cutoff_date(6,today = datetime.date(2026,10,19))
+
+
+	def test_cutoff(self):
+		self.assertEqual(self.cutoff,datetime.date(2020,10,19))
+		self.assertEqual(retention.cutoff_date(6,today = datetime.date(2028,2,29)),datetime.date(2022,2,28))
+		self.assertEqual(list(retention.expired_users(self.cutoff)),[self.gone.user])
+
+
+	def test_plan_children_first(self):
+		plan = [(action,model._meta.label,field) for action,model,_,field in retention.deletion_plan(User)]
+		self.assertLess(plan.index(('delete','leave.LeaveEvent',None)),plan.index(('delete','leave.Leave',None)))
+		self.assertLess(plan.index(('delete','employee.EmployeeDirectory',None)),plan.index(('delete','employee.Employee',None)))
+		self.assertIn(('null','leave.LeaveEvent','actor'),plan)
+
+
+	def test_purge(self):
+		from leave import stats
+		from leave.models import Leave,LeaveMonthlyStat
+
+		stats.build(full = True)
+		counts = retention.purge(User,[self.gone.user_id])
+		self.assertEqual((counts['auth.User'],counts['employee.Employee'],counts['leave.Leave']),(1,1,1))
+		self.assertFalse(Employee.objects.all_employees().filter(pk = self.gone.pk).exists())
+		self.assertEqual(list(Leave.objects.values_list('user_id',flat = True)),[self.staying.user_id])
+		self.assertEqual(
+			sorted(LeaveMonthlyStat.objects.filter(stale = True).values_list('month',flat = True).distinct()),
+			[datetime.date(2010,5,1),datetime.date(2010,6,1)],
+		)
+		stats.build()
+		self.assertEqual(stats.report(datetime.date(2010,5,1),datetime.date(2010,6,1),status = 'pending'),[
+			{'month':datetime.date(2010,5,1),'leavetype':'sick','department_name':None,'employeetype':'Full-Time','leaves':1,'days':2},
+		])
+
+
+	def test_dry_run(self):
+		output = io.StringIO()
+		call_command('purge_retention',dry_run = True,years = 6,stderr = output)
+		self.assertIn('1 user(s), 0 profile(s)',output.getvalue())
+		self.assertIn('delete leave.Leave where user__pk',output.getvalue())
+		self.assertTrue(User.objects.filter(pk = self.gone.user_id).exists())
+
+
+
+class DirectoryTests(TestCase):
+	def setUp(self):
+		self.research = Department.objects.create(name = 'Research')
+		self.employee = make_employee('ada',datetime.date(1990,1,1),department = self.research)
+
+
+	def entry(self):
+		return EmployeeDirectory.objects.get(employee = self.employee)
+
+
+	def test_follows_saves(self):
+		self.assertEqual((self.entry().fullname,self.entry().username,self.entry().department_name),('Ada Test','ada','Research'))
+		self.employee.lastname = 'Lovelace'
+		self.employee.save()
+		self.assertEqual(self.entry().fullname,'Ada Lovelace')
+		user = self.employee.user
+		user.username = 'countess'
+		user.is_active = False
+		user.save()
+		self.assertEqual((self.entry().username,self.entry().is_active),('countess',False))
+
+
+	def test_follows_reference_tables(self):
+		self.research.name = 'R&D'
+		self.research.save()
+		self.assertEqual(self.entry().department_name,'R&D')
+		self.research.delete()
+		self.assertEqual((self.entry().department_id,self.entry().department_name),(None,None))
+
+
+	def test_rebuild(self):
+		EmployeeDirectory.objects.all().delete()
+		make_employee('grace',datetime.date(1985,1,1))
+		self.assertEqual(directory.rebuild(batch_size = 1),2)
+		self.assertEqual(sorted(EmployeeDirectory.objects.values_list('username',flat = True)),['ada','grace'])
@@ -1,3 +1,4 @@
+import datetime
 
 RGL = 'RGL'
 slant = '/'
@@ -49,3 +50,107 @@ def code_format(raw_data):
 
 	else:
 		return
+
+
+
+
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+SEQUENCE_LIMIT = 36 * 36 * 1000 # RGL/ZZ/999 is the last code a sequence can hand out
+
+
+
+def sequence_code(number):
+	'''
+	sequence number -> employee code in the code_format layout RGL/XX/NNN
+	XX is number // 1000 in base 36, NNN the remainder
+	eg. 91 -> RGL/00/091, 360091 -> RGL/A0/091
+	'''
+	if not 0 <= number < SEQUENCE_LIMIT:
+		raise ValueError('employee id sequence exhausted at {0}'.format(number))
+	series,serial = divmod(number,1000)
+	return '{0}{1}{2}{3}{1}{4:03d}'.format(RGL,slant,BASE36[series // 36],BASE36[series % 36],serial)
+
+
+
+def sequence_number(code):
+	'''
+	inverse of sequence_code -> None for codes that don't follow the layout
+	'''
+	parts = (code or '').upper().split(slant)
+	if len(parts) != 3 or parts[0] != RGL or len(parts[1]) != 2 or not parts[2].isdigit() or len(parts[2]) != 3:
+		return
+	if not all(char in BASE36 for char in parts[1]):
+		return
+	return int(parts[1],36) * 1000 + int(parts[2])
+
+
+
+
+LEAP_YEAR = 2000 # day of year is always taken in a leap year -> feb 29 is 60, dec 31 is 366
+
+
+
+def day_of_year(value):
+	'''
+	date or 'yyyy-mm-dd' -> 1..366, same number for the same month/day in every year
+	None -> None
+	'''
+	if not value:
+		return
+	if isinstance(value,str):
+		value = datetime.date.fromisoformat(value[:10])
+	return datetime.date(LEAP_YEAR,value.month,value.day).timetuple().tm_yday
+
+
+
+def day_of_year_window(start,days):
+	'''
+	inclusive day of year ranges covering the days days from start, split in two
+	when the window wraps past the end of the year eg. [(350,366),(1,14)]
+	the end is taken from the real calendar - outside leap years feb 29 (60) is no day of its own
+	'''
+	first = day_of_year(start)
+	if days >= 366:
+		return [(1,366)]
+	last = day_of_year(start + datetime.timedelta(days = days - 1))
+	if last >= first:
+		return [(first,last)]
+	return [(first,366),(1,last)]
+
+
+
+def is_leap(year):
+	return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+
+
+def full_name(firstname,lastname,othername = None):
+	'''
+	the name layout of Employee.get_full_name, from plain values (directory rows, migrations)
+	'''
+	if (firstname and lastname) or othername is None:
+		return firstname + ' ' + lastname
+	elif othername:
+		return firstname + ' ' + lastname + ' ' + othername
+	return
+
+
+
+AGE_BANDS = ((20,'under 20'),(30,'20-29'),(40,'30-39'),(50,'40-49'),(60,'50-59'))
+
+
+
+def age_band(birthday,today = None):
+	'''
+	date of birth -> '30-39' like band, None without a birthday
+	bands move on birthdays - the directory rebuild refreshes them (manage.py rebuild_directory)
+	'''
+	if not birthday:
+		return
+	today = today or datetime.date.today()
+	age = today.year - birthday.year - ((today.month,today.day) < (birthday.month,birthday.day))
+	for limit,band in AGE_BANDS:
+		if age < limit:
+			return band
+	return '60 and over'
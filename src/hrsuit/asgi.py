@@ -0,0 +1,41 @@
+"""
+ASGI config for hrsuit project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+The leave event stream is answered by leave.streams.asgi_leave_stream directly
+(under the tenant of the request, see hrsuit/tenancy.py), everything else goes through django.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hrsuit.settings')
+os.environ.setdefault('HRSUIT_ASGI', '1')
+
+django_application = get_asgi_application()
+
+from django.urls import reverse  # noqa: E402 - needs django set up
+from hrsuit import tenancy  # noqa: E402
+from leave.streams import asgi_leave_stream  # noqa: E402
+
+LEAVE_STREAM_PATH = reverse('dashboard:leavestream')
+
+
+def scope_host(scope):
+    for name, value in scope.get('headers', ()):
+        if name == b'host':
+            return value.decode('latin1')
+    return (scope.get('server') or ('',))[0] or ''
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        tenant, path, prefix = tenancy.resolve(scope_host(scope), scope['path'])
+        if path == LEAVE_STREAM_PATH:
+            with tenancy.activate(tenant):
+                return await asgi_leave_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,264 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from . import tenancy
+
+
+'''
+operational metrics in the prometheus text format, served at /metrics (hrsuit/views.py).
+
+counters and histograms live in this process' memory - inc()/observe() take a lock and update
+one dict entry, a few microseconds. with settings.METRICS_DIR set, every process writes its values
+to its own json file in that directory at most every METRICS_WRITE_SECONDS (after a request) and at
+exit, and /metrics adds up the files of all processes -> one scrape sees every gunicorn worker.
+files of stopped workers are kept so the totals never go down; empty the directory on deploy.
+
+SUBMISSIONS = metrics.counter('hrsuit_things_total','things done',('kind',))
+SUBMISSIONS.inc('sick')
+'''
+
+LATENCY_BUCKETS = (0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0)
+QUERY_BUCKETS = (0,1,2,5,10,20,50,100,200,500)
+UNRESOLVED = '<unresolved>'
+
+_lock = threading.Lock()
+_registry = dict() # name -> Counter/Histogram
+_file = None
+_next_write = 0.0
+
+
+
+class Counter:
+	kind = 'counter'
+
+	def __init__(self,name,documentation,labels = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labels = tuple(labels)
+		self.values = dict() # (label values) -> number
+
+
+	def inc(self,*labels,amount = 1):
+		with _lock:
+			self.values[labels] = self.values.get(labels,0) + amount
+
+
+	def snapshot(self):
+		with _lock:
+			return [[list(labels),list(value) if isinstance(value,list) else value] for labels,value in self.values.items()]
+
+
+
+class Histogram(Counter):
+	kind = 'histogram'
+
+	def __init__(self,name,documentation,labels = (),buckets = LATENCY_BUCKETS):
+		super().__init__(name,documentation,labels)
+		self.buckets = tuple(sorted(buckets))
+
+
+	def observe(self,value,*labels):
+		index = bisect.bisect_left(self.buckets,value) # first bucket with value <= le, len(buckets) is +Inf
+		with _lock:
+			row = self.values.get(labels)
+			if row is None:
+				row = self.values[labels] = [0] * (len(self.buckets) + 2) # bucket counts..., +Inf, sum
+			row[index] += 1
+			row[-1] += value
+
+
+
+def _register(metric):
+	with _lock:
+		return _registry.setdefault(metric.name,metric)
+
+
+
+def counter(name,documentation,labels = ()):
+	'''
+	module level definition -> the same Counter for every caller of this name
+	'''
+	return _register(Counter(name,documentation,labels))
+
+
+
+def histogram(name,documentation,labels = (),buckets = LATENCY_BUCKETS):
+	return _register(Histogram(name,documentation,labels,buckets))
+
+
+
+# multiprocess ----------------------------------------------------------------
+def snapshot():
+	'''
+	{name:{'kind','help','labels','buckets','values'}} of this process -> json serialisable
+	'''
+	return {
+		metric.name:{
+			'kind':metric.kind,
+			'help':metric.documentation,
+			'labels':list(metric.labels),
+			'buckets':list(getattr(metric,'buckets',())),
+			'values':metric.snapshot(),
+		}
+		for metric in list(_registry.values())
+	}
+
+
+
+def _directory():
+	return getattr(settings,'METRICS_DIR',None)
+
+
+
+def write():
+	'''
+	this process' values -> METRICS_DIR/<pid>-<start>.json, replaced atomically
+	'''
+	global _file,_next_write
+	directory = _directory()
+	if not directory:
+		return
+	if _file is None:
+		os.makedirs(directory,exist_ok = True)
+		_file = os.path.join(directory,'{0}-{1}.json'.format(os.getpid(),int(time.time())))
+		atexit.register(write)
+	_next_write = time.monotonic() + getattr(settings,'METRICS_WRITE_SECONDS',5)
+	partial = _file + '.tmp'
+	with open(partial,'w') as handle:
+		json.dump(snapshot(),handle)
+	os.replace(partial,_file)
+
+
+
+def maybe_write():
+	'''
+	after every request -> writes only when METRICS_WRITE_SECONDS have passed
+	'''
+	if time.monotonic() >= _next_write:
+		write()
+
+
+
+def collect():
+	'''
+	values of every process (METRICS_DIR) or of this one -> snapshot() layout, values summed per label set
+	'''
+	directory = _directory()
+	if not directory:
+		return snapshot()
+	write()
+	merged = dict()
+	for path in sorted(glob.glob(os.path.join(directory,'*.json'))):
+		try:
+			with open(path) as handle:
+				data = json.load(handle)
+		except (OSError,ValueError):
+			continue # removed or replaced while reading
+		for name,metric in data.items():
+			target = merged.setdefault(name,dict(metric,values = dict()))
+			for labels,value in metric['values']:
+				key = tuple(labels)
+				if key not in target['values']:
+					target['values'][key] = value
+				elif isinstance(value,list): # histogram row
+					target['values'][key] = [a + b for a,b in zip(target['values'][key],value)]
+				else:
+					target['values'][key] += value
+	for metric in merged.values():
+		metric['values'] = [[list(labels),value] for labels,value in metric['values'].items()]
+	return merged
+
+
+
+def _escape(value):
+	return str(value).replace('\\','\\\\').replace('"','\\"').replace('\n','\\n')
+
+
+
+def _samples(name,metric,labels,value):
+	'''
+	one stored value -> (sample name,[(label,value),...],number) lines
+	'''
+	pairs = list(zip(metric['labels'],labels))
+	if metric['kind'] != Histogram.kind:
+		yield name,pairs,value
+		return
+	cumulative = 0
+	for le,count in zip(metric['buckets'] + ['+Inf'],value[:-1]):
+		cumulative += count
+		yield name + '_bucket',pairs + [('le',le if le == '+Inf' else repr(float(le)))],cumulative
+	yield name + '_sum',pairs,value[-1]
+	yield name + '_count',pairs,cumulative
+
+
+
+def _number(value):
+	return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+
+def render(data = None):
+	'''
+	collect() -> prometheus text exposition format 0.0.4
+	'''
+	data = collect() if data is None else data
+	lines = []
+	for name in sorted(data):
+		metric = data[name]
+		lines.append('# HELP {0} {1}'.format(name,metric['help'].replace('\\','\\\\').replace('\n','\\n')))
+		lines.append('# TYPE {0} {1}'.format(name,metric['kind']))
+		for labels,value in sorted(metric['values']):
+			for sample,pairs,number in _samples(name,metric,labels,value):
+				label_text = ','.join('{0}="{1}"'.format(key,_escape(label)) for key,label in pairs)
+				lines.append('{0}{1} {2}'.format(sample,'{' + label_text + '}' if label_text else '',_number(number)))
+	return '\n'.join(lines) + '\n'
+
+
+
+# request instrumentation -----------------------------------------------------
+REQUEST_LATENCY = histogram('hrsuit_request_duration_seconds','time to build the response, by url name',('view','method','tenant'))
+REQUEST_QUERIES = histogram('hrsuit_request_queries','database queries per request, by url name',('view','tenant'),QUERY_BUCKETS)
+
+
+
+class _QueryCounter:
+	__slots__ = ('count',)
+
+	def __init__(self):
+		self.count = 0
+
+
+	def __call__(self,execute,sql,params,many,context):
+		self.count += 1
+		return execute(sql,params,many,context)
+
+
+
+class MetricsMiddleware:
+	'''
+	latency and query count of every request, keyed by url name - right after TenantMiddleware.
+	queries are counted on the tenant database connection of the request's thread
+	'''
+	def __init__(self,get_response):
+		self.get_response = get_response
+
+
+	def __call__(self,request):
+		queries = _QueryCounter()
+		started = time.perf_counter()
+		with connections[tenancy.current_database()].execute_wrapper(queries):
+			response = self.get_response(request)
+		elapsed = time.perf_counter() - started
+		match = getattr(request,'resolver_match',None)
+		view = match.view_name if match is not None else UNRESOLVED
+		tenant = tenancy.current_tenant() or ''
+		REQUEST_LATENCY.observe(elapsed,view,request.method,tenant)
+		REQUEST_QUERIES.observe(queries.count,view,tenant)
+		maybe_write()
+		return response
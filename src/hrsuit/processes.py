@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+'''
+process pools for management commands doing cpu heavy or embarrassingly parallel work.
+workers are spawned (not forked) so they never share the parent's open database connections,
+each one runs django.setup() before its own initializer.
+
+with processes.pool(4,initializer = 'leave.integrity.read_only') as pool:
+	for result in pool.map(check_range,chunks): ...
+
+one pool serves every tenant - processes.submit() runs the task under the caller's tenant,
+pool.map() and pool.submit() run under the worker's default (HRSUIT_TENANT of the parent process).
+'''
+
+
+
+def _setup(settings_module,initializer,initargs):
+	os.environ.setdefault('DJANGO_SETTINGS_MODULE',settings_module)
+	import django
+	django.setup()
+	if initializer is not None:
+		from django.utils.module_loading import import_string
+		import_string(initializer)(*initargs)
+
+
+
+def pool(workers = None,initializer = None,initargs = ()):
+	'''
+	ProcessPoolExecutor whose workers have django set up -> use as a context manager
+	initializer is a dotted path, imported in the worker once django is set up
+	(unpickling a function object would import its models module before the app registry is ready)
+	'''
+	return ProcessPoolExecutor(
+		max_workers = workers or os.cpu_count(),
+		mp_context = multiprocessing.get_context('spawn'),
+		initializer = _setup,
+		initargs = (os.environ['DJANGO_SETTINGS_MODULE'],initializer,initargs),
+	)
+
+
+
+def _run(tenant,function,args):
+	from hrsuit import tenancy
+	with tenancy.activate(tenant):
+		return function(*args)
+
+
+
+def submit(pool,function,*args):
+	'''
+	pool.submit(function,*args) with the caller's tenant active in the worker -> Future
+	'''
+	from hrsuit import tenancy
+	return pool.submit(_run,tenancy.current_tenant(),function,args)
@@ -26,6 +26,77 @@ EMAIL_USE_TLS = True
 
 
 
+# Login throttling - token buckets per username and per client ip in the database, shared by every worker (see accounts/throttle.py)
+# RATE is tokens refilled per second, BURST the bucket size
+LOGIN_THROTTLE_ENABLED = True
+LOGIN_THROTTLE_USERNAME_RATE = 1 / 60.0
+LOGIN_THROTTLE_USERNAME_BURST = 5
+LOGIN_THROTTLE_IP_RATE = 1 / 6.0
+LOGIN_THROTTLE_IP_BURST = 20
+LOGIN_THROTTLE_TRUST_FORWARDED = False
+
+
+
+# Staffing forecast shown on the leave detail page (see leave/forecast.py)
+# MIN_PRESENT is the fraction of a department's active members that must be in on any day
+STAFFING_FORECAST_DAYS = 90
+STAFFING_MIN_PRESENT = 0.75
+
+
+
+# Approval letters - pdfs rendered by a pool of worker processes (see leave/letters.py), 0 turns them off
+LETTER_WORKERS = 2
+
+
+
+# Bulk user provisioning (accounts/provisioning.py) - password hashing processes, None uses every core, 1 hashes in-process
+PROVISION_WORKERS = None
+PROVISION_UPLOAD_ROWS = 5 # the web upload hashes in the request (~0.1s a password), no pool - bigger files go through manage.py provision_users
+
+
+
+# Data retention - employees whose Date Left is older than this are purged by manage.py purge_retention
+RETENTION_YEARS = 6
+
+
+
+# Rendered detail pages kept in the cache under their ETag (see dashboard/conditional.py)
+PAGE_CACHE_SECONDS = 60 * 60
+
+
+
+# Most users offered by the user search on the employee form (accounts:userautocomplete)
+USER_AUTOCOMPLETE_LIMIT = 20
+
+
+
+# Metrics - prometheus text format at /metrics (see hrsuit/metrics.py)
+# METRICS_DIR is shared by all workers of the deployment (one file each), None keeps metrics per process
+METRICS_DIR = os.environ.get('HRSUIT_METRICS_DIR') or None
+METRICS_WRITE_SECONDS = 5
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+
+
+# Slow query log - queries slower than SLOW_QUERY_SECONDS are kept with their plan (see hrsuit/slowqueries.py)
+# BUFFER records per process are shown at /admin/slow-queries/, LOG is a json lines file (None: not written)
+# SLOW_QUERY_SECONDS = None turns the log off, SLOW_QUERY_PARAMS = True records parameter values
+# (password hashes, emails and other personal data end up in the log) instead of their types
+SLOW_QUERY_SECONDS = 0.2
+SLOW_QUERY_PARAMS = False
+SLOW_QUERY_BUFFER = 200
+SLOW_QUERY_LOG = os.environ.get('HRSUIT_SLOW_QUERY_LOG') or None
+
+
+
+# Role based permissions - employee Role name -> allowed actions (see accounts/permissions.py)
+# superusers are always allowed every action
+ROLE_PERMISSIONS = {
+    'HR Manager': ['approve_leaves','manage_employees','manage_users'],
+}
+
+
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -52,12 +123,17 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'hrsuit.tenancy.TenantMiddleware',
+    'hrsuit.metrics.MetricsMiddleware',
+    'hrsuit.slowqueries.SlowQueryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'employee.middleware.EmployeeIdentityMiddleware',
+    'leave.middleware.LeaveAuditMiddleware',
 ]
 
 ROOT_URLCONF = 'hrsuit.urls'
@@ -73,12 +149,22 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.role_actions',
+                'dashboard.context_processors.live_updates',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'hrsuit.wsgi.application'
+ASGI_APPLICATION = 'hrsuit.asgi.application'
+
+# hrsuit/asgi.py sets HRSUIT_ASGI=1 -> dashboard read pages use their async views
+ASYNC_READ_VIEWS = os.environ.get('HRSUIT_ASGI') == '1'
+
+# live dashboard updates (leave/streams.py) - only under ASGI, where an open stream is an idle coroutine.
+# under WSGI every open tab would hold a worker, pages don't open the stream and the endpoint answers once
+LIVE_UPDATES = os.environ.get('HRSUIT_ASGI') == '1'
 
 
 # Database
@@ -88,10 +174,42 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
 
+# Tenants - companies served by this deployment (see hrsuit/tenancy.py)
+# name -> hosts and/or url prefix that select it, and the DATABASES alias holding its data
+# tenant hosts must be in ALLOWED_HOSTS as well
+# every tenant database is migrated on its own: python manage.py migrate --database <alias>
+# give tenant aliases a CONN_MAX_AGE too, each worker keeps one open connection per tenant
+#
+# TENANTS = {
+#     'north': {'hosts': ['north.hr.example.com'], 'prefix': 'north', 'database': 'north'},
+# }
+# DATABASES['north'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(BASE_DIR, 'north.sqlite3'), 'CONN_MAX_AGE': 60}
+TENANTS = {}
+
+DATABASE_ROUTERS = ['hrsuit.tenancy.TenantRouter']
+
+
+# Cache - keys carry the tenant, companies never share entries
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'KEY_FUNCTION': 'hrsuit.tenancy.make_key',
+    },
+    # seen by every worker process - version stamps that must reach all of them (employee/refcache.py,
+    # accounts/permissions.py) and calendar feed change stamps (leave/feeds.py)
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(os.path.dirname(BASE_DIR),'cache'),
+        'KEY_FUNCTION': 'hrsuit.tenancy.make_key',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,168 @@
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from . import metrics,tenancy
+
+
+'''
+slow query log.
+SlowQueryMiddleware wraps the request's database connection (connection.execute_wrapper) and times
+every query. a query slower than settings.SLOW_QUERY_SECONDS is recorded with its sql, parameter types
+(the values only with settings.SLOW_QUERY_PARAMS - they carry password hashes and personal data), url name, the project line that ran it and the database's plan for it (EXPLAIN QUERY PLAN on sqlite)
+-> kept in a ring buffer of the last SLOW_QUERY_BUFFER records (admin: /admin/slow-queries/) and
+appended to the SLOW_QUERY_LOG json lines file.
+fast queries only pay for two perf_counter() calls. the buffer is per process, the log file is shared.
+
+a plan line like "SCAN TABLE leave_leave" on a filtered query means a missing index.
+'''
+
+PARAM_LENGTH = 200 # longer parameters are cut in the records
+EXPLAINED = ('SELECT','UPDATE','DELETE','WITH')
+
+_lock = threading.Lock()
+_buffer = None
+
+
+
+def records(tenant):
+	'''
+	recorded slow queries of this process for one tenant -> newest first
+	the buffer is shared by every tenant served here, the sql and parameters carry their data
+	'''
+	with _lock:
+		return [entry for entry in reversed(_buffer or ()) if entry['tenant'] == tenant]
+
+
+
+def _location():
+	'''
+	first frame in the project's own code, execute wrappers left out -> 'leave/manager.py:42 in pending'
+	'''
+	wrappers = {os.path.abspath(__file__),os.path.abspath(metrics.__file__)}
+	frame = sys._getframe(1)
+	while frame is not None:
+		path = os.path.abspath(frame.f_code.co_filename)
+		if path.startswith(settings.BASE_DIR) and path not in wrappers and 'site-packages' not in path:
+			return '{0}:{1} in {2}'.format(os.path.relpath(path,settings.BASE_DIR),frame.f_lineno,frame.f_code.co_name)
+		frame = frame.f_back
+	return None
+
+
+
+def _redact(value):
+	return None if value is None else '<{0}>'.format(type(value).__name__)
+
+
+
+def _params(params,many):
+	'''
+	parameters for the record -> '<str>' like type names unless SLOW_QUERY_PARAMS, then the values cut to PARAM_LENGTH
+	'''
+	if params is None or many:
+		return None
+	if settings.SLOW_QUERY_PARAMS:
+		cut = lambda value:value if not isinstance(value,str) or len(value) <= PARAM_LENGTH else value[:PARAM_LENGTH] + '...'
+	else:
+		cut = _redact
+	if isinstance(params,dict):
+		return {key:cut(value) for key,value in params.items()}
+	return [cut(value) for value in params]
+
+
+
+def explain(connection,sql,params):
+	'''
+	the database's plan for one statement -> [row,...] as text, None when it can't be explained
+	runs on a cursor of its own, the recorder lets it through untimed
+	'''
+	if sql.lstrip().split(None,1)[0].upper() not in EXPLAINED:
+		return None
+	try:
+		with connection.cursor() as cursor:
+			cursor.execute('{0} {1}'.format(connection.ops.explain_query_prefix(),sql),params)
+			return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+	except Exception as error: # a plan is a nice to have, never break the request for it
+		return ['EXPLAIN failed: {0}'.format(error)]
+
+
+
+def record(entry):
+	'''
+	one slow query -> ring buffer and SLOW_QUERY_LOG
+	'''
+	global _buffer
+	with _lock:
+		if _buffer is None:
+			_buffer = collections.deque(maxlen = settings.SLOW_QUERY_BUFFER)
+		_buffer.append(entry)
+	if settings.SLOW_QUERY_LOG:
+		line = json.dumps(entry,default = str) + '\n'
+		with _lock, open(settings.SLOW_QUERY_LOG,'a') as log:
+			log.write(line)
+
+
+
+class SlowQueryRecorder:
+	'''
+	execute wrapper for the queries of one request
+	'''
+	def __init__(self,request,threshold):
+		self.request = request
+		self.threshold = threshold
+		self.explaining = False
+
+
+	def __call__(self,execute,sql,params,many,context):
+		if self.explaining:
+			return execute(sql,params,many,context)
+		started = time.perf_counter()
+		try:
+			return execute(sql,params,many,context)
+		finally:
+			elapsed = time.perf_counter() - started
+			if elapsed >= self.threshold:
+				self.slow(sql,params,many,context['connection'],elapsed)
+
+
+	def slow(self,sql,params,many,connection,elapsed):
+		match = getattr(self.request,'resolver_match',None)
+		self.explaining = True
+		try:
+			plan = None if many else explain(connection,sql,params)
+		finally:
+			self.explaining = False
+		record({
+			'time':timezone.now().isoformat(),
+			'duration_ms':round(elapsed * 1000,3),
+			'database':connection.alias,
+			'tenant':tenancy.current_tenant(),
+			'view':match.view_name if match is not None else None,
+			'path':self.request.path,
+			'location':_location(),
+			'sql':sql,
+			'params':_params(params,many),
+			'plan':plan,
+		})
+
+
+
+class SlowQueryMiddleware:
+	'''
+	times the queries of every request on its tenant database - off when SLOW_QUERY_SECONDS is None
+	'''
+	def __init__(self,get_response):
+		self.get_response = get_response
+
+
+	def __call__(self,request):
+		threshold = settings.SLOW_QUERY_SECONDS
+		if threshold is None:
+			return self.get_response(request)
+		with connections[tenancy.current_database()].execute_wrapper(SlowQueryRecorder(request,threshold)):
+			return self.get_response(request)
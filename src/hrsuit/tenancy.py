@@ -0,0 +1,140 @@
+import os
+from contextlib import contextmanager
+from asgiref.local import Local
+from django.conf import settings
+from django.urls import get_script_prefix,set_script_prefix
+
+
+'''
+one deployment, several companies.
+settings.TENANTS names each company with the hosts and/or the url prefix that serve it and the
+DATABASES alias holding its data:
+
+TENANTS = {
+	'north':{'hosts':['north.hr.example.com'],'prefix':'north','database':'north'},
+}
+
+TenantMiddleware resolves the tenant of every request (host first, then /<prefix>/...), TenantRouter
+sends every query of that request to the tenant's alias, make_key puts the tenant in front of every
+cache key. each tenant database carries the full schema - Employee and Leave point at auth.User,
+and relations can't cross databases, so users, sessions and admin live with the company's data.
+requests matching no tenant use the 'default' database.
+
+outside a request (manage.py, cron, process pools) the tenant comes from the HRSUIT_TENANT
+environment variable: HRSUIT_TENANT=north python manage.py escalate_approvals
+migrate every tenant with: python manage.py migrate --database north
+'''
+
+_state = Local() # per thread under WSGI, per request task under ASGI (shared with its sync_to_async calls)
+
+
+
+def tenants():
+	return getattr(settings,'TENANTS',None) or dict()
+
+
+
+def current_tenant():
+	'''
+	name of the active tenant -> None for the default site
+	'''
+	tenant = getattr(_state,'tenant',None)
+	if tenant is None:
+		tenant = os.environ.get('HRSUIT_TENANT') or None
+	return tenant
+
+
+
+def current_database():
+	tenant = current_tenant()
+	if tenant is None:
+		return 'default'
+	return tenants()[tenant].get('database',tenant)
+
+
+
+@contextmanager
+def activate(tenant):
+	'''
+	with tenancy.activate('north'): ... -> queries and cache keys of the block belong to north
+	'''
+	if tenant is not None and tenant not in tenants():
+		raise KeyError('unknown tenant {0}'.format(tenant))
+	previous = getattr(_state,'tenant',None)
+	_state.tenant = tenant
+	try:
+		yield tenant
+	finally:
+		_state.tenant = previous
+
+
+
+def resolve(host,path):
+	'''
+	(host,path) -> (tenant or None,path without the tenant prefix,prefix or '')
+	'north.hr.example.com:8000','/dashboard/' -> ('north','/dashboard/','')
+	'hr.example.com','/north/dashboard/' -> ('north','/dashboard/','north')
+	'''
+	host = host.split(':')[0].lower()
+	for name,tenant in tenants().items():
+		if host in tenant.get('hosts',()):
+			return name,path,''
+	for name,tenant in tenants().items():
+		prefix = tenant.get('prefix')
+		if prefix and (path == '/' + prefix or path.startswith('/' + prefix + '/')):
+			return name,path[len(prefix) + 1:] or '/',prefix
+	return None,path,''
+
+
+
+class TenantMiddleware:
+	'''
+	first in MIDDLEWARE - sessions, auth and everything after it already run against the tenant.
+	a url prefix is moved into the script prefix so reverse() keeps generating /<prefix>/... links
+	'''
+	def __init__(self,get_response):
+		self.get_response = get_response
+
+
+	def __call__(self,request):
+		tenant,path_info,prefix = resolve(request.get_host(),request.path_info)
+		request.tenant = tenant
+		script_prefix = get_script_prefix()
+		if prefix:
+			request.path_info = path_info
+			set_script_prefix('{0}{1}/'.format(script_prefix,prefix))
+		try:
+			with activate(tenant):
+				return self.get_response(request)
+		finally:
+			set_script_prefix(script_prefix)
+
+
+
+class TenantRouter:
+	'''
+	every model goes to the active tenant's database, the default site keeps 'default'.
+	objects related to an instance loaded from a database stay with it (migrate --database north)
+	'''
+	def _database(self,hints):
+		instance = hints.get('instance')
+		if instance is not None and instance._state.db:
+			return instance._state.db
+		return current_database()
+
+
+	def db_for_read(self,model,**hints):
+		return self._database(hints)
+
+
+	def db_for_write(self,model,**hints):
+		return self._database(hints)
+
+
+
+def make_key(key,key_prefix,version):
+	'''
+	CACHES KEY_FUNCTION -> the default key with the tenant in front, tenants never read each other's entries
+	'''
+	return '{0}:{1}:{2}:{3}'.format(current_tenant() or '-',key_prefix,version,key)
+
@@ -0,0 +1,170 @@
+import datetime
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory,TestCase,override_settings
+from django.urls import reverse
+from employee import refcache
+from employee.models import Department,Employee
+from leave import feeds
+from leave.models import Leave
+from . import tenancy
+
+
+'''
+tenancy tests - two tenant sqlite databases next to the default one
+'''
+
+TENANT_DATABASES = ('north','south')
+TENANTS = {
+	'north':{'hosts':['north.hr.test'],'prefix':'north','database':'north'},
+	'south':{'hosts':['south.hr.test'],'prefix':'south','database':'south'},
+}
+
+
+
+# registered on import, before the test runner sets up its databases -> it creates and destroys
+# an in-memory test database for each of them like for 'default'
+for alias in TENANT_DATABASES:
+	connections.databases.setdefault(alias,{'ENGINE':'django.db.backends.sqlite3','NAME':alias + '.sqlite3'})
+	connections.ensure_defaults(alias)
+	connections.prepare_test_settings(alias)
+
+
+
+@override_settings(TENANTS = TENANTS,ALLOWED_HOSTS = ['testserver','north.hr.test','south.hr.test'])
+class TenancyTests(TestCase):
+	databases = {'default','north','south'}
+
+	def setUp(self):
+		cache.clear()
+		refcache.clear()
+
+
+	def test_resolve_host(self):
+		self.assertEqual(tenancy.resolve('north.hr.test:8000','/dashboard/'),('north','/dashboard/',''))
+		self.assertEqual(tenancy.resolve('SOUTH.hr.test','/'),('south','/',''))
+
+
+	def test_resolve_prefix(self):
+		self.assertEqual(tenancy.resolve('hr.test','/north/dashboard/'),('north','/dashboard/','north'))
+		self.assertEqual(tenancy.resolve('hr.test','/north'),('north','/','north'))
+		self.assertEqual(tenancy.resolve('hr.test','/northern/'),(None,'/northern/',''))
+
+
+	def test_unknown_host_uses_default(self):
+		self.assertEqual(tenancy.resolve('hr.test','/dashboard/'),(None,'/dashboard/',''))
+		self.assertIsNone(tenancy.current_tenant())
+		self.assertEqual(tenancy.current_database(),'default')
+
+
+	def test_activate(self):
+		with tenancy.activate('north'):
+			self.assertEqual(tenancy.current_database(),'north')
+			with tenancy.activate('south'):
+				self.assertEqual(tenancy.current_database(),'south')
+			self.assertEqual(tenancy.current_database(),'north')
+		self.assertIsNone(tenancy.current_tenant())
+		with self.assertRaises(KeyError):
+			with tenancy.activate('west'):
+				pass
+
+
+	def test_queries_go_to_the_tenant_database(self):
+		with tenancy.activate('north'):
+			user = User.objects.create_user('ada',password = 'secret')
+			Department.objects.create(name = 'Research')
+			Leave.objects.create(user = user,leavetype = 'sick')
+			self.assertEqual(user._state.db,'north')
+		with tenancy.activate('south'):
+			self.assertFalse(User.objects.filter(username = 'ada').exists())
+			self.assertFalse(Department.objects.exists())
+			self.assertFalse(Leave.objects.exists())
+		self.assertFalse(User.objects.filter(username = 'ada').exists())
+		self.assertEqual(User.objects.using('north').filter(username = 'ada').count(),1)
+		self.assertEqual(Leave.objects.using('north').count(),1)
+
+
+	def test_cache_namespaces(self):
+		with tenancy.activate('north'):
+			cache.set('key','north')
+		with tenancy.activate('south'):
+			self.assertIsNone(cache.get('key'))
+			cache.set('key','south')
+		self.assertIsNone(cache.get('key'))
+		with tenancy.activate('north'):
+			self.assertEqual(cache.get('key'),'north')
+
+
+	def test_reference_tables_per_tenant(self):
+		with tenancy.activate('north'):
+			research = Department.objects.create(name = 'Research')
+			self.assertEqual([department.name for department in refcache.objects(Department)],['Research'])
+		with tenancy.activate('south'):
+			self.assertEqual(refcache.objects(Department),[])
+			self.assertIsNone(refcache.get(Department,research.id))
+			Department.objects.create(name = 'Sales')
+			self.assertEqual([department.name for department in refcache.objects(Department)],['Sales'])
+		with tenancy.activate('north'):
+			self.assertEqual([department.name for department in refcache.objects(Department)],['Research'])
+
+
+	def test_feed_token_bound_to_tenant(self):
+		with tenancy.activate('north'):
+			token = feeds.feed_token(feeds.USER,1,1)
+			self.assertEqual(feeds.read_token(token),(feeds.USER,1,1))
+		with tenancy.activate('south'):
+			self.assertIsNone(feeds.read_token(token))
+		self.assertIsNone(feeds.read_token(token))
+		self.assertEqual(feeds.read_token(feeds.feed_token(feeds.USER,1,1)),(feeds.USER,1,1))
+
+
+	def test_feed_token_revoked_with_its_holder(self):
+		research = Department.objects.create(name = 'Research')
+		sales = Department.objects.create(name = 'Sales')
+		user = User.objects.create_user('ada',password = 'secret')
+		employee = Employee.objects.create(user = user,firstname = 'Ada',lastname = 'Lovelace',birthday = datetime.date(1990,1,1),department = research)
+		token = feeds.feed_token(feeds.DEPARTMENT,research.id,user.id)
+		self.assertEqual(feeds.open_feed(token),(feeds.DEPARTMENT,research.id))
+		self.assertIsNone(feeds.open_feed(feeds.feed_token(feeds.USER,user.id + 1,user.id)))
+		employee.department = sales
+		employee.save()
+		self.assertIsNone(feeds.open_feed(token))
+		employee.department = research
+		employee.is_blocked = True
+		employee.save()
+		self.assertIsNone(feeds.open_feed(token))
+
+
+	def test_middleware_host(self):
+		seen = dict()
+		def view(request):
+			seen.update(tenant = request.tenant,database = tenancy.current_database(),path = request.path_info)
+			return HttpResponse()
+		request = RequestFactory().get('/dashboard/',HTTP_HOST = 'south.hr.test')
+		tenancy.TenantMiddleware(view)(request)
+		self.assertEqual(seen,{'tenant':'south','database':'south','path':'/dashboard/'})
+		self.assertIsNone(tenancy.current_tenant())
+
+
+	def test_prefix_login(self):
+		with tenancy.activate('north'):
+			User.objects.create_user('ada',password = 'secret')
+		response = self.client.post('/north' + reverse('accounts:login'),{'username':'ada','password':'secret'})
+		self.assertRedirects(response,'/north' + reverse('dashboard:dashboard'),fetch_redirect_response = False)
+		response = self.client.post(reverse('accounts:login'),{'username':'ada','password':'secret'},HTTP_HOST = 'south.hr.test')
+		self.assertRedirects(response,reverse('accounts:login'),fetch_redirect_response = False) # unknown to south
+
+
+
+class SlowQueryTests(TestCase):
+	def test_params_redacted(self):
+		from . import slowqueries
+
+		params = ['pbkdf2_sha256$...','ada@example.com',3,None]
+		self.assertEqual(slowqueries._params(params,False),['<str>','<str>','<int>',None])
+		with override_settings(SLOW_QUERY_PARAMS = True):
+			self.assertEqual(slowqueries._params(params,False),params)
+			self.assertEqual(slowqueries._params({'email':'x' * 300},False),{'email':'x' * 200 + '...'})
+		self.assertIsNone(slowqueries._params(params,True))
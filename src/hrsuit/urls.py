@@ -21,8 +21,10 @@ from .import views
 
 
 urlpatterns = [
+    path('admin/slow-queries/',admin.site.admin_view(views.slow_queries_view),name='slowqueries'),
     path('admin/', admin.site.urls),#change url in production --> rabotecsuits.com/_&_wysiwyg-suits_empty-link_url
     path('',views.index_view,name='home'),
+    path('metrics',views.metrics_view,name='metrics'),
     path('accounts/',include('accounts.urls',namespace='accounts')),
     path('dashboard/',include('dashboard.urls',namespace='dashboard')),
 ]
@@ -1,6 +1,35 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
 from django.shortcuts import render,redirect,get_object_or_404
 from django.http import HttpResponse,HttpResponseRedirect
+from . import metrics,slowqueries,tenancy
 
 
 def index_view(request):
-	return render(request,'index.html',{})
\ No newline at end of file
+	return render(request,'index.html',{})
+
+
+
+def metrics_view(request):
+	'''
+	prometheus scrape target -> text format of every worker's metrics (see hrsuit/metrics.py)
+	only answered for METRICS_ALLOWED_IPS
+	'''
+	if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+		raise PermissionDenied
+	return HttpResponse(metrics.render(),content_type = 'text/plain; version=0.0.4; charset=utf-8')
+
+
+
+def slow_queries_view(request):
+	'''
+	admin page (staff only, wrapped in hrsuit/urls.py) -> slow query ring buffer of this process, current tenant only
+	'''
+	dataset = dict()
+	dataset['title'] = 'Slow queries'
+	dataset['records'] = slowqueries.records(tenancy.current_tenant())
+	dataset['threshold_ms'] = settings.SLOW_QUERY_SECONDS * 1000 if settings.SLOW_QUERY_SECONDS is not None else None
+	dataset['size'] = settings.SLOW_QUERY_BUFFER
+	dataset['log'] = settings.SLOW_QUERY_LOG
+	return render(request,'admin/slow_queries.html',dict(admin.site.each_context(request),**dataset))
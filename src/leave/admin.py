@@ -1,7 +1,69 @@
 from django.contrib import admin
-from .models import Leave
+from .models import Leave,LeaveEvent,ApprovalStep,ApprovalTask,LeaveMonthlyStat
+from . import stats
 # from .models import Comment
 
 
-admin.site.register(Leave)
-# admin.site.register(Comment)
\ No newline at end of file
+
+def _bulk_status_action(status,description):
+	def action(modeladmin,request,queryset):
+		count = Leave.objects.bulk_set_status(queryset.values_list('id',flat = True),status,actor = request.user)
+		modeladmin.message_user(request,'{0} leave(s) marked {1}'.format(count,status))
+	action.short_description = description
+	action.__name__ = 'mark_{0}'.format(status)
+	return action
+
+
+
+class LeaveAdmin(admin.ModelAdmin):
+	list_display = ['__str__','startdate','enddate','status']
+	list_filter = ['status','leavetype']
+	actions = [
+		_bulk_status_action('approved','Approve selected leaves'),
+		_bulk_status_action('rejected','Reject selected leaves'),
+		_bulk_status_action('cancelled','Cancel selected leaves'),
+		_bulk_status_action('pending','Move selected leaves back to pending'),
+	]
+
+	def save_model(self,request,obj,form,change):
+		if change and {'startdate','enddate'}.intersection(form.changed_data):
+			stats.mark_stale((form.initial.get('startdate'),form.initial.get('enddate')))# the months it left
+		super().save_model(request,obj,form,change)
+
+
+
+class LeaveEventAdmin(admin.ModelAdmin):
+	'''
+	audit trail is append-only -> read only in the admin
+	'''
+	list_display = ['leave','actor','from_status','to_status','created']
+	list_filter = ['to_status']
+	date_hierarchy = 'created'
+
+	def has_add_permission(self,request):
+		return False
+
+	def has_change_permission(self,request,obj = None):
+		return False
+
+	def has_delete_permission(self,request,obj = None):
+		return False
+
+
+
+class LeaveMonthlyStatAdmin(LeaveEventAdmin):
+	'''
+	built by manage.py build_leave_stats -> read only
+	'''
+	list_display = ['month','leavetype','status','department_name','employeetype','leaves','days','stale']
+	list_filter = ['status','leavetype','employeetype','department_name']
+	date_hierarchy = 'month'
+
+
+
+admin.site.register(Leave,LeaveAdmin)
+admin.site.register(LeaveEvent,LeaveEventAdmin)
+admin.site.register(LeaveMonthlyStat,LeaveMonthlyStatAdmin)
+admin.site.register(ApprovalStep)
+admin.site.register(ApprovalTask)
+# admin.site.register(Comment)
@@ -0,0 +1,116 @@
+import datetime
+from django.db import router,transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import ApprovalStep,ApprovalTask
+
+
+'''
+multi level approval chains.
+a chain is the list of ApprovalStep rows for the requester's department/role ordered by level,
+the open step of every pending leave lives in ApprovalTask - that table is the approver inbox.
+leaves whose requester matches no chain keep the old flow (approved from the global pending list).
+'''
+
+
+
+def chain_for(employee):
+	'''
+	most specific configured chain -> (department,role) > (department,any) > (any,role) > (any,any)
+	one query, [] when nothing matches
+	'''
+	department_id = getattr(employee,'department_id',None)
+	role_id = getattr(employee,'role_id',None)
+	steps = ApprovalStep.objects.filter(
+		Q(department_id = department_id) | Q(department__isnull = True),
+		Q(role_id = role_id) | Q(role__isnull = True),
+	).order_by('level')
+
+	chains = dict()
+	for step in steps:
+		chains.setdefault((step.department_id,step.role_id),[]).append(step)
+	for key in ((department_id,role_id),(department_id,None),(None,role_id),(None,None)):
+		if key in chains:
+			return chains[key]
+	return []
+
+
+
+def _open_task(leave,step,approver = None,now = None):
+	now = now or timezone.now()
+	return ApprovalTask(
+		leave = leave,
+		step = step,
+		level = step.level,
+		approver = approver or step.approver,
+		due = now + datetime.timedelta(hours = step.timeout_hours),
+	)
+
+
+
+def start(leave,employee):
+	'''
+	open the first step for a newly requested leave -> False when no chain applies
+	'''
+	steps = chain_for(employee)
+	if not steps:
+		return False
+	_open_task(leave,steps[0]).save()
+	return True
+
+
+
+def reopen(leave_ids):
+	'''
+	leaves moved back to pending (unapprove, uncancel, unreject) -> their chain starts over at the
+	first step, leaves that still have an open task are left alone. -> int reopened
+	'''
+	from employee.identity import get_employee
+	from .models import Leave
+
+	open_ids = set(ApprovalTask.objects.filter(leave_id__in = leave_ids,state = ApprovalTask.OPEN).values_list('leave_id',flat = True))
+	reopened = 0
+	for leave in Leave.objects.filter(id__in = leave_ids,status = 'pending').exclude(id__in = open_ids):
+		reopened += start(leave,get_employee(leave.user_id))
+	return reopened
+
+
+
+def decide(task,approved,actor):
+	'''
+	record the approver's decision -> opens the next level, or finishes the leave on the last one
+	'''
+	from employee.identity import get_employee
+
+	with transaction.atomic(using = router.db_for_write(ApprovalTask)):
+		task.state = ApprovalTask.APPROVED if approved else ApprovalTask.REJECTED
+		task.save(update_fields = ['state','updated'])
+		leave = task.leave
+
+		if not approved:
+			leave.reject_leave
+			return
+
+		next_steps = [step for step in chain_for(get_employee(leave.user_id)) if step.level > task.level]
+		if next_steps:
+			_open_task(leave,next_steps[0]).save()
+		else:
+			leave.approve_leave
+
+
+
+def escalate_overdue(now = None,batch_size = 500):
+	'''
+	periodic batch job (manage.py escalate_approvals) - hands overdue open tasks to the step's
+	escalate_to user. each batch is one select, one bulk_create and one update. -> int escalated
+	'''
+	now = now or timezone.now()
+	escalated = 0
+	while True:
+		tasks = list(ApprovalTask.objects.overdue(now).select_related('step','leave').order_by('id')[:batch_size])
+		if not tasks:
+			return escalated
+		with transaction.atomic(using = router.db_for_write(ApprovalTask)):
+			ApprovalTask.objects.bulk_create([_open_task(task.leave,task.step,approver = task.step.escalate_to,now = now) for task in tasks])
+			ApprovalTask.objects.filter(id__in = [task.id for task in tasks]).update(state = ApprovalTask.ESCALATED,updated = now)
+		escalated += len(tasks)
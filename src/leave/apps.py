@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class LeaveConfig(AppConfig):
     name = 'leave'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
@@ -0,0 +1,100 @@
+from asgiref.local import Local
+from django.db import router,transaction
+from django.utils import timezone
+from hrsuit import metrics,tenancy
+
+
+'''
+leave audit trail - buffers LeaveEvent rows for the current request
+and writes them with a single bulk_create once the surrounding transaction commits.
+'''
+
+_state = Local() # per thread under WSGI, per request task under ASGI (shared with its sync_to_async calls)
+
+TRANSITIONS = metrics.counter('hrsuit_leave_transitions_total','leave status changes',('from_status','to_status','tenant'))
+
+
+
+def _buffer():
+	events = getattr(_state, 'events', None)
+	if events is None:
+		events = _state.events = []
+	return events
+
+
+
+def begin(actor = None):
+	'''
+	open an audit scope -> called by LeaveAuditMiddleware at the start of every request
+	actor is the default user recorded for transitions in this scope
+	'''
+	_state.events = []
+	_state.actor = actor
+	_state.scoped = True
+
+
+
+def end():
+	'''
+	close the audit scope -> flush whatever is still buffered once the transaction commits
+	'''
+	_state.scoped = False
+	_schedule_flush()
+	_state.actor = None
+
+
+
+def current_actor():
+	actor = getattr(_state, 'actor', None)
+	if actor is not None and getattr(actor, 'is_authenticated', False):
+		return actor
+	return None
+
+
+
+def record(leave_id, from_status, to_status, actor = None):
+	'''
+	queue one transition -> nothing hits the database until flush()
+	'''
+	from .models import LeaveEvent # avoid circular import, models import audit
+
+	if from_status == to_status:
+		return
+	TRANSITIONS.inc(from_status or '',to_status,tenancy.current_tenant() or '')
+	if actor is None:
+		actor = current_actor()
+
+	_buffer().append(LeaveEvent(
+		leave_id = leave_id,
+		actor = actor,
+		from_status = from_status,
+		to_status = to_status,
+		created = timezone.now(),
+	))
+	if not getattr(_state, 'scoped', False):
+		_schedule_flush()
+
+
+
+def _schedule_flush():
+	from .models import LeaveEvent
+
+	if _buffer():
+		transaction.on_commit(flush,using = router.db_for_write(LeaveEvent)) # runs immediately when not inside atomic()
+
+
+
+def flush():
+	'''
+	write all buffered events with one bulk_create
+	'''
+	from .models import LeaveEvent
+	from . import letters,streams
+
+	events = _buffer()
+	if not events:
+		return
+	_state.events = []
+	LeaveEvent.objects.bulk_create(events)
+	streams.publish_leaves({event.leave_id for event in events})
+	letters.queue({event.leave_id for event in events if event.to_status == 'approved'})
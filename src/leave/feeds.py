@@ -0,0 +1,255 @@
+import datetime
+import time
+from django.core import signing
+from django.core.cache import cache,caches
+from django.db import router,transaction
+from django.urls import reverse
+from hrsuit import tenancy
+from .models import Leave
+
+
+'''
+iCalendar feeds of approved leaves - one per user (own leaves) and one per department (absences).
+calendar clients can't log in, so the feed url carries a signed token naming the feed, the user it
+was issued to and its tenant (a token is only valid on the site of the company that issued it).
+every poll checks the holder is still active and, for department feeds, still in the department.
+
+every feed has a change stamp (milliseconds of its last change) in the 'shared' cache, seen by every
+worker process, bumped from leave/employee signals and from the bulk paths that skip signals. the
+stamp is the ETag and Last-Modified, and keys the rendered body in the process cache -> a poll with a
+current ETag is a 304 after the holder lookup, a poll after a change renders once per process with
+a single projected query.
+'''
+
+TOKEN_SALT = 'leave.feeds'
+STAMP_TIMEOUT = None # stamps must outlive the bodies they key
+BODY_TIMEOUT = 60 * 60 * 24
+PAST_DAYS = 90 # approved leaves that ended longer ago drop out of the feed
+
+USER = 'user'
+DEPARTMENT = 'department'
+
+
+
+def feed_token(kind,object_id,holder_id):
+	'''
+	('user',3,3) -> url safe signed token naming the feed and the user it was issued to, bound to the active tenant
+	'''
+	tenant = tenancy.current_tenant()
+	payload = [kind,object_id,holder_id] if tenant is None else [kind,object_id,holder_id,tenant]
+	return signing.dumps(payload,salt = TOKEN_SALT)
+
+
+
+def read_token(token):
+	'''
+	token -> (kind,id,holder id) or None when tampered with, issued by another tenant or before tokens named their holder
+	'''
+	try:
+		payload = signing.loads(token,salt = TOKEN_SALT)
+		kind,object_id,holder_id = payload[:3]
+		tenant = payload[3] if len(payload) > 3 else None
+	except (signing.BadSignature,ValueError,TypeError,KeyError):
+		return None
+	if kind not in (USER,DEPARTMENT) or tenant != tenancy.current_tenant():
+		return None
+	return kind,object_id,holder_id
+
+
+
+def holder_allowed(kind,object_id,holder_id):
+	'''
+	may the token's holder still read this feed -> active, not blocked or deleted, and for a
+	department feed still in that department. one indexed lookup per poll, so blocking a user or
+	moving them out of the department revokes the urls they copied
+	'''
+	from django.contrib.auth.models import User
+
+	row = User.objects.filter(id = holder_id,is_active = True).values_list(
+		'employee__department_id','employee__is_blocked','employee__is_deleted',
+	).first()
+	if row is None or row[1] or row[2]:
+		return False
+	if kind == USER:
+		return object_id == holder_id
+	return row[0] is not None and row[0] == object_id
+
+
+
+def open_feed(token):
+	'''
+	token of a feed url -> (kind,id) or None when the token is invalid or revoked
+	'''
+	feed = read_token(token)
+	if feed is None or not holder_allowed(*feed):
+		return None
+	return feed[:2]
+
+
+
+def feed_urls(user,employee = None):
+	'''
+	links for the leaves table -> {'user':url,'department':url or None}
+	'''
+	department_id = getattr(employee,'department_id',None)
+	return {
+		USER:reverse('dashboard:leavefeed',args = [feed_token(USER,user.id,user.id)]),
+		DEPARTMENT:reverse('dashboard:leavefeed',args = [feed_token(DEPARTMENT,department_id,user.id)]) if department_id else None,
+	}
+
+
+
+# change stamps -------------------------------------------------------------
+LAST_STAMP_KEY = 'feeds:stamp:last'
+
+
+
+def _stamp_key(kind,object_id):
+	return 'feeds:stamp:{0}:{1}'.format(kind,object_id)
+
+
+
+def _now_ms():
+	return int(time.time() * 1000)
+
+
+
+def bump(kind,ids):
+	'''
+	applied once the surrounding transaction commits - a poll in between must not cache
+	the old leaves under the new stamp
+	'''
+	keys = [_stamp_key(kind,object_id) for object_id in ids]
+	if keys:
+		transaction.on_commit(lambda: _write_stamps(keys),using = router.db_for_write(Leave))
+
+
+
+def _write_stamps(keys):
+	'''
+	now, or just past the last stamp written -> two changes in the same millisecond still move the ETag
+	'''
+	caches['shared'].set_many(dict.fromkeys(keys,_next_stamp()),STAMP_TIMEOUT)
+
+
+
+def _next_stamp():
+	shared = caches['shared']
+	stamp = max(_now_ms(),shared.get(LAST_STAMP_KEY,0) + 1)
+	shared.set(LAST_STAMP_KEY,stamp,STAMP_TIMEOUT)
+	return stamp
+
+
+
+def leaves_changed(user_ids):
+	'''
+	leaves of these users changed -> their own feeds and their departments' feeds are stale
+	'''
+	from employee.models import Employee
+
+	user_ids = set(user_ids)
+	bump(USER,user_ids)
+	bump(DEPARTMENT,set(Employee.objects.filter(user_id__in = user_ids).exclude(department = None).values_list('department_id',flat = True)))
+
+
+
+def memberships_changed():
+	'''
+	an employee moved, joined or left -> every department feed is stale
+	'''
+	bump(DEPARTMENT,['all'])
+
+
+
+def feed_stamp(kind,object_id):
+	'''
+	last change of the feed in ms -> a feed without a stamp starts "changed now", the first process
+	to write it wins and every process reads that same stamp
+	'''
+	shared = caches['shared']
+	keys = [_stamp_key(kind,object_id)]
+	if kind == DEPARTMENT:
+		keys.append(_stamp_key(DEPARTMENT,'all'))
+	stamps = shared.get_many(keys)
+	if not stamps:
+		shared.add(keys[0],_next_stamp(),STAMP_TIMEOUT)
+		stamps = shared.get_many(keys)
+	return max(stamps.values(),default = _now_ms())
+
+
+
+# rendering -----------------------------------------------------------------
+def _escape(text):
+	return (text or '').replace('\\','\\\\').replace(';','\\;').replace(',','\\,').replace('\n','\\n')
+
+
+
+def _fold(line):
+	'''
+	RFC 5545 - content lines longer than 75 octets continue on lines starting with a space
+	'''
+	data = line.encode('utf-8')
+	if len(data) <= 75:
+		return line
+	parts = []
+	while data:
+		size = 75 if not parts else 74
+		while size < len(data) and (data[size] & 0xC0) == 0x80: # never split a utf-8 sequence
+			size -= 1
+		parts.append(data[:size].decode('utf-8'))
+		data = data[size:]
+	return '\r\n '.join(parts)
+
+
+
+def leaves_for(kind,object_id):
+	'''
+	one projected query -> (id,startdate,enddate,leavetype,firstname,lastname,updated) rows
+	'''
+	leaves = Leave.objects.filter(status = 'approved',enddate__gte = datetime.date.today() - datetime.timedelta(days = PAST_DAYS))
+	if kind == USER:
+		leaves = leaves.filter(user_id = object_id)
+	else:
+		leaves = leaves.filter(user__employee__department_id = object_id)
+	return leaves.exclude(startdate = None).exclude(enddate = None).order_by('startdate').values_list(
+		'id','startdate','enddate','leavetype','user__employee__firstname','user__employee__lastname','updated',
+	)
+
+
+
+def render_feed(kind,object_id):
+	lines = [
+		'BEGIN:VCALENDAR',
+		'VERSION:2.0',
+		'PRODID:-//hrsuit//leave feed//EN',
+		'CALSCALE:GREGORIAN',
+		'X-WR-CALNAME:{0}'.format('My leaves' if kind == USER else 'Department absences'),
+	]
+	for leave_id,startdate,enddate,leavetype,firstname,lastname,updated in leaves_for(kind,object_id):
+		name = ' '.join(part for part in (firstname,lastname) if part)
+		summary = leavetype if kind == USER else '{0} - {1}'.format(name,leavetype)
+		lines += [
+			'BEGIN:VEVENT',
+			'UID:leave-{0}@hrsuit'.format(leave_id),
+			'DTSTAMP:{0}'.format(updated.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')),
+			'DTSTART;VALUE=DATE:{0}'.format(startdate.strftime('%Y%m%d')),
+			'DTEND;VALUE=DATE:{0}'.format(max(enddate,startdate + datetime.timedelta(days = 1)).strftime('%Y%m%d')),# enddate is the day back
+			'SUMMARY:{0}'.format(_escape(summary)),
+			'TRANSP:TRANSPARENT',
+			'END:VEVENT',
+		]
+	lines.append('END:VCALENDAR')
+	return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+
+def cached_feed(kind,object_id,stamp):
+	'''
+	rendered body for this stamp -> rendered (one query) only after a change
+	'''
+	key = 'feeds:body:{0}:{1}:{2}'.format(kind,object_id,stamp)
+	body = cache.get(key)
+	if body is None:
+		body = render_feed(kind,object_id)
+		cache.set(key,body,BODY_TIMEOUT)
+	return body
@@ -0,0 +1,108 @@
+import collections
+import datetime
+import math
+from django.conf import settings
+from employee.models import Employee
+from .models import Leave
+
+
+'''
+staffing forecast for a department.
+every active member is a row, every day of the window a column, a cell is True when that
+member is away -> present headcount per day is members minus the column sum.
+two scenarios: approved leaves only, and approved plus pending (pending counted as possible absence).
+a leave keeps its member away from startdate up to the day before enddate (enddate = coming back on).
+'''
+
+
+
+Forecast = collections.namedtuple('Forecast','start days headcount approved projected minimum')
+
+
+
+def department_forecast(department,start = None,days = None,threshold = None):
+	'''
+	department -> Forecast(start,days,headcount,approved,projected,minimum)
+	approved/projected are numpy arrays of present headcount for each day, minimum is the
+	lowest acceptable headcount (threshold is a fraction of the active members, default from settings)
+	two queries: active members, then the approved/pending leaves overlapping the window
+	'''
+	import numpy as np # loaded on the first forecast, not at startup
+
+	start = start or datetime.date.today()
+	days = days or settings.STAFFING_FORECAST_DAYS
+	end = start + datetime.timedelta(days = days)
+	threshold = settings.STAFFING_MIN_PRESENT if threshold is None else threshold
+
+	user_ids = list(Employee.objects.filter(
+		department = department,
+		is_blocked = False,
+		is_deleted = False,
+		user__is_active = True,
+	).values_list('user_id',flat = True))
+	rows = {user_id:row for row,user_id in enumerate(user_ids)}
+
+	leaves = Leave.objects.filter(
+		user_id__in = user_ids,
+		status__in = ['approved','pending'],
+		startdate__lt = end,
+		enddate__gt = start,
+	).order_by().values_list('user_id','startdate','enddate','status')
+
+	away = np.zeros((2,len(user_ids),days),dtype = bool) # [approved,pending] x member x day
+	for user_id,startdate,enddate,status in leaves:
+		first = max((startdate - start).days,0)
+		last = min((enddate - start).days,days)
+		away[int(status == 'pending'),rows[user_id],first:last] = True
+
+	headcount = len(user_ids)
+	approved = headcount - away[0].sum(axis = 0)
+	projected = headcount - (away[0] | away[1]).sum(axis = 0)
+	minimum = int(math.ceil(headcount * threshold))
+	return Forecast(start,days,headcount,approved,projected,minimum)
+
+
+
+def short_days(forecast,scenario = 'projected'):
+	'''
+	days where the scenario drops below the minimum -> [(date,present),...]
+	'''
+	import numpy as np
+
+	present = getattr(forecast,scenario)
+	return [
+		(forecast.start + datetime.timedelta(days = int(day)),int(present[day]))
+		for day in np.flatnonzero(present < forecast.minimum)
+	]
+
+
+
+def leave_forecast(leave,employee,start = None,days = None):
+	'''
+	summary for the leave detail page -> None when the requester has no department
+	*_during is the lowest headcount while this leave runs (None when it falls outside the window)
+	'''
+	if employee is None or employee.department_id is None or not (leave.startdate and leave.enddate):
+		return None
+	forecast = department_forecast(employee.department_id,start,days)
+	window = range(
+		max((leave.startdate - forecast.start).days,0),
+		max(min((leave.enddate - forecast.start).days,forecast.days),0),
+	)
+
+	def during(present):
+		return int(present[window.start:window.stop].min()) if len(window) else None
+
+	return {
+		'department':employee.department,
+		'start':forecast.start,
+		'end':forecast.start + datetime.timedelta(days = forecast.days - 1),
+		'headcount':forecast.headcount,
+		'minimum':forecast.minimum,
+		'approved_low':int(forecast.approved.min()) if forecast.days else forecast.headcount,
+		'projected_low':int(forecast.projected.min()) if forecast.days else forecast.headcount,
+		'approved_during':during(forecast.approved),
+		'projected_during':during(forecast.projected),
+		'approved_short':short_days(forecast,'approved'),
+		'projected_short':short_days(forecast,'projected'),
+	}
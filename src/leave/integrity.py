@@ -0,0 +1,115 @@
+import datetime
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import Case,When,Value,DateField,Q
+from django.utils import timezone
+from . import feeds
+from .models import Leave
+
+
+'''
+leave data consistency checks.
+check_range() looks at one id range in a single query and returns findings (plain dicts, one per problem),
+apply_fixes() corrects the fixable ones with a few batched UPDATEs.
+the check_leave_integrity command fans the ranges out to a process pool of read-only workers.
+
+problems
+status_mismatch -> is_approved disagrees with status (fix: is_approved = status == 'approved')
+dates_reversed  -> startdate after enddate, leave_days returns None (fix: swap the dates)
+missing_dates   -> startdate or enddate empty (reported only)
+unknown_status  -> status outside pending/approved/cancelled/rejected (reported only)
+no_employee     -> requester has no Employee profile (reported only)
+'''
+
+
+
+STATUSES = ('pending','approved','cancelled','rejected')
+
+
+
+def _read_only(sender = None,connection = None,**kwargs):
+	vendor = connection.vendor
+	with connection.cursor() as cursor:
+		if vendor == 'sqlite':
+			cursor.execute('PRAGMA query_only = ON')
+		elif vendor == 'postgresql':
+			cursor.execute('SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY')
+		elif vendor == 'mysql':
+			cursor.execute('SET SESSION TRANSACTION READ ONLY')
+
+
+
+def read_only():
+	'''
+	process pool initializer -> every connection this worker opens refuses writes
+	'''
+	connection_created.connect(_read_only)
+	for connection in connections.all():
+		if connection.connection is not None:
+			_read_only(connection = connection)
+
+
+
+def check_range(bounds):
+	'''
+	(first id,last id) inclusive -> [finding,...]
+	'''
+	first,last = bounds
+	rows = Leave.objects.filter(id__gte = first,id__lte = last).order_by('id').values_list(
+		'id','user_id','status','is_approved','startdate','enddate','user__employee__id',
+	)
+
+	findings = []
+	for leave_id,user_id,status,is_approved,startdate,enddate,employee_id in rows:
+		def found(problem,fix = None):
+			findings.append({'leave':leave_id,'user':user_id,'problem':problem,'status':status,'fix':fix})
+
+		if status not in STATUSES:
+			found('unknown_status')
+		elif is_approved != (status == 'approved'):
+			found('status_mismatch',{'is_approved':status == 'approved'})
+		if startdate is None or enddate is None:
+			found('missing_dates')
+		elif startdate > enddate:
+			found('dates_reversed',{'startdate':enddate.isoformat(),'enddate':startdate.isoformat()})
+		if employee_id is None:
+			found('no_employee')
+	return findings
+
+
+
+def apply_fixes(findings,batch_size = 500):
+	'''
+	findings -> number of leaves updated
+	one UPDATE per is_approved value and one CASE UPDATE per batch of reversed dates.
+	every UPDATE also matches what the check saw (the status that decides is_approved, the reversed
+	dates), so a leave changed since the check is left alone instead of getting a stale value
+	'''
+	approved = {True:[],False:[]}
+	dates = dict()
+	for finding in findings:
+		if finding['problem'] == 'status_mismatch':
+			approved[finding['fix']['is_approved']].append(finding['leave'])
+		elif finding['problem'] == 'dates_reversed':
+			dates[finding['leave']] = finding['fix']
+
+	now = timezone.now()
+	updated = 0
+	for is_approved,leave_ids in approved.items():
+		for n in range(0,len(leave_ids),batch_size):
+			leaves = Leave.objects.filter(id__in = leave_ids[n:n + batch_size])
+			leaves = leaves.filter(status = 'approved') if is_approved else leaves.exclude(status = 'approved')
+			updated += leaves.update(is_approved = is_approved,updated = now)
+
+	leave_ids = sorted(dates)
+	for n in range(0,len(leave_ids),batch_size):
+		batch = leave_ids[n:n + batch_size]
+		value = lambda leave_id,field:datetime.date.fromisoformat(dates[leave_id][field])
+		swap = lambda field:Case(*[When(id = leave_id,then = Value(value(leave_id,field))) for leave_id in batch],output_field = DateField())
+		seen = Q()
+		for leave_id in batch:
+			seen |= Q(id = leave_id,startdate = value(leave_id,'enddate'),enddate = value(leave_id,'startdate'))
+		updated += Leave.objects.filter(seen).update(startdate = swap('startdate'),enddate = swap('enddate'),updated = now)
+	if leave_ids:
+		feeds.leaves_changed({finding['user'] for finding in findings if finding['leave'] in dates})
+	return updated
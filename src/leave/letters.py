@@ -0,0 +1,178 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+from django.conf import settings
+from django.template.loader import get_template,render_to_string
+from hrsuit import tenancy
+from .models import Leave,LeaveEvent
+
+
+'''
+pdf approval letters.
+rendering with weasyprint costs seconds of cpu, so approvals only queue the leave id (audit.flush,
+after commit) and a process pool loads the letter data and renders it - the request pays nothing
+per leave. the pool is started on the first queued letter and shut down once the process has
+nothing left to render, so idle web workers hold no extra processes. a letter is stored under the hash of the letter template
+and the data printed on it -> the same letter is never rendered twice, a changed leave or template
+gives a new file, and downloads are plain file responses.
+
+letters live in MEDIA_ROOT/letters/<2 hex>/<sha256>.pdf (MEDIA_ROOT/letters/<tenant>/... for tenants).
+tasks run under the tenant that queued them (processes.submit), one pool serves every tenant.
+'''
+
+TEMPLATE = 'dashboard/leave_letter.html'
+LETTERS_DIR = 'letters'
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pending = set() # (tenant,leave id) submitted by this process and not finished yet
+_lock = threading.RLock() # a future done before add_done_callback runs _finished right away
+
+
+
+def letter_data(leave_id):
+	'''
+	everything printed on the letter as plain values -> None unless the leave is approved
+	two queries: leave with requester profile, latest approval event
+	'''
+	leave = Leave.objects.filter(id = leave_id,status = 'approved').values(
+		'id','leavetype','startdate','enddate','reason',
+		'user__employee__firstname','user__employee__lastname','user__employee__othername',
+		'user__employee__employeeid','user__employee__department__name','user__employee__role__name',
+	).first()
+	if leave is None:
+		return None
+	event = LeaveEvent.objects.filter(leave_id = leave_id,to_status = 'approved').order_by('-created').values(
+		'created','actor__username','actor__employee__firstname','actor__employee__lastname',
+	).first() or dict()
+
+	names = lambda *parts:' '.join(part for part in parts if part)
+	return {
+		'leave':leave['id'],
+		'employee':names(leave['user__employee__firstname'],leave['user__employee__lastname'],leave['user__employee__othername']),
+		'employeeid':leave['user__employee__employeeid'],
+		'department':leave['user__employee__department__name'],
+		'role':leave['user__employee__role__name'],
+		'leavetype':leave['leavetype'],
+		'startdate':leave['startdate'].isoformat() if leave['startdate'] else None,
+		'enddate':leave['enddate'].isoformat() if leave['enddate'] else None,
+		'days':(leave['enddate'] - leave['startdate']).days if leave['startdate'] and leave['enddate'] else None,
+		'reason':leave['reason'],
+		'approved':event['created'].date().isoformat() if event.get('created') else None,
+		'approver':names(event.get('actor__employee__firstname'),event.get('actor__employee__lastname')) or event.get('actor__username'),
+	}
+
+
+
+def _template_source():
+	return get_template(TEMPLATE).template.source
+
+
+
+def letter_path(data):
+	'''
+	letter data -> path relative to MEDIA_ROOT, unique for tenant + template + data
+	'''
+	digest = hashlib.sha256()
+	digest.update(_template_source().encode('utf-8'))
+	digest.update(json.dumps(data,sort_keys = True).encode('utf-8'))
+	digest = digest.hexdigest()
+	tenant = tenancy.current_tenant()
+	directory = LETTERS_DIR if tenant is None else os.path.join(LETTERS_DIR,tenant)
+	return os.path.join(directory,digest[:2],digest + '.pdf')
+
+
+
+def render_letter(data,path):
+	'''
+	runs in a pool worker -> writes MEDIA_ROOT/path, the rename makes a half written letter invisible
+	'''
+	from weasyprint import HTML # heavy and only ever needed here
+
+	target = os.path.join(settings.MEDIA_ROOT,path)
+	if os.path.exists(target):
+		return path
+	os.makedirs(os.path.dirname(target),exist_ok = True)
+	html = render_to_string(TEMPLATE,{'letter':data})
+	partial = '{0}.{1}.tmp'.format(target,os.getpid())
+	HTML(string = html,base_url = settings.STATIC_ROOT).write_pdf(partial)
+	os.replace(partial,target)
+	return path
+
+
+
+def render_leave_letter(leave_id):
+	'''
+	runs in a pool worker -> loads the letter data (two queries) and renders it unless it is on disk,
+	path relative to MEDIA_ROOT or None when the leave is not approved (any more)
+	'''
+	data = letter_data(leave_id)
+	if data is None:
+		return None
+	return render_letter(data,letter_path(data))
+
+
+
+def _finished(key,future):
+	global _pool
+	with _lock:
+		_pending.discard(key)
+		if not _pending and _pool is not None:
+			_pool.shutdown(wait = False)# idle -> give the worker processes back
+			_pool = None
+	if future.exception() is not None:
+		logger.error('leave letter of leave %s failed',key[1],exc_info = future.exception())
+
+
+
+def _get_pool():
+	global _pool
+	if _pool is None:
+		from hrsuit import processes
+		_pool = processes.pool(settings.LETTER_WORKERS)
+	return _pool
+
+
+
+def queue(leave_ids):
+	'''
+	render the letters of these leaves in the background -> no queries here, the worker loads the
+	data, skips leaves that aren't approved and letters already on disk. leaves already queued by this
+	process are skipped. called by audit.flush once approvals are committed
+	'''
+	if not settings.LETTER_WORKERS:
+		return
+	from hrsuit import processes
+
+	tenant = tenancy.current_tenant()
+	with _lock:
+		for leave_id in leave_ids:
+			key = (tenant,leave_id)
+			if key in _pending:
+				continue
+			_pending.add(key)
+			future = processes.submit(_get_pool(),render_leave_letter,leave_id)
+			future.add_done_callback(lambda future,key = key:_finished(key,future))
+
+
+
+@atexit.register
+def _shutdown():
+	if _pool is not None:
+		_pool.shutdown()
+
+
+
+def letter_file(leave_id):
+	'''
+	(absolute path or None,data) -> path is None while the letter is not rendered (yet)
+	'''
+	data = letter_data(leave_id)
+	if data is None:
+		return None,None
+	target = os.path.join(settings.MEDIA_ROOT,letter_path(data))
+	return (target if os.path.exists(target) else None),data
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from leave import stats
+
+
+
+class Command(BaseCommand):
+	help = 'Recompute the monthly leave statistics of months touched since the last run - run nightly (cron)'
+
+	def add_arguments(self,parser):
+		parser.add_argument('--full',action = 'store_true',help = 'recompute every month, ignoring the watermark')
+
+
+	def handle(self,*args,**options):
+		started = time.monotonic()
+		months,written = stats.build(full = options['full'])
+		self.stderr.write('{0} month(s) recomputed, {1} stat row(s) written in {2:.1f}s'.format(months,written,time.monotonic() - started))
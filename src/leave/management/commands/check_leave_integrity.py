@@ -0,0 +1,52 @@
+import json
+import sys
+from django.core.management.base import BaseCommand
+from django.db.models import Min,Max
+from hrsuit import processes
+from leave.integrity import check_range,apply_fixes
+from leave.models import Leave
+
+
+
+class Command(BaseCommand):
+	help = 'Check leaves for inconsistent status/dates/requesters in parallel, findings as JSON Lines (--fix corrects what it can)'
+
+	def add_arguments(self,parser):
+		parser.add_argument('--chunk-size',type = int,default = 5000,help = 'leave ids per worker task')
+		parser.add_argument('--workers',type = int,default = None,help = 'processes (default: cpu count)')
+		parser.add_argument('--output',default = '-',help = 'JSON Lines file (default: stdout)')
+		parser.add_argument('--fix',action = 'store_true',help = 'apply corrections with batched UPDATEs')
+		parser.add_argument('--batch-size',type = int,default = 500)
+
+
+	def handle(self,*args,**options):
+		bounds = Leave.objects.aggregate(first = Min('id'),last = Max('id'))
+		if bounds['first'] is None:
+			self.stderr.write('no leaves')
+			return
+
+		size = options['chunk_size']
+		chunks = [(first,min(first + size - 1,bounds['last'])) for first in range(bounds['first'],bounds['last'] + 1,size)]
+
+		output = sys.stdout if options['output'] == '-' else open(options['output'],'w')
+		fixable = []
+		counts = dict()
+		try:
+			with processes.pool(options['workers'],initializer = 'leave.integrity.read_only') as pool:
+				for findings in pool.map(check_range,chunks): # in id order, streamed as chunks finish
+					for finding in findings:
+						output.write(json.dumps(finding) + '\n')
+						counts[finding['problem']] = counts.get(finding['problem'],0) + 1
+						if finding['fix'] is not None:
+							fixable.append(finding)
+					output.flush()
+		finally:
+			if output is not sys.stdout:
+				output.close()
+
+		summary = ', '.join('{0} {1}'.format(count,problem) for problem,count in sorted(counts.items())) or 'no problems'
+		self.stderr.write('checked {0} chunk(s): {1}'.format(len(chunks),summary))
+
+		if options['fix'] and fixable:
+			updated = apply_fixes(fixable,batch_size = options['batch_size'])
+			self.stderr.write('applied {0} correction(s)'.format(updated))
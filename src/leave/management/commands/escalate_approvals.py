@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from leave.approvals import escalate_overdue
+
+
+
+class Command(BaseCommand):
+	help = 'Escalate open approval tasks past their due time - run periodically (cron)'
+
+	def add_arguments(self,parser):
+		parser.add_argument('--batch-size',type = int,default = 500)
+
+
+	def handle(self,*args,**options):
+		escalated = escalate_overdue(batch_size = options['batch_size'])
+		self.stdout.write('escalated {0} approval task(s)'.format(escalated))
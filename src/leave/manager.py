@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import datetime
 
 class LeaveManager(models.Manager):
@@ -51,3 +52,72 @@ class LeaveManager(models.Manager):
 
 
 
+	def bulk_set_status(self,leave_ids,status,actor = None):
+		'''
+		moves many leaves to status with a single UPDATE and records one audit event per changed leave
+		Leave.objects.bulk_set_status([1,2,3],'approved',actor = request.user) -> int updated
+		'''
+		from . import approvals,audit,feeds
+		from .models import ApprovalTask
+
+		changed = list(super().get_queryset().filter(id__in = leave_ids).exclude(status = status).values_list('id','status','user_id'))
+		if not changed:
+			return 0
+		super().get_queryset().filter(id__in = [leave_id for leave_id,_,_ in changed]).update(
+			status = status,
+			is_approved = (status == 'approved'),
+			updated = timezone.now(),# update() skips auto_now
+		)
+		for leave_id,from_status,_ in changed:
+			audit.record(leave_id,from_status,status,actor = actor)
+		feeds.leaves_changed([user_id for _,_,user_id in changed])# update() skips the post_save that refreshes calendar feeds
+		if status == 'pending':
+			approvals.reopen([leave_id for leave_id,_,_ in changed])
+		else:
+			ApprovalTask.objects.filter(leave_id__in = [leave_id for leave_id,_,_ in changed],state = 'open').update(state = 'closed',updated = timezone.now())
+		return len(changed)
+
+
+
+
+class LeaveEventManager(models.Manager):
+	def for_leave(self,leave):
+		'''
+		history of one leave, oldest first -> LeaveEvent.objects.for_leave(leave)
+		uses the (leave,created) index
+		'''
+		return super().get_queryset().filter(leave = leave).select_related('actor').order_by('created')
+
+
+
+	def between(self,start,end):
+		'''
+		events in a time window [start,end) -> LeaveEvent.objects.between(start,end)
+		uses the created index
+		'''
+		return super().get_queryset().filter(created__gte = start,created__lt = end).order_by('created')
+
+
+
+
+class ApprovalTaskManager(models.Manager):
+	def inbox(self,user):
+		'''
+		open approval tasks of one approver -> ApprovalTask.objects.inbox(request.user)
+		single lookup on the (approver,state) index
+		'''
+		return super().get_queryset().filter(approver = user,state = 'open').select_related('leave','leave__user').order_by('created')
+
+
+
+	def overdue(self,now = None):
+		'''
+		open tasks past their due time that have someone to escalate to -> uses the (state,due) index
+		'''
+		now = now or timezone.now()
+		return super().get_queryset().filter(state = 'open',due__lt = now,step__escalate_to__isnull = False).exclude(approver = models.F('step__escalate_to'))
+
+
+
+	def close_open(self,leave_id):
+		return super().get_queryset().filter(leave_id = leave_id,state = 'open').update(state = 'closed',updated = timezone.now())
@@ -0,0 +1,20 @@
+from . import audit
+
+
+
+class LeaveAuditMiddleware:
+	'''
+	opens an audit scope per request so every leave transition made while
+	handling it is recorded against request.user and written in one batch
+	'''
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+
+	def __call__(self, request):
+		audit.begin(actor = getattr(request, 'user', None))
+		try:
+			response = self.get_response(request)
+		finally:
+			audit.end()
+		return response
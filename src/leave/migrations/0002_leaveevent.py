@@ -0,0 +1,41 @@
+# Generated by Django 3.1.14 on 2026-10-18 22:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('leave', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(max_length=12)),
+                ('to_status', models.CharField(max_length=12)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('leave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='leave.leave')),
+            ],
+            options={
+                'verbose_name': 'Leave Event',
+                'verbose_name_plural': 'Leave Events',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaveevent',
+            index=models.Index(fields=['leave', 'created'], name='leave_leave_leave_i_d914eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveevent',
+            index=models.Index(fields=['created'], name='leave_leave_created_a4915f_idx'),
+        ),
+    ]
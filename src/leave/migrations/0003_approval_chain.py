@@ -0,0 +1,67 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('employee', '0005_employee_user_one_to_one'),
+        ('leave', '0002_leaveevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalStep',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField(default=1)),
+                ('timeout_hours', models.PositiveIntegerField(default=48)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('approver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('department', models.ForeignKey(blank=True, help_text='requester department, empty for any', null=True, on_delete=django.db.models.deletion.CASCADE, to='employee.department')),
+                ('escalate_to', models.ForeignKey(blank=True, help_text='gets the request when the approver does not act in time', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('role', models.ForeignKey(blank=True, help_text='requester role, empty for any', null=True, on_delete=django.db.models.deletion.CASCADE, to='employee.role')),
+            ],
+            options={
+                'verbose_name': 'Approval Step',
+                'verbose_name_plural': 'Approval Steps',
+                'ordering': ['department', 'role', 'level'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ApprovalTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField(default=1)),
+                ('state', models.CharField(choices=[('open', 'Open'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('escalated', 'Escalated'), ('closed', 'Closed')], default='open', max_length=12)),
+                ('due', models.DateTimeField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('approver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approval_tasks', to=settings.AUTH_USER_MODEL)),
+                ('leave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approval_tasks', to='leave.leave')),
+                ('step', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='leave.approvalstep')),
+            ],
+            options={
+                'verbose_name': 'Approval Task',
+                'verbose_name_plural': 'Approval Tasks',
+                'ordering': ['created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='approvaltask',
+            index=models.Index(fields=['approver', 'state'], name='leave_appro_approve_28aa5c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvaltask',
+            index=models.Index(fields=['state', 'due'], name='leave_appro_state_046bee_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='approvalstep',
+            unique_together={('department', 'role', 'level')},
+        ),
+    ]
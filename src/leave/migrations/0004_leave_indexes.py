@@ -0,0 +1,21 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0003_approval_chain'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['status', 'created'], name='leave_leave_status_772b10_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['user', 'created'], name='leave_leave_user_id_1759a5_idx'),
+        ),
+    ]
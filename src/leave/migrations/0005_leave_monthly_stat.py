@@ -0,0 +1,51 @@
+# Generated by Django 3.1.14 on 2026-10-18 23:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0004_leave_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveMonthlyStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('leavetype', models.CharField(max_length=25, null=True)),
+                ('status', models.CharField(max_length=12)),
+                ('department_id', models.IntegerField(null=True)),
+                ('department_name', models.CharField(max_length=125, null=True)),
+                ('employeetype', models.CharField(max_length=15, null=True)),
+                ('leaves', models.PositiveIntegerField(default=0)),
+                ('days', models.PositiveIntegerField(default=0)),
+                ('stale', models.BooleanField(default=False)),
+                ('computed', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Leave Monthly Stat',
+                'verbose_name_plural': 'Leave Monthly Stats',
+                'ordering': ['-month', 'leavetype'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='leavemonthlystat',
+            index=models.Index(fields=['month', 'status'], name='leave_leave_month_16e15f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leavemonthlystat',
+            index=models.Index(fields=['stale'], name='leave_leave_stale_de4b2e_idx'),
+        ),
+    ]
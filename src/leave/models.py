@@ -1,5 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.db import models
-from .manager import LeaveManager
+from .manager import LeaveManager,LeaveEventManager,ApprovalTaskManager
+from . import audit
 from django.utils.translation import ugettext as _
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -46,6 +48,10 @@ class Leave(models.Model):
 		verbose_name = _('Leave')
 		verbose_name_plural = _('Leaves')
 		ordering = ['-created'] #recent objects
+		indexes = [ # status lists and own leaves, newest first - also the server-side tables
+			models.Index(fields=['status','created']),
+			models.Index(fields=['user','created']),
+		]
 
 
 
@@ -60,9 +66,10 @@ class Leave(models.Model):
 		'''
 		i don't like the __str__ of leave object - this is a pretty one :-)
 		'''
+		from employee.identity import get_employee # on use - leave.models stays free of employee imports
+
 		leave = self.leavetype
-		user = self.user
-		employee = user.employee_set.first().get_full_name
+		employee = get_employee(self.user_id).get_full_name
 		return ('{0} - {1}'.format(employee,leave))
 
 
@@ -86,12 +93,27 @@ class Leave(models.Model):
 
 
 
+	def _set_status(self,status,is_approved = False):
+		'''
+		every state change goes through here so it lands in the audit trail
+		'''
+		from_status = self.status
+		self.is_approved = is_approved
+		self.status = status
+		self.save()
+		audit.record(self.id,from_status,status)
+		if status != 'pending':
+			ApprovalTask.objects.close_open(self.id)# decided outside the chain -> nothing left to approve
+		elif from_status != 'pending':
+			from . import approvals # on use - approvals imports this module
+			approvals.reopen([self.id])# back in the approver inboxes
+
+
+
 	@property
 	def approve_leave(self):
 		if not self.is_approved:
-			self.is_approved = True
-			self.status = 'approved'
-			self.save()
+			self._set_status('approved',is_approved = True)
 
 
 
@@ -99,18 +121,14 @@ class Leave(models.Model):
 	@property
 	def unapprove_leave(self):
 		if self.is_approved:
-			self.is_approved = False
-			self.status = 'pending'
-			self.save()
+			self._set_status('pending')
 
 
 
 	@property
 	def leaves_cancel(self):
 		if self.is_approved or not self.is_approved:
-			self.is_approved = False
-			self.status = 'cancelled'
-			self.save()
+			self._set_status('cancelled')
 
 
 
@@ -120,9 +138,16 @@ class Leave(models.Model):
 	@property
 	def reject_leave(self):
 		if self.is_approved or not self.is_approved:
-			self.is_approved = False
-			self.status = 'rejected'
-			self.save()
+			self._set_status('rejected')
+
+
+
+	@property
+	def reset_leave(self):
+		'''
+		cancelled or rejected leave -> back to pending list
+		'''
+		self._set_status('pending')
 
 
 
@@ -132,3 +157,174 @@ class Leave(models.Model):
 
 
 
+
+
+
+class LeaveEvent(models.Model):
+	'''
+	append-only audit trail - one row per leave status transition
+	'''
+	leave = models.ForeignKey(Leave,on_delete=models.CASCADE,related_name='events')
+	actor = models.ForeignKey(User,on_delete=models.SET_NULL,null=True,blank=True,related_name='+')
+	from_status = models.CharField(max_length=12)
+	to_status = models.CharField(max_length=12)
+	created = models.DateTimeField(default=timezone.now)
+
+
+	objects = LeaveEventManager()
+
+
+	class Meta:
+		verbose_name = _('Leave Event')
+		verbose_name_plural = _('Leave Events')
+		ordering = ['-created']
+		indexes = [
+			models.Index(fields=['leave','created']),
+			models.Index(fields=['created']),
+		]
+
+
+
+	def __str__(self):
+		return ('{0}: {1} -> {2}'.format(self.leave_id,self.from_status,self.to_status))
+
+
+
+
+
+class ApprovalStep(models.Model):
+	'''
+	one level of an approval chain - chains are configured per requester department and/or role,
+	empty department/role means any. the most specific matching chain wins (see leave/approvals.py)
+	'''
+	department = models.ForeignKey('employee.Department',on_delete=models.CASCADE,null=True,blank=True,help_text='requester department, empty for any')
+	role = models.ForeignKey('employee.Role',on_delete=models.CASCADE,null=True,blank=True,help_text='requester role, empty for any')
+	level = models.PositiveSmallIntegerField(default=1)
+	approver = models.ForeignKey(User,on_delete=models.CASCADE,related_name='+')
+	escalate_to = models.ForeignKey(User,on_delete=models.SET_NULL,null=True,blank=True,related_name='+',help_text='gets the request when the approver does not act in time')
+	timeout_hours = models.PositiveIntegerField(default=48)
+
+	created = models.DateTimeField(auto_now_add=True)
+	updated = models.DateTimeField(auto_now=True)
+
+
+	class Meta:
+		verbose_name = _('Approval Step')
+		verbose_name_plural = _('Approval Steps')
+		ordering = ['department','role','level']
+		unique_together = ['department','role','level']
+
+
+
+	def clean(self):
+		'''
+		unique_together can't catch duplicates of the "any" chains - NULL department/role never
+		compare equal in the unique index
+		'''
+		duplicates = ApprovalStep.objects.filter(department = self.department,role = self.role,level = self.level).exclude(pk = self.pk)
+		if duplicates.exists():
+			raise ValidationError('level {0} already exists for this department and role'.format(self.level))
+
+
+
+	def __str__(self):
+		return ('{0} / {1} - level {2}: {3}'.format(self.department or 'any department',self.role or 'any role',self.level,self.approver))
+
+
+
+
+class ApprovalTask(models.Model):
+	'''
+	materialized approver inbox - one row per pending step of a leave
+	'''
+	OPEN = 'open'
+	APPROVED = 'approved'
+	REJECTED = 'rejected'
+	ESCALATED = 'escalated'
+	CLOSED = 'closed'
+
+	STATES = (
+	(OPEN,'Open'),
+	(APPROVED,'Approved'),
+	(REJECTED,'Rejected'),
+	(ESCALATED,'Escalated'),
+	(CLOSED,'Closed'),
+	)
+
+	leave = models.ForeignKey(Leave,on_delete=models.CASCADE,related_name='approval_tasks')
+	step = models.ForeignKey(ApprovalStep,on_delete=models.SET_NULL,null=True,blank=True,related_name='tasks')
+	level = models.PositiveSmallIntegerField(default=1)
+	approver = models.ForeignKey(User,on_delete=models.CASCADE,related_name='approval_tasks')
+	state = models.CharField(max_length=12,choices=STATES,default=OPEN)
+	due = models.DateTimeField(null=True,blank=True)
+
+	created = models.DateTimeField(auto_now_add=True)
+	updated = models.DateTimeField(auto_now=True)
+
+
+	objects = ApprovalTaskManager()
+
+
+	class Meta:
+		verbose_name = _('Approval Task')
+		verbose_name_plural = _('Approval Tasks')
+		ordering = ['created']
+		indexes = [
+			models.Index(fields=['approver','state']),
+			models.Index(fields=['state','due']),
+		]
+
+
+
+	def __str__(self):
+		return ('{0} - level {1} - {2} ({3})'.format(self.leave_id,self.level,self.approver,self.state))
+
+
+
+
+class LeaveMonthlyStat(models.Model):
+	'''
+	pre-aggregated leave days per calendar month, type, status, department and employee type,
+	a leave spanning months counts its days in each. rebuilt by manage.py build_leave_stats (nightly,
+	see leave/stats.py) - never edit it directly
+	'''
+	month = models.DateField() # first day of the month
+	leavetype = models.CharField(max_length=25,null=True)
+	status = models.CharField(max_length=12)
+	department_id = models.IntegerField(null=True)
+	department_name = models.CharField(max_length=125,null=True)
+	employeetype = models.CharField(max_length=15,null=True)
+	leaves = models.PositiveIntegerField(default=0)
+	days = models.PositiveIntegerField(default=0)
+
+	stale = models.BooleanField(default=False) # a leave of this month was deleted or moved -> recomputed next run
+	computed = models.DateTimeField(default=timezone.now)
+
+
+	class Meta:
+		verbose_name = _('Leave Monthly Stat')
+		verbose_name_plural = _('Leave Monthly Stats')
+		ordering = ['-month','leavetype']
+		indexes = [
+			models.Index(fields=['month','status']),
+			models.Index(fields=['stale']),
+		]
+
+
+
+	def __str__(self):
+		return ('{0:%Y-%m} {1} {2}: {3} day(s)'.format(self.month,self.leavetype,self.status,self.days))
+
+
+
+
+class StatWatermark(models.Model):
+	'''
+	how far a batch job has read its source -> build_leave_stats keeps the Leave.updated it got to
+	'''
+	name = models.CharField(max_length=50,unique=True)
+	value = models.DateTimeField(null=True)
+
+
+	def __str__(self):
+		return ('{0}: {1}'.format(self.name,self.value))
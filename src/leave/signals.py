@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save,post_delete
+from employee.models import Employee
+from . import feeds,stats
+from .models import Leave
+
+
+
+def leave_changed(sender,instance,**kwargs):
+	feeds.leaves_changed([instance.user_id])
+
+
+
+def leave_deleted(sender,instance,**kwargs):
+	'''
+	the monthly stats of a deleted leave's months are recomputed on the next run
+	'''
+	stats.mark_stale((instance.startdate,instance.enddate))
+
+
+
+def employee_changed(sender,instance,**kwargs):
+	'''
+	names and departments show up in department feeds
+	'''
+	feeds.memberships_changed()
+
+
+
+def connect():
+	'''
+	calendar feeds are cached until the leaves (or people) in them change - see leave/feeds.py
+	'''
+	post_save.connect(leave_changed,sender = Leave,dispatch_uid = 'feeds_Leave_save')
+	post_delete.connect(leave_changed,sender = Leave,dispatch_uid = 'feeds_Leave_delete')
+	post_delete.connect(leave_deleted,sender = Leave,dispatch_uid = 'stats_Leave_delete')
+	post_save.connect(employee_changed,sender = Employee,dispatch_uid = 'feeds_Employee_save')
+	post_delete.connect(employee_changed,sender = Employee,dispatch_uid = 'feeds_Employee_delete')
@@ -0,0 +1,166 @@
+import datetime
+from django.db import router,transaction
+from django.db.models import Max,Q,Sum
+from django.utils import timezone
+from .models import Leave,LeaveMonthlyStat,StatWatermark
+
+
+'''
+monthly leave statistics - the LeaveMonthlyStat table behind finance reports.
+manage.py build_leave_stats (nightly) recomputes only the months touched since its last run:
+every month spanned by a leave whose updated is past the watermark, and every month with a stale row
+(a leave was deleted or its dates changed in the admin, see leave/signals.py and leave/admin.py).
+a leave counts as leave_days does, startdate up to the day before enddate (the day back at work),
+split over the calendar months it spans. department and employee type are the requester's at build time,
+--full rebuilds every month (after re-organisations or to start over).
+
+report(datetime.date(2026,1,1),datetime.date(2026,12,1)) -> rows summed from the small table only
+'''
+
+WATERMARK = 'leave_monthly_stats'
+OVERLAP = datetime.timedelta(minutes = 5) # re-read leaves saved just before the last run, their transaction may have committed late
+MONTHS_PER_QUERY = 12
+
+SOURCE_FIELDS = (
+	'startdate','enddate','leavetype','status',
+	'user__employee__department_id','user__employee__department__name','user__employee__employeetype',
+)
+
+
+
+def month_start(day):
+	return day.replace(day = 1)
+
+
+
+def next_month(month):
+	return (month + datetime.timedelta(days = 32)).replace(day = 1)
+
+
+
+def split(startdate,enddate):
+	'''
+	(startdate,enddate) -> [(month,days),...] days in each month the leave spans
+	a same day leave counts in its month with 0 days, incomplete or reversed dates count nowhere
+	'''
+	if startdate is None or enddate is None or enddate < startdate:
+		return []
+	if enddate == startdate:
+		return [(month_start(startdate),0)]
+	parts = []
+	month = month_start(startdate)
+	while month < enddate:
+		end = next_month(month)
+		parts.append((month,(min(end,enddate) - max(month,startdate)).days))
+		month = end
+	return parts
+
+
+
+def touched_months(since):
+	'''
+	months to recompute -> those of leaves updated after since (every month when since is None)
+	and those holding stale rows
+	'''
+	leaves = Leave.objects.all()
+	if since is not None:
+		leaves = leaves.filter(updated__gt = since - OVERLAP)
+	months = set()
+	for startdate,enddate in leaves.values_list('startdate','enddate').iterator():
+		months.update(month for month,_ in split(startdate,enddate))
+	months.update(LeaveMonthlyStat.objects.filter(stale = True).values_list('month',flat = True).distinct())
+	return months
+
+
+
+def compute(months):
+	'''
+	fresh stat rows for these months -> [LeaveMonthlyStat,...] (unsaved)
+	one projected query, no Leave instances
+	'''
+	months = set(months)
+	query = Q()
+	for month in months:
+		query |= Q(startdate__lt = next_month(month),enddate__gte = month)
+	totals = dict()
+	for row in Leave.objects.filter(query).values_list(*SOURCE_FIELDS).iterator():
+		startdate,enddate,leavetype,status,department_id,department_name,employeetype = row
+		for month,days in split(startdate,enddate):
+			if month in months:
+				total = totals.setdefault((month,leavetype,status,department_id,department_name,employeetype),[0,0])
+				total[0] += 1
+				total[1] += days
+	now = timezone.now()
+	return [
+		LeaveMonthlyStat(
+			month = month,
+			leavetype = leavetype,
+			status = status,
+			department_id = department_id,
+			department_name = department_name,
+			employeetype = employeetype,
+			leaves = leaves,
+			days = days,
+			computed = now,
+		)
+		for (month,leavetype,status,department_id,department_name,employeetype),(leaves,days) in totals.items()
+	]
+
+
+
+def refresh(months):
+	'''
+	replace the rows of these months, MONTHS_PER_QUERY per transaction -> rows written
+	'''
+	months = sorted(months)
+	written = 0
+	for start in range(0,len(months),MONTHS_PER_QUERY):
+		batch = months[start:start + MONTHS_PER_QUERY]
+		with transaction.atomic(using = router.db_for_write(LeaveMonthlyStat)):
+			rows = compute(batch)
+			LeaveMonthlyStat.objects.filter(month__in = batch).delete()
+			LeaveMonthlyStat.objects.bulk_create(rows)
+		written += len(rows)
+	return written
+
+
+
+def build(full = False):
+	'''
+	the nightly run -> (months recomputed,rows written)
+	the watermark moves to the newest Leave.updated seen, only once the months are written
+	'''
+	watermark,_ = StatWatermark.objects.get_or_create(name = WATERMARK)
+	since = None if full else watermark.value
+	newest = Leave.objects.aggregate(newest = Max('updated'))['newest']
+	months = touched_months(since)
+	if full:
+		LeaveMonthlyStat.objects.exclude(month__in = months).delete()
+	written = refresh(months)
+	if newest is not None:
+		StatWatermark.objects.filter(pk = watermark.pk).update(value = newest)
+	return len(months),written
+
+
+
+def mark_stale(*date_pairs):
+	'''
+	(startdate,enddate) pairs of leaves gone from their months -> their rows are recomputed next run
+	'''
+	months = {month for startdate,enddate in date_pairs for month,_ in split(startdate,enddate)}
+	if months:
+		LeaveMonthlyStat.objects.filter(month__in = months).update(stale = True)
+
+
+
+def report(first_month,last_month,status = 'approved',by = ('month','leavetype','department_name','employeetype')):
+	'''
+	leave days between two months (inclusive) grouped by the by fields
+	-> [{'month':...,'leavetype':...,'department_name':...,'employeetype':...,'leaves':n,'days':n},...]
+	'''
+	return list(
+		LeaveMonthlyStat.objects.filter(month__gte = month_start(first_month),month__lte = month_start(last_month),status = status)
+		.values(*by)
+		.annotate(leaves = Sum('leaves'),days = Sum('days'))
+		.order_by(*by)
+	)
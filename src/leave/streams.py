@@ -0,0 +1,242 @@
+import asyncio
+import io
+import json
+import queue
+import threading
+from importlib import import_module
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from accounts.permissions import has_permission,APPROVE_LEAVES
+from hrsuit import tenancy
+from .models import Leave
+
+
+'''
+server-sent events for the dashboards.
+an in-process broker fans leave status changes and the pending count out to every
+connected dashboard of this process. when nobody is connected publishing costs nothing.
+under ASGI the stream is served by asgi_leave_stream - an idle connection is just a
+coroutine waiting on an asyncio.Queue. under WSGI an open stream would hold a worker thread for
+as long as the tab is open, so unless settings.LIVE_UPDATES pages don't open it and
+dashboard.views.leave_stream answers with one batch and a long retry (single_batch).
+one broker serves every tenant of the process, events only reach dashboards of their own tenant.
+NB: the broker is per process - run the ASGI stream in one process, or swap the
+Broker for a shared one (redis pub/sub) before running several.
+'''
+
+KEEPALIVE_SECONDS = 15
+QUEUE_SIZE = 100
+RETRY_MILLISECONDS = 10 * 60 * 1000 # EventSource reconnect delay when the stream is not kept open
+
+
+
+class Subscription:
+	'''
+	one connected dashboard - approvers get every leave, staff only their own
+	'''
+	def __init__(self,user_id,can_approve):
+		self.user_id = user_id
+		self.can_approve = can_approve
+		self.tenant = tenancy.current_tenant()
+		self.queue = queue.Queue(QUEUE_SIZE)
+
+
+	def wants(self,event,data):
+		if event == 'pending':
+			return self.can_approve
+		return self.can_approve or data.get('user_id') == self.user_id
+
+
+	def put(self,item):
+		try:
+			self.queue.put_nowait(item)
+		except queue.Full:
+			pass # slow client - drop, the next pending event resyncs the count
+
+
+	def deliver(self,event,data,tenant = None):
+		if tenant == self.tenant and self.wants(event,data):
+			self.put((event,data))
+
+
+
+class AsyncSubscription(Subscription):
+	def __init__(self,user_id,can_approve,loop):
+		self.user_id = user_id
+		self.can_approve = can_approve
+		self.tenant = tenancy.current_tenant()
+		self.loop = loop
+		self.queue = asyncio.Queue(QUEUE_SIZE)
+
+
+	def put(self,item):
+		self.loop.call_soon_threadsafe(self._put,item)
+
+
+	def _put(self,item):
+		if not self.queue.full():
+			self.queue.put_nowait(item)
+
+
+
+class Broker:
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._subscribers = set()
+
+
+	def __len__(self):
+		return len(self._subscribers)
+
+
+	def subscribe(self,subscription):
+		with self._lock:
+			self._subscribers.add(subscription)
+		return subscription
+
+
+	def unsubscribe(self,subscription):
+		with self._lock:
+			self._subscribers.discard(subscription)
+
+
+	def publish(self,event,data,tenant = None):
+		with self._lock:
+			subscribers = list(self._subscribers)
+		for subscription in subscribers:
+			subscription.deliver(event,data,tenant)
+
+
+
+broker = Broker()
+
+
+
+def pending_count():
+	return Leave.objects.all_pending_leaves().count()
+
+
+
+def publish_leaves(leave_ids):
+	'''
+	push the current state of these leaves plus the new pending count -> two queries,
+	none when no dashboard is connected
+	'''
+	if not broker or not leave_ids:
+		return
+	tenant = tenancy.current_tenant()
+	rows = Leave.objects.filter(id__in = leave_ids).values('id','user_id','user__username','leavetype','startdate','enddate','status')
+	for row in rows:
+		broker.publish('leave',{
+			'id':row['id'],
+			'user_id':row['user_id'],
+			'user':row['user__username'],
+			'leavetype':row['leavetype'],
+			'days':(row['enddate'] - row['startdate']).days if row['startdate'] and row['enddate'] else None,
+			'status':row['status'],
+		},tenant)
+	broker.publish('pending',{'count':pending_count()},tenant)
+
+
+
+def format_event(event,data):
+	return 'event: {0}\ndata: {1}\n\n'.format(event,json.dumps(data))
+
+
+
+def sync_events(subscription,initial):
+	'''
+	generator for StreamingHttpResponse (WSGI)
+	'''
+	broker.subscribe(subscription)
+	try:
+		for event,data in initial:
+			yield format_event(event,data)
+		while True:
+			try:
+				event,data = subscription.queue.get(timeout = KEEPALIVE_SECONDS)
+			except queue.Empty:
+				yield ': keepalive\n\n'
+				continue
+			yield format_event(event,data)
+	finally:
+		broker.unsubscribe(subscription)
+
+
+
+def single_batch(initial):
+	'''
+	the current state and a long reconnect delay, then the response ends -> no worker is held
+	'''
+	for event,data in initial:
+		yield format_event(event,data)
+	yield 'retry: {0}\n\n'.format(RETRY_MILLISECONDS)
+
+
+
+def initial_events(subscription):
+	if subscription.can_approve:
+		return [('pending',{'count':pending_count()})]
+	return []
+
+
+
+def _asgi_user(scope):
+	'''
+	session auth for the raw ASGI app, same cookie as the rest of the site
+	-> (user,can_approve,initial events)
+	'''
+	request = ASGIRequest(scope,io.BytesIO())
+	engine = import_module(settings.SESSION_ENGINE)
+	request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+	try:
+		user = get_user(request)
+		if not user.is_authenticated:
+			return user,False,[]
+		can_approve = has_permission(user,APPROVE_LEAVES)
+		return user,can_approve,initial_events(Subscription(user.id,can_approve))
+	finally:
+		close_old_connections()
+
+
+
+async def asgi_leave_stream(scope,receive,send):
+	'''
+	ASGI app for the leave stream - mounted by hrsuit/asgi.py in front of django
+	'''
+	user,can_approve,initial = await sync_to_async(_asgi_user)(scope)
+	if not user.is_authenticated:
+		await send({'type':'http.response.start','status':403,'headers':[(b'content-type',b'text/plain')]})
+		await send({'type':'http.response.body','body':b'login required'})
+		return
+
+	subscription = broker.subscribe(AsyncSubscription(user.id,can_approve,asyncio.get_event_loop()))
+	disconnected = asyncio.Event()
+
+	async def watch_disconnect():
+		while (await receive())['type'] != 'http.disconnect':
+			pass
+		disconnected.set()
+
+	watcher = asyncio.ensure_future(watch_disconnect())
+	try:
+		await send({'type':'http.response.start','status':200,'headers':[
+			(b'content-type',b'text/event-stream'),
+			(b'cache-control',b'no-cache'),
+			(b'x-accel-buffering',b'no'),
+		]})
+		for event,data in initial:
+			await send({'type':'http.response.body','body':format_event(event,data).encode(),'more_body':True})
+		while not disconnected.is_set():
+			try:
+				event,data = await asyncio.wait_for(subscription.queue.get(),KEEPALIVE_SECONDS)
+				chunk = format_event(event,data)
+			except asyncio.TimeoutError:
+				chunk = ': keepalive\n\n'
+			await send({'type':'http.response.body','body':chunk.encode(),'more_body':True})
+	finally:
+		watcher.cancel()
+		broker.unsubscribe(subscription)
@@ -1,3 +1,274 @@
-from django.test import TestCase
+import datetime
+from django.contrib.auth.models import User
+from django.core.cache import cache,caches
+from django.core.exceptions import ValidationError
+from django.test import TestCase,override_settings
+from django.urls import reverse
+from django.utils import timezone
+from . import approvals,audit,feeds,integrity,stats
+from .models import ApprovalStep,ApprovalTask,Leave,LeaveEvent,LeaveMonthlyStat
 
-# Create your tests here.
+
+
+def make_leave(user,status = 'pending',startdate = datetime.date(2026,3,2),enddate = datetime.date(2026,3,6)):
+	leave = Leave.objects.create(user = user,startdate = startdate,enddate = enddate,leavetype = 'casual')
+	if status != 'pending':
+		Leave.objects.filter(pk = leave.pk).update(status = status,is_approved = (status == 'approved'))
+		leave.refresh_from_db()
+	return leave
+
+
+
+@override_settings(LETTER_WORKERS = 0)
+class AuditTests(TestCase):
+	'''
+	events are buffered per scope and written by flush() - the test transaction never commits,
+	so the tests flush themselves
+	'''
+	def setUp(self):
+		self.user = User.objects.create_user('ada')
+		self.manager = User.objects.create_user('grace')
+		audit.begin(self.manager)
+
+
+	def tearDown(self):
+		audit._state.events = []
+		audit.end()
+
+
+	def test_transition_recorded_with_scope_actor(self):
+		leave = make_leave(self.user)
+		leave.approve_leave
+		leave.unapprove_leave
+		self.assertFalse(LeaveEvent.objects.exists()) # nothing written before flush
+		audit.flush()
+		events = list(LeaveEvent.objects.for_leave(leave).values_list('from_status','to_status','actor'))
+		self.assertEqual(events,[('pending','approved',self.manager.id),('approved','pending',self.manager.id)])
+
+
+	def test_unchanged_status_not_recorded(self):
+		leave = make_leave(self.user,status = 'rejected')
+		leave.reject_leave
+		audit.flush()
+		self.assertFalse(LeaveEvent.objects.exists())
+
+
+	def test_bulk_set_status(self):
+		pending = [make_leave(self.user),make_leave(self.user)]
+		approved = make_leave(self.user,status = 'approved')
+		ids = [leave.id for leave in pending + [approved]]
+		self.assertEqual(Leave.objects.bulk_set_status(ids,'approved',actor = self.user),2)
+		audit.flush()
+		self.assertEqual(Leave.objects.filter(id__in = ids,status = 'approved',is_approved = True).count(),3)
+		self.assertEqual(
+			sorted(LeaveEvent.objects.values_list('leave_id','from_status','to_status','actor')),
+			[(leave.id,'pending','approved',self.user.id) for leave in pending],
+		)
+		self.assertEqual(Leave.objects.bulk_set_status(ids,'approved'),0)
+
+
+	def test_events_between(self):
+		leave = make_leave(self.user)
+		leave.leaves_cancel
+		audit.flush()
+		now = timezone.now()
+		self.assertEqual(LeaveEvent.objects.between(now - datetime.timedelta(minutes = 1),now + datetime.timedelta(minutes = 1)).count(),1)
+		self.assertEqual(LeaveEvent.objects.between(now + datetime.timedelta(minutes = 1),now + datetime.timedelta(minutes = 2)).count(),0)
+
+
+
+@override_settings(LETTER_WORKERS = 0)
+class ApprovalTests(TestCase):
+	def setUp(self):
+		from employee.models import Department,Employee
+
+		self.research = Department.objects.create(name = 'Research')
+		self.user = User.objects.create_user('ada')
+		self.employee = Employee.objects.create(user = self.user,firstname = 'Ada',lastname = 'Lovelace',birthday = datetime.date(1990,1,1),department = self.research)
+		self.lead = User.objects.create_user('lead')
+		self.head = User.objects.create_user('head')
+		self.deputy = User.objects.create_user('deputy')
+		ApprovalStep.objects.create(department = self.research,level = 1,approver = self.lead,escalate_to = self.deputy,timeout_hours = 24)
+		ApprovalStep.objects.create(department = self.research,level = 2,approver = self.head)
+		self.leave = make_leave(self.user)
+		self.assertTrue(approvals.start(self.leave,self.employee))
+
+
+	def tearDown(self):
+		audit._state.events = []
+
+
+	def open_tasks(self):
+		return list(ApprovalTask.objects.filter(state = ApprovalTask.OPEN).values_list('leave_id','level','approver__username'))
+
+
+	def test_chain(self):
+		self.assertEqual(self.open_tasks(),[(self.leave.id,1,'lead')])
+		approvals.decide(ApprovalTask.objects.inbox(self.lead).get(),True,self.lead)
+		self.assertEqual(self.open_tasks(),[(self.leave.id,2,'head')])
+		self.assertEqual(Leave.objects.get(pk = self.leave.pk).status,'pending')
+		approvals.decide(ApprovalTask.objects.inbox(self.head).get(),True,self.head)
+		self.assertEqual(self.open_tasks(),[])
+		self.assertTrue(Leave.objects.get(pk = self.leave.pk).is_approved)
+
+
+	def test_reject_ends_the_chain(self):
+		approvals.decide(ApprovalTask.objects.inbox(self.lead).get(),False,self.lead)
+		self.assertEqual(self.open_tasks(),[])
+		self.assertEqual(Leave.objects.get(pk = self.leave.pk).status,'rejected')
+
+
+	def test_chain_for_most_specific(self):
+		from employee.models import Role
+
+		role = Role.objects.create(name = 'Intern')
+		ApprovalStep.objects.create(department = self.research,role = role,level = 1,approver = self.head)
+		self.assertEqual([step.approver for step in approvals.chain_for(self.employee)],[self.lead,self.head])
+		self.employee.role = role
+		self.assertEqual([step.approver for step in approvals.chain_for(self.employee)],[self.head])
+
+
+	def test_escalate_overdue(self):
+		now = timezone.now()
+		self.assertEqual(approvals.escalate_overdue(now),0)
+		self.assertEqual(approvals.escalate_overdue(now + datetime.timedelta(hours = 25)),1)
+		self.assertEqual(self.open_tasks(),[(self.leave.id,1,'deputy')])
+		self.assertEqual(ApprovalTask.objects.filter(state = ApprovalTask.ESCALATED).count(),1)
+		self.assertEqual(approvals.escalate_overdue(now + datetime.timedelta(hours = 50)),0) # already with the escalate_to user
+
+
+	def test_reopen(self):
+		self.leave.approve_leave
+		self.assertEqual(self.open_tasks(),[])
+		self.leave.unapprove_leave
+		self.assertEqual(self.open_tasks(),[(self.leave.id,1,'lead')])
+		self.assertEqual(approvals.reopen([self.leave.id]),0) # still open
+		self.leave.leaves_cancel
+		self.assertEqual(self.open_tasks(),[])
+
+
+	def test_bulk_set_status_closes_and_reopens_tasks(self):
+		Leave.objects.bulk_set_status([self.leave.id],'approved')
+		self.assertEqual(self.open_tasks(),[])
+		self.assertEqual(ApprovalTask.objects.get().state,ApprovalTask.CLOSED)
+		Leave.objects.bulk_set_status([self.leave.id],'pending')
+		self.assertEqual(self.open_tasks(),[(self.leave.id,1,'lead')])
+
+
+	def test_decide_view_post_only(self):
+		task = ApprovalTask.objects.inbox(self.lead).get()
+		url = reverse('dashboard:approvaldecide',args = [task.id,'approve'])
+		self.client.force_login(self.lead)
+		self.assertEqual(self.client.get(url).status_code,405)
+		self.assertEqual(self.open_tasks(),[(self.leave.id,1,'lead')])
+		self.assertRedirects(self.client.post(url),reverse('dashboard:approvalinbox'),fetch_redirect_response = False)
+		self.assertEqual(self.open_tasks(),[(self.leave.id,2,'head')])
+
+
+	def test_duplicate_step_rejected(self):
+		with self.assertRaises(ValidationError):
+			ApprovalStep(department = self.research,level = 2,approver = self.lead).clean()
+		ApprovalStep.objects.create(level = 1,approver = self.lead) # any department, any role
+		with self.assertRaises(ValidationError):
+			ApprovalStep(level = 1,approver = self.head).clean()
+
+
+
+class IntegrityTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user('ada')
+
+
+	def test_check_and_fix(self):
+		mismatch = make_leave(self.user)
+		Leave.objects.filter(pk = mismatch.pk).update(is_approved = True)
+		reversed_dates = make_leave(self.user,startdate = datetime.date(2026,3,9),enddate = datetime.date(2026,3,2))
+		unknown = make_leave(self.user,status = 'lost')
+		findings = integrity.check_range((mismatch.id,unknown.id))
+		self.assertEqual(
+			sorted((finding['leave'],finding['problem']) for finding in findings),
+			sorted([(mismatch.id,'status_mismatch'),(reversed_dates.id,'dates_reversed'),(unknown.id,'unknown_status')] + [(leave.id,'no_employee') for leave in (mismatch,reversed_dates,unknown)]),
+		)
+		self.assertEqual(integrity.apply_fixes(findings),2)
+		self.assertFalse(Leave.objects.get(pk = mismatch.pk).is_approved)
+		self.assertEqual(Leave.objects.filter(pk = reversed_dates.pk).values_list('startdate','enddate').get(),(datetime.date(2026,3,2),datetime.date(2026,3,9)))
+		self.assertEqual([finding['problem'] for finding in integrity.check_range((mismatch.id,unknown.id))],['no_employee','no_employee','unknown_status','no_employee']) # reported only
+
+
+	def test_fix_skips_leaves_changed_since_the_check(self):
+		leave = make_leave(self.user)
+		Leave.objects.filter(pk = leave.pk).update(is_approved = True)
+		reversed_dates = make_leave(self.user,startdate = datetime.date(2026,3,9),enddate = datetime.date(2026,3,2))
+		findings = integrity.check_range((leave.id,reversed_dates.id))
+		Leave.objects.filter(pk = leave.pk).update(status = 'approved') # approved between check and fix
+		Leave.objects.filter(pk = reversed_dates.pk).update(startdate = datetime.date(2026,4,9)) # edited too
+		self.assertEqual(integrity.apply_fixes(findings),0)
+		self.assertTrue(Leave.objects.get(pk = leave.pk).is_approved)
+		self.assertEqual(Leave.objects.get(pk = reversed_dates.pk).startdate,datetime.date(2026,4,9))
+
+
+
+class FeedStampTests(TestCase):
+	def setUp(self):
+		self.keys = [feeds._stamp_key(feeds.DEPARTMENT,object_id) for object_id in (9901,'all')]
+		caches['shared'].delete_many(self.keys)
+
+
+	def tearDown(self):
+		caches['shared'].delete_many(self.keys)
+
+
+	def test_stamp_seen_by_every_process(self):
+		stamp = feeds.feed_stamp(feeds.DEPARTMENT,9901)
+		cache.clear() # another worker has nothing of this one in its process cache
+		self.assertEqual(feeds.feed_stamp(feeds.DEPARTMENT,9901),stamp)
+		feeds._write_stamps(self.keys[:1])
+		cache.clear()
+		changed = feeds.feed_stamp(feeds.DEPARTMENT,9901)
+		self.assertGreater(changed,stamp)
+		feeds._write_stamps(self.keys[1:]) # every department
+		self.assertGreater(feeds.feed_stamp(feeds.DEPARTMENT,9901),changed)
+
+
+
+class StatsTests(TestCase):
+	def rows(self):
+		return sorted(LeaveMonthlyStat.objects.values_list('month','leavetype','status','department_id','employeetype','leaves','days'))
+
+
+	def test_split(self):
+		self.assertEqual(stats.split(datetime.date(2026,3,2),datetime.date(2026,3,6)),[(datetime.date(2026,3,1),4)])
+		self.assertEqual(stats.split(datetime.date(2026,1,30),datetime.date(2026,3,2)),[
+			(datetime.date(2026,1,1),2),(datetime.date(2026,2,1),28),(datetime.date(2026,3,1),1),
+		])
+		self.assertEqual(stats.split(datetime.date(2026,12,28),datetime.date(2027,1,4)),[(datetime.date(2026,12,1),4),(datetime.date(2027,1,1),3)])
+		self.assertEqual(stats.split(datetime.date(2026,3,2),datetime.date(2026,4,1)),[(datetime.date(2026,3,1),30)])# back at work on the 1st
+		self.assertEqual(stats.split(datetime.date(2028,2,28),datetime.date(2028,3,1)),[(datetime.date(2028,2,1),2)])
+		self.assertEqual(stats.split(datetime.date(2026,5,5),datetime.date(2026,5,5)),[(datetime.date(2026,5,1),0)])
+		self.assertEqual(stats.split(datetime.date(2026,5,5),datetime.date(2026,5,4)),[])
+		self.assertEqual(stats.split(None,datetime.date(2026,5,4)),[])
+
+
+	def test_incremental_matches_full(self):
+		ada,grace = User.objects.create_user('ada'),User.objects.create_user('grace')
+		moved = make_leave(ada,startdate = datetime.date(2026,12,28),enddate = datetime.date(2027,1,4))
+		gone = make_leave(grace,startdate = datetime.date(2026,2,26),enddate = datetime.date(2026,3,3))
+		make_leave(grace,'approved')
+		Leave.objects.update(updated = timezone.now() - datetime.timedelta(days = 1))# saved before the last run
+		self.assertEqual(stats.build(full = True),(4,5))
+
+		moved.status = 'approved'
+		moved.save()
+		gone.delete()# marks february and march stale
+		make_leave(ada,startdate = datetime.date(2026,7,30),enddate = datetime.date(2026,8,3))
+		months,_ = stats.build()
+		self.assertEqual(months,6)# dec, jan, feb, mar, jul, aug - not the untouched ones
+		incremental = self.rows()
+		self.assertFalse(LeaveMonthlyStat.objects.filter(stale = True).exists())
+
+		stats.build(full = True)
+		self.assertEqual(incremental,self.rows())
+		self.assertEqual(stats.report(datetime.date(2026,12,1),datetime.date(2027,1,1),by = ('month',)),[
+			{'month':datetime.date(2026,12,1),'leaves':1,'days':4},
+			{'month':datetime.date(2027,1,1),'leaves':1,'days':3},
+		])